@@ -1572,9 +1572,12 @@ class RunIDF(object):
             os.system(batchFileAddress)		
     
     def runCmd(self, batchFileAddress, shellKey = True):
-        batchFileAddress.replace("\\", "/")		
-        p = subprocess.Popen(["cmd /c ", batchFileAddress], shell=shellKey, stdout=subprocess.PIPE, stderr=subprocess.PIPE)		
-        out, err = p.communicate()
+        batchFileAddress.replace("\\", "/")
+        scheduler = sc.sticky["honeybee_JobScheduler"](1, shellKey, captureOutput = True)
+        job = scheduler.run([["cmd /c ", batchFileAddress]])[0]
+        if not job.succeeded:
+            print sc.sticky["honeybee_JobScheduler"].report([job])
+        return job
 
 
 sc.sticky["honeybee_WriteIDF"] = WriteIDF
@@ -1842,6 +1845,8 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
 
     else:
         print "[2 of 8] No context surfaces..."
+    
+    hb_hive.reportCopies(ghenv.Component)
 
         
     #################  BODY #####################
@@ -169,7 +169,7 @@ def checkTheInputs():
     #Check to be sure that the HBZones are valid HBZones.
     checkData3 = True
     try:
-        HBZones = hb_hive.callFromHoneybeeHive(_HBZones)
+        HBZones = hb_hive.callFromHoneybeeHive(_HBZones, ghenv.Component)
     except:
         HBZones = []
         checkData3 = False
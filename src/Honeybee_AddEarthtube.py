@@ -349,7 +349,7 @@ def main(_HBZones,schedules_,_designFlowrates,_mincoolingTemps_,_maxheatingTemps
     
     # Call the Honeybee zones from the hive
     
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(_HBZones)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(_HBZones, ghenv.Component)
     
     # The condition of the ground surrounding the earth tube used both writing to IDF and in CalcSoilSurfTemp preprocess
         
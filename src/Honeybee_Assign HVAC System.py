@@ -64,7 +64,7 @@ def main(HBZones, HVACIndex, hb_hvacProperties, hb_airDetail, hb_heatingDetail,
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
     EPHvac = sc.sticky["honeybee_EPHvac"]
-    HBZonesFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZonesFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     #create a single HVAC Group ID to create a unique reference to the HVAC details imported (or none if none)
     HVACGroupID = ghenv.Component.InstanceGuid.ToString() + str(uuid.uuid4())
@@ -138,7 +138,7 @@ def main(HBZones):
     if soilCheck == True:
         # call the objects from the lib
         hb_hive = sc.sticky["honeybee_Hive"]()
-        HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+        HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
         
         schedules = []
         for zoneCount, HBZone in enumerate(HBObjectsFromHive):
@@ -72,7 +72,7 @@ def main(shdHBObjects, minIll, maxIll):
     # check if the objects are valid Honeybee objects
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(shdHBObjects)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(shdHBObjects, ghenv.Component)
     
     if len(HBObjectsFromHive)==0 or len(HBObjectsFromHive)!= len(shdHBObjects):
         msg = "At the minimum one of the shdHBObjects is not a valid Honeybee object."
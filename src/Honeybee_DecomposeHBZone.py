@@ -68,7 +68,7 @@ def main(HBZone):
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
     
-    HBO = hb_hive.callFromHoneybeeHive([HBZone])[0]
+    HBO = hb_hive.callFromHoneybeeHive([HBZone], ghenv.Component)[0]
     
     HBSurfaces  = hb_hive.addToHoneybeeHive(HBO.surfaces, ghenv.Component)
     
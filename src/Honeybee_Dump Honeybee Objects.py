@@ -25,6 +25,7 @@ Dump Honeybee Objects
 
 Use this component to dump Honeybee objects to a file on your system.
 You can use load Honeybee objects to load the file to Grasshopper.
+The file is written one zone at a time in chunks with a table of contents so large models can be dumped without holding two copies in memory.
 WARNING: This component does not write custom schedules or materials within the file but it does write the names of the constructions and schedules.
 Accordingly, to properly load objects agian, you must connect the full strings of these objects to a "Add to EnergyPlus Library" component in any GH cript that loads the HBZones from the file.
 
@@ -53,7 +54,6 @@ try: ghenv.Component.AdditionalHelpFromDocStrings = "6"
 except: pass
 
 
-import cPickle as pickle
 import scriptcontext as sc
 import Grasshopper.Kernel as gh
 import os
@@ -81,10 +81,12 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
     if not os.path.isdir(os.path.split(filePath)[0]):
         raise ValueError("Can't find %s"%os.path.split(filePath)[0])
     
-    HBObjects = hb_hive.callFromHoneybeeHive(HBObjects)
-    ids = [HBObject.ID for HBObject in HBObjects]
-    # a global dictonary to collect data
+    # objects are written to the file one chunk at a time. objs collects the current zone or
+    # surface and sharedObjs collects the HVAC and library objects that are written at the end.
+    writer = sc.sticky["honeybee_HBObjectFileWriter"](filePath)
+    ids = []
     objs = {}
+    sharedObjs = {}
     idsToBeChecked = {}
     
     # Objects to write back to the memory of the document.
@@ -214,7 +216,7 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
             HBhvac.airDetails = airID
             if airID not in airIDs:
                 airIDs.append(airID)
-                objs[airID] = airDetailsDict
+                sharedObjs[airID] = airDetailsDict
         
         if HBhvac.heatingDetails != None:
             heatID = HBhvac.heatingDetails.ID
@@ -223,7 +225,7 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
             HBhvac.heatingDetails = heatID
             if heatID not in heatIDs:
                 heatIDs.append(heatID)
-                objs[heatID] = heatingDetailsDict
+                sharedObjs[heatID] = heatingDetailsDict
         
         if HBhvac.coolingDetails != None:
             coolID = HBhvac.coolingDetails.ID
@@ -232,11 +234,11 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
             HBhvac.coolingDetails = coolID
             if coolID not in coolIDs:
                 coolIDs.append(coolID)
-                objs[coolID] = coolingDetailsDict
+                sharedObjs[coolID] = coolingDetailsDict
         
         if hvacID not in hvacIDs:
             hvacIDs.append(hvacID)
-            objs[hvacID] = HBhvac.__dict__
+            sharedObjs[hvacID] = HBhvac.__dict__
     
     def dumpHBConstr(constructionName):
         constructionData = hb_ConstrLib[constructionName]
@@ -251,7 +253,7 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
                 constructionStr =  constructionStr + "  " + constructionData[layer][0] + ";   !- " +  constructionData[layer][1] + "\n\n"
             constrMats.append(constructionData[layer][0])
         constructionDict = {'objectType': 'HBConstr', 'name': constructionName, 'EPstr': constructionStr}
-        objs[constructionName] = constructionDict
+        sharedObjs[constructionName] = constructionDict
         return constrMats
     
     def dumpHBMat(materialName):
@@ -271,7 +273,7 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
                 else:
                     materialStr =  materialStr + "  " + str(materialData[layer][0]) + ";   !- " +  materialData[layer][1] + "\n\n"
             materialDict = {'objectType': 'HBMat', 'name': materialName, 'EPstr': materialStr}
-            objs[materialName] = materialDict
+            sharedObjs[materialName] = materialDict
     
     def dumpAllSchedules(schedules):
         schedCollect = schedules.values()
@@ -320,11 +322,11 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
                 else:
                     scheduleStr =  scheduleStr + "  " + str(scheduleData[layer][0]) + ";   !- " +  scheduleData[layer][1] + "\n\n"
             scheduleDict = {'objectType': 'HBsched', 'name': scheduleName, 'EPstr': scheduleStr}
-            objs[scheduleName] = scheduleDict
+            sharedObjs[scheduleName] = scheduleDict
     
     def dumpHBShdCntrl(windowShading):
         shdCntrlDict = {'objectType': 'HBShdCntrl', 'name': windowShading, 'EPstr': hb_EPObjectsAux.getEPObjectsStr(windowShading)}
-        objs[windowShading] = shdCntrlDict
+        sharedObjs[windowShading] = shdCntrlDict
         
         values = hb_EPObjectsAux.getEPObjectDataByName(windowShading)
         if values[4][0] != '' and values[4][0].upper() not in scheduleCollection:
@@ -347,34 +349,42 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
     def dumpHBRad(radMatName):
         radStr =  hb_RADMaterialAUX.getRADMaterialString(radMatName)
         radMaterialDict = {'objectType': 'HBRadMat', 'name': radMatName, 'RADstr': radStr}
-        objs[radMatName] = radMaterialDict
+        sharedObjs[radMatName] = radMaterialDict
     
     def dumpHBViewFactor(viewFacInfo):
         # add the view factor to the master dictionary.
-        objs[viewFacInfo.ID] = viewFacInfo.__dict__
+        objs[viewFacInfo.ID] = viewFacInfo.toDict()
     
-    # cycle through the objects and dump everything.
-    for id, HBO in zip(ids, HBObjects):
-        if HBO.objectType == 'HBSurface':
-            dumpHBSurface(HBO, True)
-        elif HBO.objectType == 'HBZone':
-            dumpHBZone(HBO)
-        elif HBO.objectType == 'ViewFactorInfo':
-            dumpHBViewFactor(HBO)
-        else:
-            raise Exception("Unsupported object! Assure all objects are Honeybee objects")
-    
-    # make sure all the parent objects and boundary condition objects are included
-    # in the file
-    keys = objs.keys()
-    for id, name in idsToBeChecked.iteritems():
-        assert id in keys,\
-            " InputError: Adjacent object %s is not in the list of HBObjects."%name
+    try:
+        # cycle through the objects and dump everything. Each object is copied from the hive
+        # and written to the file before the next one so the model is never in memory twice.
+        for HBObject in HBObjects:
+            HBO = hb_hive.callFromHoneybeeHive([HBObject])[0]
+            ids.append(HBO.ID)
+            if HBO.objectType == 'HBSurface':
+                dumpHBSurface(HBO, True)
+            elif HBO.objectType == 'HBZone':
+                dumpHBZone(HBO)
+            elif HBO.objectType == 'ViewFactorInfo':
+                dumpHBViewFactor(HBO)
+            else:
+                raise Exception("Unsupported object! Assure all objects are Honeybee objects")
+            writer.writeChunk(objs)
+            objs.clear()
+        writer.writeChunk(sharedObjs, True)
+        hb_hive.reportCopies(ghenv.Component)
+        
+        # make sure all the parent objects and boundary condition objects are included
+        # in the file
+        for id, name in idsToBeChecked.iteritems():
+            assert writer.hasObject(id),\
+                " InputError: Adjacent object %s is not in the list of HBObjects."%name
+    except:
+        writer.abort()
+        raise
     
-    HBData = {'ids':ids, 'objs': objs}
-    with open(filePath, "wb") as outf:
-        pickle.dump(HBData, outf)
-        print "Saved file to %s"%filePath
+    writer.close(ids)
+    print "Saved file to %s"%filePath
     return filePath
 
 
@@ -492,24 +492,33 @@ def checkSkyResolution(skyResolution, allDataDict, analysisPeriod, latitude, lon
     if skyResolution < 4:
         newVecs = []
         skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, skyResolution, .5)
+        # the patch meshes are only needed to intersect the sun vectors if Honeybee is not flying.
+        useSkyIndex = sc.sticky.has_key("honeybee_SkyPatchIndex")
         skyPatchMeshes = []
         for patch in skyPatches:
-            verts = patch.DuplicateVertices()
-            if len(verts) == 4:
-                patchBrep = rc.Geometry.Brep.CreateFromCornerPoints(verts[0], verts[1], verts[2], verts[3], sc.doc.ModelAbsoluteTolerance)
-            else: patchBrep = patch
-            skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patchBrep, rc.Geometry.MeshingParameters.Coarse)[0])
+            if not useSkyIndex:
+                verts = patch.DuplicateVertices()
+                if len(verts) == 4:
+                    patchBrep = rc.Geometry.Brep.CreateFromCornerPoints(verts[0], verts[1], verts[2], verts[3], sc.doc.ModelAbsoluteTolerance)
+                else: patchBrep = patch
+                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patchBrep, rc.Geometry.MeshingParameters.Coarse)[0])
             patchPt = rc.Geometry.AreaMassProperties.Compute(patch).Centroid
             newVec = rc.Geometry.Vector3d(patchPt)
             newVecs.append(newVec)
             finalPatchHOYs.append([])
         
         
-        for vecCount, vector in enumerate(sunVectors):
-            ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, vector)
-            for patchCount, patch in enumerate(skyPatchMeshes):
-                if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0:
-                    finalPatchHOYs[patchCount].append(vecCount)
+        if useSkyIndex:
+            # find the patch of all the sun vectors at once.
+            sunPatches = sc.sticky["honeybee_SkyPatchIndex"].fromSkyPatches(skyPatches).getPatches(sunVectors)
+            for vecCount, patchCount in enumerate(sunPatches):
+                if patchCount != None: finalPatchHOYs[patchCount].append(vecCount)
+        else:
+            for vecCount, vector in enumerate(sunVectors):
+                ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, vector)
+                for patchCount, patch in enumerate(skyPatchMeshes):
+                    if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0:
+                        finalPatchHOYs[patchCount].append(vecCount)
         
         vecCount = -1
         for patchCount, hourList in enumerate(finalPatchHOYs):
@@ -537,143 +546,113 @@ def checkSkyResolution(skyResolution, allDataDict, analysisPeriod, latitude, lon
     return allDataDict, finalSunVecs
 
 
-def nonparallel_projection(analysisMesh, sunLines, windowTestPts):
-    #Intersect the sun lines with the test mesh
-    faceInt = []
-    for face in range(analysisMesh.Faces.Count): faceInt.append([])
-    
-    for ptCount, pt in enumerate(windowTestPts):
-        try:
-            for hour, sunLine in enumerate(sunLines[ptCount]):
-                if sunLine != 0:
-                    intPt, i = rc.Geometry.Intersect.Intersection.MeshLine(analysisMesh, sunLine)
-                    if len(intPt)!=0: faceInt[i[0]].append(hour)
-                else: pass
-        except Exception, e:
-            print `e`
-    
-    return faceInt
+def projectPoints(mesh, points, vector):
+    #Project all of the points onto the mesh along the vector at once and keep the nearest hit in front of each point.
+    hits = {}
+    if len(points) == 0: return hits
+    projectedPts, ptIndices = rc.Geometry.Intersect.Intersection.ProjectPointsToMeshesEx([mesh], points, vector, sc.doc.ModelAbsoluteTolerance)
+    if projectedPts == None: return hits
+    for projectedPt, ptCount in zip(projectedPts, ptIndices):
+        dist = (projectedPt - points[ptCount]) * vector
+        if dist > 0 and (ptCount not in hits or dist < hits[ptCount][0]):
+            hits[ptCount] = (dist, projectedPt)
+    return hits
 
 
-def parallel_projection(analysisMesh, sunLines, windowTestPts):
-    #Intersect the sun lines with the test mesh using parallel processing
-    faceInt = []
-    for face in range(analysisMesh.Faces.Count): faceInt.append([]) #place holder for result
-    
-    def intersect(i):
-        try:
-            for hour, sunLine in enumerate(sunLines[i]):
-                if sunLine != 0:
-                    intPt, indx = rc.Geometry.Intersect.Intersection.MeshLine(analysisMesh, sunLine)
-                    if len(intPt)!=0: faceInt[indx[0]].append(hour)
-                else: pass
-        except Exception, e:
-            print `e`
-    
-    tasks.Parallel.ForEach(range(len(windowTestPts)), intersect)
-    
-    return faceInt
-
-
-def valCalc(percentBlocked, ECool, EBeam, cellArea, extraDivisor):
-    #Multiply the Energy by the Percentage Blocked by the Shade
-    ECoolPercent = [a*b for a,b in zip(ECool,percentBlocked)]
-    EBeamPercent = [a*b for a,b in zip(EBeam,percentBlocked)]
-    
-    #Calculate the Thermal Effect of the Shade
-    NegBeam = []
-    for item in EBeamPercent:
-        NegBeam.append(item*(-1))
-    
-    BeamEffectCool = [item1 for item1, item2 in zip(EBeamPercent , ECoolPercent) if item1 < item2]
-    DeltaCool1 = sum(BeamEffectCool)
-    
-    BeamEffectHeat = [item1 for item1, item2 in zip(NegBeam , ECoolPercent) if item1 > item2]
-    DeltaHeat1 = sum(BeamEffectHeat)
-    
-    BeamEffectMid = [item1 for item1, item2, item3 in zip(ECoolPercent , EBeamPercent , NegBeam) if item1 < item2 and item1 > item3]
-    DeltaMidCoolList = []
-    DeltaMidHeatList = []
-    for item in BeamEffectMid:
-        if item > 0: DeltaMidCoolList.append(item)
-        else: DeltaMidHeatList.append(item)
-    
-    DeltaMidCool = sum(DeltaMidCoolList)
-    DeltaMidHeat = sum(DeltaMidHeatList)
-    
-    deltaCooling = DeltaCool1 + DeltaMidCool
-    deltaHeating = DeltaHeat1 + DeltaMidHeat
-    
-    netEffecting = deltaCooling + deltaHeating
-    
-    #Normalize the effects by the area of the cell such that there is a consistent metric between cells of different areas.
-    coolEffect = (deltaCooling/cellArea)
-    heatEffect = (deltaHeating/cellArea)
-    netEffect = (netEffecting/cellArea)
-    
-    #If the sky resolution is greater than 4, divide the result by the number of additional timesteps that have been added.
-    if extraDivisor != 0:
-        coolEffect = coolEffect/extraDivisor
-        heatEffect = heatEffect/extraDivisor
-        netEffect = netEffect/extraDivisor
-    
-    return coolEffect, heatEffect, netEffect
-
-def evaluateShade(coolingLoad, heatingLoad, beamGain, analysisMesh, analysisAreas, windowMesh, windowTestPts, sunVectors, skyResolution):
-    #Determine the length to make the sun lines based on the scale of the bounding box around the input geometry.
-    def joinMesh(meshList):
-        joinedMesh = rc.Geometry.Mesh()
-        for m in meshList: joinedMesh.Append(m)
-        return joinedMesh
-    
-    joinedMesh = joinMesh([analysisMesh, windowMesh])
-    
-    boundBox = rc.Geometry.Mesh.GetBoundingBox(joinedMesh, rc.Geometry.Plane.WorldXY)
-    
-    #Multiply the largest dimension of the bounding box by 2 to ensure that the lines are definitely long enough to intersect the shade.
-    lineLength = (max(boundBox.Max - boundBox.Min)) * 2
-    
-    #Generate the sun lines for intersection and discount the vector if it intersects a context.
-    sunLines = []
-    if context_:
-        contextMeshes = []
-        for brep in context_:
-            contextMeshes.extend(rc.Geometry.Mesh.CreateFromBrep(brep, rc.Geometry.MeshingParameters.Default))
-        contextMesh = joinMesh(contextMeshes)
-    else: pass
-    
-    for pt in windowTestPts: sunLines.append([]) 
-    
-    for ptCount, pt in enumerate(windowTestPts):
-        for vec in sunVectors:
-            if context_:
-                if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh, rc.Geometry.Ray3d(pt, vec)) < 0:
-                    sunLines[ptCount].append(rc.Geometry.Line(pt, lineLength * vec))
-                else: sunLines[ptCount].append(0)
-            else:
-                sunLines[ptCount].append(rc.Geometry.Line(pt, lineLength * vec))
-            
-    
-    #If parallel is true, then run the intersection through the parallel function.  If not, run it through the normal function.
+def runForEachVector(sunVectors, projectVector):
+    #Each sun vector writes to its own slot of the result so they can run on multiple cores.
     if parallel_ == True:
-        faceInt = parallel_projection(analysisMesh, sunLines, windowTestPts)
+        tasks.Parallel.ForEach(range(len(sunVectors)), projectVector)
     else:
-        faceInt = nonparallel_projection(analysisMesh, sunLines, windowTestPts)
-    
-    #Convert the Number Of Intersections for Each Mesh Face into a Percent of Sun Blocked by Each Mesh Face for Each Hour of the Year.
-    percentBlocked = []
-    for face in range(analysisMesh.Faces.Count):
-        percentBlocked.append(len(sunVectors) *[0])
+        for vecCount in range(len(sunVectors)): projectVector(vecCount)
+
+
+def getSunlitPoints(windowTestPts, sunVectors, contextMesh):
+    #For each sun vector, get the window test points that are not blocked by the context.
+    if contextMesh == None:
+        return [windowTestPts] * len(sunVectors)
+    
+    sunlitPts = [None] * len(sunVectors)
+    def projectVector(vecCount):
+        blocked = projectPoints(contextMesh, windowTestPts, sunVectors[vecCount])
+        sunlitPts[vecCount] = [pt for ptCount, pt in enumerate(windowTestPts) if ptCount not in blocked]
+    runForEachVector(sunVectors, projectVector)
+    
+    return sunlitPts
+
+
+def getBlockedMatrix(analysisMesh, sunlitPts, sunVectors):
+    #Project the sunlit window points onto the shade mesh for each sun vector and count the points that each mesh face blocks.
+    #The result is a sparse matrix with a dictionary of {hour: number of blocked points} for each mesh face.
+    hourCounts = [None] * len(sunVectors)
+    def projectVector(vecCount):
+        faceCounts = collections.Counter()
+        for dist, projectedPt in projectPoints(analysisMesh, sunlitPts[vecCount], sunVectors[vecCount]).values():
+            faceCounts[analysisMesh.ClosestMeshPoint(projectedPt, 0).FaceIndex] += 1
+        hourCounts[vecCount] = faceCounts
+    runForEachVector(sunVectors, projectVector)
+    
+    blockedMtx = [{} for face in range(analysisMesh.Faces.Count)]
+    for hour, faceCounts in enumerate(hourCounts):
+        for faceCount, count in faceCounts.items():
+            blockedMtx[faceCount][hour] = count
+    
+    return blockedMtx
+
+
+def getEffectCoefficients(ECool, EBeam):
+    #Calculate the thermal effect of the shade in each hour if it were to block all of the sun.
+    #Since the percent blocked is never negative, it does not change which of the cases below applies and the effect of a partial block is just the percent times these values.
+    coolCoeffs = []
+    heatCoeffs = []
+    for eCool, eBeam in zip(ECool, EBeam):
+        coolEffect = 0
+        heatEffect = 0
+        if eBeam < eCool: coolEffect += eBeam
+        if -eBeam > eCool: heatEffect += -eBeam
+        if eCool < eBeam and eCool > -eBeam:
+            if eCool > 0: coolEffect += eCool
+            else: heatEffect += eCool
+        coolCoeffs.append(coolEffect)
+        heatCoeffs.append(heatEffect)
+    
+    return coolCoeffs, heatCoeffs
+
+
+def valCalc(blockedMtx, testPtsCount, coolCoeffs, heatCoeffs, cellAreas, extraDivisor):
+    #Multiply the percent of sun blocked by each cell with the effect of each hour.
+    shadeHelpfulness = []
+    shadeHarmfulness = []
+    shadeNetEffect = []
+    for cellCount, cellBlocked in enumerate(blockedMtx):
+        deltaCooling = 0
+        deltaHeating = 0
+        for hour in sorted(cellBlocked.keys()):
+            percentBlocked = cellBlocked[hour]/testPtsCount
+            deltaCooling += percentBlocked * coolCoeffs[hour]
+            deltaHeating += percentBlocked * heatCoeffs[hour]
+        netEffecting = deltaCooling + deltaHeating
+        
+        #Normalize the effects by the area of the cell such that there is a consistent metric between cells of different areas.
+        coolEffect = (deltaCooling/cellAreas[cellCount])
+        heatEffect = (deltaHeating/cellAreas[cellCount])
+        netEffect = (netEffecting/cellAreas[cellCount])
+        
+        #If the sky resolution is greater than 4, divide the result by the number of additional timesteps that have been added.
+        if extraDivisor != 0:
+            coolEffect = coolEffect/extraDivisor
+            heatEffect = heatEffect/extraDivisor
+            netEffect = netEffect/extraDivisor
+        
+        shadeHelpfulness.append(coolEffect)
+        shadeHarmfulness.append(heatEffect)
+        shadeNetEffect.append(netEffect)
     
-    testPtsCount = len(windowTestPts) 
-    # for each mesh surface,
-    for faceCount, faceData in enumerate(faceInt):
-        # check the number of intersections for each hour
-        counter= collections.Counter(faceData)
-        
-        for hour in counter.keys():
-             # store the result in the new percentBlocked list
-             percentBlocked[faceCount][hour] = counter[hour]/testPtsCount
+    return shadeHelpfulness, shadeHarmfulness, shadeNetEffect
+
+def evaluateShade(coolingLoad, heatingLoad, beamGain, analysisMesh, analysisAreas, windowTestPts, sunlitPts, sunVectors, skyResolution):
+    #Convert the number of intersections for each mesh face into a percent of sun blocked by each mesh face for each hour of the year.
+    blockedMtx = getBlockedMatrix(analysisMesh, sunlitPts, sunVectors)
     
     #Calculate ECool and EBeam, which signify the cooling energy at stake and the solar energy at stake respectively.
     ECool = [a-b for a,b in zip(coolingLoad,heatingLoad)]
@@ -682,16 +661,19 @@ def evaluateShade(coolingLoad, heatingLoad, beamGain, analysisMesh, analysisArea
     #Compare the percent blocked for each hour with the temperatre at that hour in relation to the balance point in order to determine the net value of shading.
     if skyResolution > 4: extraDivisor = (math.pow(2, (skyResolution-4)))
     else: extraDivisor = 0
-    shadeHelpfulness = []
-    shadeHarmfulness = []
-    shadeNetEffect = []
-    for cellCount, cell in enumerate(percentBlocked):
-        shadeHelp, shadeHarm, shadeNet = valCalc(cell, ECool, EBeam, analysisAreas[cellCount], extraDivisor)
-        shadeHelpfulness.append(shadeHelp)
-        shadeHarmfulness.append(shadeHarm)
-        shadeNetEffect.append(shadeNet)
+    coolCoeffs, heatCoeffs = getEffectCoefficients(ECool, EBeam)
     
-    return shadeHelpfulness, shadeHarmfulness, shadeNetEffect
+    return valCalc(blockedMtx, len(windowTestPts), coolCoeffs, heatCoeffs, analysisAreas, extraDivisor)
+
+
+def getContextMesh():
+    #Join the context into one mesh that is used to discount the sun vectors that it blocks.
+    if not context_: return None
+    contextMesh = rc.Geometry.Mesh()
+    for brep in context_:
+        for mesh in rc.Geometry.Mesh.CreateFromBrep(brep, rc.Geometry.MeshingParameters.Default):
+            contextMesh.Append(mesh)
+    return contextMesh
 
 
 
@@ -707,6 +689,8 @@ def main(allDataDict, sunVectors, skyResolution, legendPar, lb_preparation, lb_v
     calcSuccess = True
     
     try:
+        contextMesh = getContextMesh()
+        
         #Evaluate each shade.
         for windowCount, path in enumerate(allDataDict):
             # let the user cancel the process
@@ -722,14 +706,14 @@ def main(allDataDict, sunVectors, skyResolution, legendPar, lb_preparation, lb_v
             heatingLoad = allDataDict[path]["heatingFinal"]
             beamGain = allDataDict[path]["beamFinal"]
             
-            windowMesh = rc.Geometry.Mesh.CreateFromBrep(allDataDict[path]["windowSrf"])[0]
             windowPoints = allDataDict[path]["windowPts"]
+            sunlitPts = getSunlitPoints(windowPoints, sunVectors, contextMesh)
             
             for shadeCount, shadeMesh in enumerate(allDataDict[path]["shadeMesh"]):
                 totalShadeGeo.append(shadeMesh)
                 shadeMeshListInit[windowCount].append(shadeMesh)
                 shadeMeshAreas = allDataDict[path]["shadeMeshAreas"][shadeCount]
-                shadeHelpfulness, shadeHarmfulness, shadeNetEffect = evaluateShade(coolingLoad, heatingLoad, beamGain, shadeMesh, shadeMeshAreas, windowMesh, windowPoints, sunVectors, skyResolution)
+                shadeHelpfulness, shadeHarmfulness, shadeNetEffect = evaluateShade(coolingLoad, heatingLoad, beamGain, shadeMesh, shadeMeshAreas, windowPoints, sunlitPts, sunVectors, skyResolution)
                 
                 
                 for item in shadeNetEffect: totalNetEffect.append(item)
@@ -1182,7 +1182,7 @@ def main():
         blindMatNames = []
         
         #Call the objects from the hive.
-        HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBObjects)
+        HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBObjects, ghenv.Component)
         
         #Find out what the object is and make sure that we can run it through this component's functions.
         for object in HBZoneObjects:
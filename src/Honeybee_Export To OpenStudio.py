@@ -4730,8 +4730,11 @@ class OPSmeasures(object):
     
     def runCmd(self, batchFileAddress, shellKey = True):
         batchFileAddress.replace("\\", "/")
-        p = subprocess.Popen(["cmd /c ", batchFileAddress], shell=shellKey, stdout=subprocess.PIPE, stderr=subprocess.PIPE)		
-        out, err = p.communicate()
+        scheduler = sc.sticky["honeybee_JobScheduler"](1, shellKey, captureOutput = True)
+        job = scheduler.run([["cmd /c ", batchFileAddress]])[0]
+        if not job.succeeded:
+            print sc.sticky["honeybee_JobScheduler"].report([job])
+        return job
 
 
 
@@ -5265,8 +5268,11 @@ class RunOPS(object):
     
     def runCmd(self, batchFileAddress, shellKey = True):
         batchFileAddress.replace("\\", "/")
-        p = subprocess.Popen(["cmd /c ", batchFileAddress], shell=shellKey, stdout=subprocess.PIPE, stderr=subprocess.PIPE)		
-        out, err = p.communicate()
+        scheduler = sc.sticky["honeybee_JobScheduler"](1, shellKey, captureOutput = True)
+        job = scheduler.run([["cmd /c ", batchFileAddress]])[0]
+        if not job.succeeded:
+            print sc.sticky["honeybee_JobScheduler"].report([job])
+        return job
 
 def checkUnits():
     units = sc.doc.ModelUnitSystem
@@ -5592,6 +5598,8 @@ def main(HBZones, HVACSystem, HBContext, north, epwWeatherFile, analysisPeriod,
                 con.transform(NUscale, "", False)
         hb_writeOPS.OPSShdSurface(shdingSurfcaes, model)
     
+    hb_hive.reportCopies(ghenv.Component)
+    
     if HBGenerators_ != []:
         
         hb_writeOPS.setGenerators(HBGenerators_,outputs,model)
@@ -72,7 +72,7 @@ def main(HBZones):
     hb_hive = sc.sticky["honeybee_Hive"]()
     
     # Call Honeybee zones from the lib
-    HBZones = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZones = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     # create an empty dictionary
     # the structure should be as {type : {construction: { orientation : {area of opaque : area , area of glass : area}}}
@@ -50,6 +50,7 @@ except: pass
 
 
 import os
+import hashlib
 import scriptcontext as sc
 import Rhino as rc
 import Grasshopper.Kernel as gh
@@ -57,8 +58,9 @@ import Grasshopper.Kernel as gh
 
 def main(weatherFile, analysisPeriod):
     
-    def cumSkystr(calFile):
-        skyStr = "#Cumulative Sky Definition\n" + \
+    def cumSkystr(calFile, dcHeader = ""):
+        skyStr = dcHeader + \
+                 "#Cumulative Sky Definition\n" + \
                  "void brightfunc skyfunc\n" + \
                  "2 skybright " + calFile + "\n" + \
                  "0\n" + \
@@ -123,25 +125,19 @@ def main(weatherFile, analysisPeriod):
         ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, "epwWeatherFile address is not a valid .epw file")
         return -1
     
-    # make new folder for each city
-    subWorkingDir = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "skylib\\cumulativeSkies\\", newLocName)
+    # make new folder for each weather file
+    # location names are shortened so the folder is named after the content of the file too
+    md5 = hashlib.md5()
+    with open(weatherFile, "rb") as epwFile:
+        for chunk in iter(lambda: epwFile.read(1048576), b""):
+            md5.update(chunk)
+    subWorkingDir = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "skylib\\cumulativeSkies\\", \
+                                 newLocName + "_" + md5.hexdigest()[:8])
     subWorkingDir = lb_preparation.makeWorkingDir(subWorkingDir)
     # print 'Current working directory is set to: ', subWorkingDir
     # copy .epw file to sub-directory
     lb_preparation.copyFile(weatherFile, subWorkingDir + "\\" + newLocName + '.epw')
     
-    # generate the batch file
-    # this part should be optimized for Honeybee - no need to do diffuse anymore
-    batchStr = lb_preparation.genCumSkyStr(analysisPeriod, subWorkingDir, workingDir, newLocName, lat, lngt, timeZone)
-    
-    # write and run the batch file
-    batchFileName = subWorkingDir + '\\' + newLocName + '_cumulativeSky.bat'
-    batchFile = open(batchFileName, "w")
-    batchFile.write(batchStr)
-    batchFile.close()
-    os.system(batchFileName)
-
-    #write the sky file
     # read the analysis period to name the file
     stMonth, stDay, stHour, endMonth, endDay, endHour = lb_preparation.readRunPeriod(analysisPeriod, False)
 
@@ -149,10 +145,30 @@ def main(weatherFile, analysisPeriod):
     calFile = subWorkingDir + "\\" + newLocName + '_1_%s.cal' \
               % "_".join([str(stMonth), str(stDay), str(stHour), str(endMonth), str(endDay), str(endHour)])
     
+    # run GenCumulativeSky only if the sky of this weather file and period is not generated yet
+    if not os.path.isfile(calFile) or os.path.getsize(calFile) == 0:
+        # generate the batch file
+        # this part should be optimized for Honeybee - no need to do diffuse anymore
+        batchStr = lb_preparation.genCumSkyStr(analysisPeriod, subWorkingDir, workingDir, newLocName, lat, lngt, timeZone)
+        
+        # write and run the batch file
+        batchFileName = subWorkingDir + '\\' + newLocName + '_cumulativeSky.bat'
+        batchFile = open(batchFileName, "w")
+        batchFile.write(batchStr)
+        batchFile.close()
+        os.system(batchFileName)
+    
+    #write the sky file
     outputFile = subWorkingDir + "\\cumulativeSky_" + \
                  "_".join([str(stMonth), str(stDay), str(stHour), str(endMonth), str(endDay), str(endHour)])  + ".sky"
     
-    skystr = cumSkystr(calFile)
+    # weather file and analysis period to calculate cumulative radiation from daylight coefficients
+    dcHeader = ""
+    if sc.sticky.has_key("honeybee_DaylightCoefficients"):
+        dcHeader = sc.sticky["honeybee_DaylightCoefficients"].skyHeader(subWorkingDir + "\\" + newLocName + '.epw', \
+                   [stMonth, stDay, stHour, endMonth, endDay, endHour])
+    
+    skystr = cumSkystr(calFile, dcHeader)
     
     skyFile = open(outputFile, 'w')
     skyFile.write(skystr)
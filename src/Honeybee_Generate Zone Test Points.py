@@ -150,7 +150,7 @@ def getHBZoneFloorSurfaces(HBZone):
     try:
         # call the objects from the lib
         hb_hive = sc.sticky["honeybee_Hive"]()
-        HBZone = hb_hive.callFromHoneybeeHive([HBZone])[0]
+        HBZone = hb_hive.callFromHoneybeeHive([HBZone], ghenv.Component)[0]
 
         for HBS in HBZone.surfaces:
             if int(HBS.type) == 2:
@@ -201,7 +201,7 @@ def main(_name_,_HBSurfaces,_cellsEfficiency,_NoParallel,_Noseries,_powerOutput,
             The properties of the PV generators connected to this component these properties are then written to an IDF file in Honeybee_ Run Energy Simulation component.
     """
     
-    HBSurfacesfromhive = hb_hive.callFromHoneybeeHive(_HBSurfaces) # Call Honeybee surfaces from hive
+    HBSurfacesfromhive = hb_hive.callFromHoneybeeHive(_HBSurfaces, ghenv.Component) # Call Honeybee surfaces from hive
     
     PVgencount = 0
     
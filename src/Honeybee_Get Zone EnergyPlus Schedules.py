@@ -71,7 +71,7 @@ def main(HBZone):
     
     # get Honeybee zone
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObject = hb_hive.callFromHoneybeeHive([HBZone])[0]
+    HBZoneObject = hb_hive.callFromHoneybeeHive([HBZone], ghenv.Component)[0]
     
     try:
         schedules = HBZoneObject.getCurrentSchedules(True, ghenv.Component)
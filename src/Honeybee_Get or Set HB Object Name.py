@@ -69,7 +69,7 @@ def main(HBObjects, names):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBObjects)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBObjects, ghenv.Component)
     
     HBObjs = range(len(HBObjectsFromHive))
     
@@ -258,7 +258,7 @@ def main(windowHeight, sillHeight, glzRatio, breakUpWindow, breakUpDist, splitGl
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBObjects)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBObjects, ghenv.Component)
     
     #Check constructions and RADMAterials.
     for count, constr in enumerate(EPConstructions):
@@ -72,16 +72,23 @@ import System.Threading.Tasks as tasks
 import System
 import time
 import itertools
+import operator
 import datetime
 import json
 import copy
 import urllib2 as urllib
 import cPickle as pickle
 import subprocess
+import threading
+import array
+import struct
+import bisect
 import uuid
 import re
+import hashlib
 import random
 import zipfile
+import zlib
 
 try:
     System.Net.ServicePointManager.SecurityProtocol = System.Net.SecurityProtocolType.Tls12
@@ -479,8 +486,10 @@ class PrepareTemplateEPLibFiles(object):
             # load the json file
             filepath = os.path.join(workingDir, 'OpenStudio_Standards.json')
             try:
-                with open(filepath) as jsondata:
-                    openStudioStandardLib = json.load(jsondata)
+                def parseStandards():
+                    with open(filepath) as jsondata:
+                        return json.load(jsondata)
+                openStudioStandardLib = EPLibraryCache(workingDir, "OpenStudioStandards").load([filepath], parseStandards)
                 
                 sc.sticky ["honeybee_OpenStudioStandardsFile"] = openStudioStandardLib
                 print "Standard template file is loaded from %s"%filepath
@@ -535,6 +544,70 @@ class PrepareTemplateEPLibFiles(object):
         return libFilePaths
 
 
+class EPLibraryCache(object):
+    """Compiled copy of a library file that is loaded with a single read.
+    
+    Parsing the EnergyPlus libraries and the OpenStudio standards takes seconds every
+    time Honeybee flies. The parsed data is pickled next to the source files together with
+    the md5 hash of each source file. As long as the hashes match the pickled data is used
+    and the source files are only parsed again once one of them changes.
+    
+    Usage:
+        cache = EPLibraryCache(workingDir, "EPLibraries")
+        libraries = cache.load(libFilePaths, parseFunction)
+    """
+    
+    version = 1
+    
+    def __init__(self, cacheFolder, cacheName):
+        self.cacheFile = os.path.join(cacheFolder, "honeybee_" + cacheName + ".cache")
+    
+    @staticmethod
+    def getSourceKey(filePaths):
+        """A list of (file name, md5 hash) for each source file."""
+        sourceKey = []
+        for filePath in filePaths:
+            md5 = hashlib.md5()
+            with open(filePath, "rb") as inf:
+                for chunk in iter(lambda: inf.read(1048576), b""):
+                    md5.update(chunk)
+            sourceKey.append((os.path.basename(filePath), md5.hexdigest()))
+        return sourceKey
+    
+    def read(self, sourceKey):
+        """Return the cached data or None if there is no cache for these source files."""
+        if not os.path.isfile(self.cacheFile): return None
+        try:
+            with open(self.cacheFile, "rb") as inf:
+                version, cachedKey, data = pickle.load(inf)
+        except:
+            return None
+        if version != self.version or cachedKey != sourceKey: return None
+        return data
+    
+    def write(self, sourceKey, data):
+        """Write the cache to a temporary file first so other processes never read a half written cache."""
+        tempFile = self.cacheFile + ".%d.tmp"%os.getpid()
+        try:
+            with open(tempFile, "wb") as outf:
+                pickle.dump((self.version, sourceKey, data), outf, pickle.HIGHEST_PROTOCOL)
+            if os.path.isfile(self.cacheFile): os.remove(self.cacheFile)
+            os.rename(tempFile, self.cacheFile)
+        except:
+            # the cache is only a shortcut. Failing to write it should not stop Honeybee.
+            try: os.remove(tempFile)
+            except: pass
+    
+    def load(self, filePaths, parseFunction):
+        """Load the data of the source files from the cache or parse them with parseFunction() and update the cache."""
+        sourceKey = self.getSourceKey(filePaths)
+        data = self.read(sourceKey)
+        if data is None:
+            data = parseFunction()
+            self.write(sourceKey, data)
+        return data
+
+
 class HB_GetEPLibraries:
     
     def __init__(self):
@@ -588,6 +661,28 @@ class HB_GetEPLibraries:
         if report:
             self.report()
     
+    def importEPLibrariesFromFiles(self, EPfiles, cacheFolder, cleanCurrentLib = True, report = True):
+        """Load a list of idf libraries in order through the compiled library cache in cacheFolder."""
+        for EPfile in EPfiles:
+            if not os.path.isfile(EPfile):
+                raise Exception("Can't find EP library! at %s"%EPfile)
+        
+        def parseLibraries():
+            print "Loading EP materials, constructions, schedules and material properties from %s"%", ".join(EPfiles)
+            parser = HB_GetEPLibraries()
+            for EPfile in EPfiles:
+                parser.loadEPConstructionsMaterialsAndSchedules(parser.getEnergyPlusObjectsFromFile(EPfile), False)
+            return parser.libraries
+        
+        libraries = EPLibraryCache(cacheFolder, "EPLibraries").load(EPfiles, parseLibraries)
+        
+        if cleanCurrentLib: self.cleanHBLibs()
+        for shortKey, library in libraries.items():
+            if shortKey in self.libraries: self.libraries[shortKey].update(library)
+        
+        if report:
+            self.report()
+    
     def cleanHBLibs(self):
         self.libraries = {
             "Material": {},
@@ -1636,6 +1731,628 @@ class hb_MSHToRAD(object):
     
         return matFile, radFile
 
+class hb_BatchJob(object):
+    """Status of a single command that is executed by hb_JobScheduler.
+    
+    Attributes:
+        index: Index of the job in the input list.
+        command: Command (or batch file) which has been executed.
+        returnCode: Exit code of the last attempt. None if the job never started.
+        attempts: Number of times the job has been started.
+        timedOut: True if the last attempt was killed because it passed the timeout.
+        startTime / endTime: Time stamps of the last attempt.
+        out / err: Captured stdout and stderr if the scheduler captures the output.
+    """
+    def __init__(self, index, command):
+        self.index = index
+        self.command = command
+        self.returnCode = None
+        self.attempts = 0
+        self.timedOut = False
+        self.startTime = None
+        self.endTime = None
+        self.out = None
+        self.err = None
+    
+    @property
+    def succeeded(self):
+        return self.returnCode == 0 and not self.timedOut
+    
+    @property
+    def duration(self):
+        if self.startTime is None or self.endTime is None: return 0
+        return self.endTime - self.startTime
+    
+    def __repr__(self):
+        if self.timedOut: status = "timed out"
+        elif self.returnCode is None: status = "not started"
+        else: status = "exit code %d"%self.returnCode
+        return "Job #%d [%s] after %d attempt(s) in %.2f sec: %s"%(self.index, status, \
+                self.attempts, self.duration, self.command)
+
+
+class hb_JobScheduler(object):
+    """Run a number of commands in parallel using a bounded pool of workers.
+    
+    Each worker starts a process and blocks until the process exits so a new job
+    starts as soon as a CPU is free. There is no polling and no sleep between launches.
+    
+    Args:
+        maxPRuns: Max number of processes to be ran in parallel (default = 1).
+        shell: Set to True if you do NOT want to see the cmd window while the analysis is running.
+        timeout: Optional time limit in seconds for each job. Jobs which pass the limit will be killed.
+        retries: Number of times that a failed or timed out job will be re-executed (default = 0).
+        progressCallback: Optional function which will be called as progressCallback(finishedCount, total, job)
+            every time a job is finished. It is called from the worker threads outside the scheduler lock
+            so it should be thread safe and return quickly.
+        captureOutput: Set to True to collect stdout and stderr of the jobs.
+    """
+    
+    def __init__(self, maxPRuns = None, shell = False, timeout = None, retries = 0, \
+                 progressCallback = None, captureOutput = False):
+        
+        if not maxPRuns: maxPRuns = 1
+        self.maxPRuns = max(1, int(maxPRuns))
+        self.shell = shell
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.progressCallback = progressCallback
+        self.captureOutput = captureOutput
+        self.__lock = threading.Lock()
+    
+    @staticmethod
+    def killProcess(process):
+        # batch files run in their own cmd so kill the whole process tree
+        try:
+            if os.name == 'nt':
+                subprocess.call('taskkill /F /T /PID %d'%process.pid, shell = True)
+            else:
+                process.kill()
+        except Exception:
+            pass
+    
+    def runJob(self, job):
+        """Execute a single job and wait for it to end. Failed jobs will be retried."""
+        while job.attempts <= self.retries:
+            job.attempts += 1
+            job.timedOut = False
+            job.startTime = time.time()
+            
+            if self.captureOutput:
+                process = subprocess.Popen(job.command, shell = self.shell, \
+                                           stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+            else:
+                process = subprocess.Popen(job.command, shell = self.shell)
+            
+            timer = None
+            if self.timeout:
+                def onTimeout(process = process, job = job):
+                    job.timedOut = True
+                    self.killProcess(process)
+                timer = threading.Timer(self.timeout, onTimeout)
+                timer.start()
+            
+            try:
+                if self.captureOutput:
+                    job.out, job.err = process.communicate()
+                else:
+                    process.wait()
+            finally:
+                if timer: timer.cancel()
+            
+            job.returnCode = process.returncode
+            job.endTime = time.time()
+            
+            if job.succeeded: break
+        
+        return job
+    
+    def run(self, commands):
+        """Run the commands and return a list of hb_BatchJob in the same order as the input.
+        
+        Args:
+            commands: List of commands. Each command can be a string (e.g. address to a batch file)
+                or a list of arguments that will be passed to subprocess.Popen.
+        """
+        jobs = [hb_BatchJob(count, command) for count, command in enumerate(commands)]
+        if len(jobs) == 0: return jobs
+        
+        pending = list(reversed(jobs))
+        finished = [0]
+        
+        def worker():
+            while True:
+                with self.__lock:
+                    if not pending: return
+                    job = pending.pop()
+                try:
+                    self.runJob(job)
+                except Exception, e:
+                    job.err = str(e)
+                    job.endTime = time.time()
+                    print "Something went wrong: %s"%str(e)
+                
+                with self.__lock:
+                    finished[0] += 1
+                    finishedCount = finished[0]
+                
+                # a slow callback shouldn't keep the other workers from starting their next job
+                if self.progressCallback:
+                    try: self.progressCallback(finishedCount, len(jobs), job)
+                    except Exception, e: print "Progress callback failed: %s"%str(e)
+        
+        workers = [threading.Thread(target = worker) for i in range(min(self.maxPRuns, len(jobs)))]
+        for w in workers:
+            w.daemon = True
+            w.start()
+        
+        # workers return once the queue is empty and their last process has exited
+        for w in workers: w.join()
+        
+        return jobs
+    
+    @staticmethod
+    def failedJobs(jobs):
+        return [job for job in jobs if not job.succeeded]
+    
+    @staticmethod
+    def report(jobs):
+        """Return a short text report of the exit codes for a list of hb_BatchJob."""
+        failed = hb_JobScheduler.failedJobs(jobs)
+        totalTime = sum(job.duration for job in jobs)
+        msg = "%d of %d job(s) succeeded. Total process time: %.2f sec."%(len(jobs) - len(failed), len(jobs), totalTime)
+        for job in failed: msg += "\n" + repr(job)
+        return msg
+
+
+class hb_DaylightCoefficients(object):
+    """Daylight coefficient engine for cumulative radiation studies.
+    
+    The contribution of the ground and the 145 Tregenza sky patches to each test point is
+    calculated once with rcontrib and cached on disk under the hash of the scene, the test points
+    and the Radiance parameters. Hourly radiance of the sky patches is calculated once for each
+    weather file with gendaymtx. Radiation for any analysis period is then the product of the
+    contribution matrix and the sum of the sky patches over the hours of the period. The ground
+    patch is zero in the sum since the cumulative sky that rtrace uses has no ground.
+    
+    Skies from Honeybee_Generate Cumulative Sky start with a header line that has the weather
+    file and the analysis period of the sky:
+        #@honeybee daylightCoefficients epw=c:\\ladybug\\skylib\\...\\city.epw period=1,1,1,12,31,24
+    
+    Usage:
+        dc = sc.sticky["honeybee_DaylightCoefficients"]
+        epwFile, runPeriod = dc.readSkyHeader(skyFile)
+        numOfPts, matrix = dc.loadMatrix(matrixKey)
+        radiation = dc.radiation(numOfPts, matrix, dc.skyVector(epwFile, HOYs))
+    """
+    
+    version = 1
+    header = "#@honeybee daylightCoefficients"
+    # ground + 145 Tregenza patches. Each patch has red, green and blue values
+    numOfPatches = 146
+    channelWeights = (0.265, 0.670, 0.065)
+    
+    def __init__(self, maxSkies = 2, maxMatrices = 50):
+        self.maxSkies = maxSkies
+        self.maxMatrices = maxMatrices
+        self.__skyMatrices = {}
+        self.__skyOrder = []
+        self.__skyVectors = {}
+        self.__lock = threading.RLock()
+    
+    @property
+    def cacheFolder(self):
+        return os.path.join(sc.sticky["Honeybee_DefaultFolder"], "dcCache")
+    
+    @property
+    def radPath(self):
+        return sc.sticky["honeybee_folders"]["RADPath"]
+    
+    def isAvailable(self):
+        """Check if rcontrib and gendaymtx are installed."""
+        for tool in ("rcontrib", "gendaymtx"):
+            toolPath = os.path.join(self.radPath, tool)
+            if not (os.path.isfile(toolPath) or os.path.isfile(toolPath + ".exe")): return False
+        return True
+    
+    @classmethod
+    def skyHeader(cls, epwFile, runPeriod):
+        return cls.header + " epw=" + epwFile + " period=" + ",".join(str(i) for i in runPeriod) + "\n"
+    
+    @classmethod
+    def readSkyHeader(cls, skyFile):
+        """Weather file and (stMonth, stDay, stHour, endMonth, endDay, endHour) of a cumulative sky.
+        
+        Returns None if the sky file has no header.
+        """
+        try:
+            with open(skyFile, "r") as inf:
+                for line in inf:
+                    if not line.startswith(cls.header): continue
+                    # the path to the weather file may have spaces
+                    epwFile, runPeriod = line[len(cls.header):].strip()[len("epw="):].rsplit(" period=", 1)
+                    return epwFile, tuple(int(i) for i in runPeriod.split(","))
+        except Exception:
+            pass
+        return None
+    
+    @staticmethod
+    def skyDefinition():
+        """Uniform sky and ground which rcontrib uses as the modifier for sky patches."""
+        return "void glow sky_glow\n0\n0\n4 1 1 1 0\n\n" + \
+               "sky_glow source sky\n0\n0\n4 0 0 1 180\n\n" + \
+               "sky_glow source ground\n0\n0\n4 0 0 -1 180\n"
+    
+    @staticmethod
+    def rcontribParameters(radParameters):
+        parameters = "-ab " + str(radParameters["_ab_"]) + " -ad " + str(radParameters["_ad_"]) + \
+                     " -lw " + str(radParameters["_lw_"]) + " -lr " + str(radParameters["_lr_"]) + \
+                     " -dp " + str(radParameters["_dp_"]) + " -ds " + str(radParameters["_ds_"]) + \
+                     " -dt " + str(radParameters["_dt_"]) + " -dc " + str(radParameters["_dc_"]) + \
+                     " -dr " + str(radParameters["_dr_"]) + " -st " + str(radParameters["_st_"])
+        if radParameters.has_key("additional"):
+            for par in radParameters["additional"]:
+                parameters += " -%s"%par
+        return parameters
+    
+    def rcontribLine(self, projectName, octFileName, radParameters, cpuCount = 0):
+        ptsFile = projectName + "_" + str(cpuCount) + ".pts"
+        return "rcontrib -I+ -h -fa " + self.rcontribParameters(radParameters) + \
+               " -e MF:1 -f reinhart.cal -b rbin -bn Nrbins -m sky_glow " + \
+               octFileName + ".oct < " + ptsFile + " > " + self.asciiMatrixFile(projectName, cpuCount) + "\n"
+    
+    @staticmethod
+    def asciiMatrixFile(projectName, cpuCount):
+        return projectName + "_" + str(cpuCount) + ".dcm"
+    
+    @staticmethod
+    def contentKey(filePaths, *parameters):
+        """md5 hash of the parameters and the content of the files. None if one of the files is missing."""
+        md5 = hashlib.md5(" ".join(str(p) for p in parameters) + "\n")
+        for filePath in filePaths:
+            if not os.path.isfile(filePath): return None
+            md5.update("%d\n"%os.path.getsize(filePath))
+            with open(filePath, "rb") as inf:
+                for chunk in iter(lambda: inf.read(1048576), b""):
+                    md5.update(chunk)
+        return md5.hexdigest()
+    
+    def matrixKey(self, sceneKey, ptsFile, radParameters):
+        """Key of the contribution matrix of the points in ptsFile."""
+        if sceneKey == None: return None
+        return self.contentKey([ptsFile], self.version, sceneKey, self.rcontribParameters(radParameters))
+    
+    def matrixFile(self, key):
+        return os.path.join(self.cacheFolder, "dc_" + key + ".mtx")
+    
+    def hasMatrix(self, key):
+        return key != None and os.path.isfile(self.matrixFile(key))
+    
+    def prune(self):
+        """Remove the least recently used contribution matrices."""
+        try:
+            matrixFiles = [os.path.join(self.cacheFolder, f) for f in os.listdir(self.cacheFolder) \
+                           if f.startswith("dc_") and f.endswith(".mtx")]
+            matrixFiles.sort(key = os.path.getmtime, reverse = True)
+        except OSError:
+            return
+        for matrixFile in matrixFiles[self.maxMatrices:]:
+            try: os.remove(matrixFile)
+            except OSError: pass
+    
+    def __writeArray(self, filePath, numOfRows, data):
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+        tempFile = filePath + "_" + uuid.uuid4().hex[:8] + ".tmp"
+        with open(tempFile, "wb") as outf:
+            outf.write(struct.pack("<II", self.version, numOfRows))
+            data.tofile(outf)
+        try:
+            if os.path.isfile(filePath): os.remove(filePath)
+            os.rename(tempFile, filePath)
+        except OSError:
+            pass
+    
+    def __readArray(self, filePath):
+        try:
+            with open(filePath, "rb") as inf:
+                version, numOfRows = struct.unpack("<II", inf.read(8))
+                if version != self.version: return None
+                data = array.array("f")
+                data.fromstring(inf.read())
+            return numOfRows, data
+        except Exception:
+            return None
+    
+    def saveMatrix(self, key, asciiFile):
+        """Read the ascii output of rcontrib, add it to the cache and remove the ascii file.
+        
+        Returns (number of points, matrix) or None if the file is missing or broken.
+        """
+        numOfCols = self.numOfPatches * 3
+        data = array.array("f")
+        numOfPts = 0
+        try:
+            with open(asciiFile, "r") as inf:
+                for line in inf:
+                    values = line.split()
+                    if not values: continue
+                    if len(values) != numOfCols: return None
+                    data.fromlist(map(float, values))
+                    numOfPts += 1
+        except IOError:
+            return None
+        
+        if key != None:
+            self.__writeArray(self.matrixFile(key), numOfPts, data)
+            self.prune()
+        try: os.remove(asciiFile)
+        except OSError: pass
+        return numOfPts, data
+    
+    def loadMatrix(self, key):
+        """(number of points, matrix) from the cache. None if the matrix is not in the cache."""
+        if key == None: return None
+        matrix = self.__readArray(self.matrixFile(key))
+        if matrix != None:
+            # keep it from being cleaned up
+            try: os.utime(self.matrixFile(key), None)
+            except OSError: pass
+        return matrix
+    
+    @staticmethod
+    def writeWea(epwFile, weaFile):
+        """Write direct normal and diffuse horizontal radiation of a weather file to a wea file.
+        
+        Returns the number of hours. February 29th of leap years is skipped.
+        """
+        numOfHours = 0
+        with open(epwFile, "r") as epw:
+            location = epw.readline().strip().split(",")
+            for i in range(7): epw.readline()
+            
+            with open(weaFile, "w") as wea:
+                wea.write("place " + location[1].replace(" ", "_") + "\n" + \
+                          "latitude " + location[6] + "\n" + \
+                          "longitude " + str(-float(location[7])) + "\n" + \
+                          "time_zone " + str(-15 * float(location[8])) + "\n" + \
+                          "site_elevation " + location[9] + "\n" + \
+                          "weather_data_file_units 1\n")
+                for line in epw:
+                    data = line.split(",")
+                    if len(data) < 16: continue
+                    month, day, hour = int(data[1]), int(data[2]), int(data[3])
+                    if month == 2 and day == 29: continue
+                    wea.write("%d %d %.1f %s %s\n"%(month, day, hour - 0.5, data[14], data[15]))
+                    numOfHours += 1
+        return numOfHours
+    
+    def skyMatrix(self, epwFile):
+        """Hourly radiance (W/m2/sr) of the ground and the sky patches for a weather file.
+        
+        Returns (number of hours, values). Values are sorted by patch, channel and hour.
+        """
+        key = self.contentKey([epwFile], self.version, "gendaymtx -m 1 -O1")
+        if key == None:
+            raise Exception("Can't find the weather file at: " + epwFile)
+        
+        with self.__lock:
+            if key in self.__skyMatrices:
+                return self.__skyMatrices[key]
+            
+            skyFile = os.path.join(self.cacheFolder, "sky_" + key + ".mtx")
+            skyMatrix = self.__readArray(skyFile)
+            if skyMatrix == None:
+                print "Calculating the sky matrix for " + os.path.basename(epwFile)
+                skyMatrix = self.__calculateSkyMatrix(epwFile)
+                self.__writeArray(skyFile, skyMatrix[0], skyMatrix[1])
+            
+            self.__skyMatrices[key] = skyMatrix
+            self.__skyOrder.append(key)
+            while len(self.__skyOrder) > self.maxSkies:
+                oldKey = self.__skyOrder.pop(0)
+                del self.__skyMatrices[oldKey]
+                for vectorKey in [k for k in self.__skyVectors if k[0] == oldKey]:
+                    del self.__skyVectors[vectorKey]
+            return skyMatrix
+    
+    def __calculateSkyMatrix(self, epwFile):
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+        weaFile = os.path.join(self.cacheFolder, uuid.uuid4().hex[:8] + ".wea")
+        outFile = weaFile[:-4] + ".smx"
+        try:
+            numOfHours = self.writeWea(epwFile, weaFile)
+            with open(outFile, "w") as outf:
+                subprocess.call([os.path.join(self.radPath, "gendaymtx"), "-h", "-m", "1", "-O1", weaFile], \
+                                stdout = outf, shell = True)
+            
+            # gendaymtx writes one line for each hour of each patch
+            channels = [array.array("f"), array.array("f"), array.array("f")]
+            with open(outFile, "r") as inf:
+                for line in inf:
+                    values = line.split()
+                    if len(values) != 3: continue
+                    for channel, value in zip(channels, values):
+                        channel.append(float(value))
+            
+            if len(channels[0]) != numOfHours * self.numOfPatches:
+                raise Exception("gendaymtx failed to calculate the sky matrix for " + epwFile)
+            
+            data = array.array("f")
+            for patch in range(self.numOfPatches):
+                for channel in channels:
+                    data.extend(channel[patch * numOfHours:(patch + 1) * numOfHours])
+            return numOfHours, data
+        finally:
+            for tempFile in (weaFile, outFile):
+                try: os.remove(tempFile)
+                except OSError: pass
+    
+    def skyVector(self, epwFile, HOYs):
+        """Cumulative radiance of the patches over HOYs (1-8760) weighted for radiation in kWh."""
+        numOfHours, data = self.skyMatrix(epwFile)
+        vectorKey = (self.contentKey([epwFile], self.version, "gendaymtx -m 1 -O1"), tuple(HOYs))
+        with self.__lock:
+            if vectorKey in self.__skyVectors: return self.__skyVectors[vectorKey]
+            
+            mask = bytearray(numOfHours)
+            for HOY in HOYs:
+                if 0 < HOY <= numOfHours: mask[HOY - 1] = 1
+            
+            skyVector = array.array("d")
+            for count in range(self.numOfPatches * 3):
+                if count < 3:
+                    # GenCumulativeSky has no ground so the ground patch is left out to match rtrace
+                    skyVector.append(0)
+                    continue
+                hourlyValues = data[count * numOfHours:(count + 1) * numOfHours]
+                # Wh to kWh
+                skyVector.append(sum(itertools.compress(hourlyValues, mask)) * self.channelWeights[count%3] / 1000)
+            
+            self.__skyVectors[vectorKey] = skyVector
+            return skyVector
+    
+    def radiation(self, numOfPts, matrix, skyVector):
+        """Cumulative radiation (kWh/m2) of each point."""
+        numOfCols = len(skyVector)
+        return [sum(itertools.imap(operator.mul, matrix[count * numOfCols:(count + 1) * numOfCols], skyVector)) \
+                for count in range(numOfPts)]
+
+class hb_ImageTiles(object):
+    """Tiles of the views of an image based study.
+    
+    Each view is cut into nXDiv x nYDiv tiles and every tile is rendered by a separate batch file
+    so the tiles are handed to the CPUs as they become free and a few slow tiles (glazing,
+    detailed geometry) don't keep the rest of the CPUs waiting. Tiles are numbered row by row from
+    the bottom left corner which is the order that pcompos -a puts them back together.
+    
+    updatePreview can be used as the progressCallback of hb_JobScheduler. It only queues the
+    finished tile. A preview thread makes a low resolution copy of the queued tiles and puts the
+    finished tiles together in <projectName>_<view>_preview.HDR at most once every
+    previewInterval seconds while the rest of the tiles are rendering. Call finishPreview once
+    the tiles are rendered.
+    """
+    
+    previewScale = 4
+    previewInterval = 5
+    
+    def __init__(self, workingDir, projectName, nXDiv, nYDiv, radPath):
+        self.workingDir = workingDir
+        self.projectName = projectName
+        self.nXDiv = nXDiv
+        self.nYDiv = nYDiv
+        self.radPath = radPath
+        self.views = []
+        self.__previewTiles = {}
+        self.__queuedTiles = []
+        self.__lock = threading.Lock()
+        self.__finished = threading.Event()
+        self.__previewThread = None
+    
+    @staticmethod
+    def grid(numOfTiles):
+        """Number of columns and rows for numOfTiles tiles."""
+        nXDiv = max(1, int(math.sqrt(numOfTiles)))
+        while numOfTiles%nXDiv !=0 and nXDiv < numOfTiles:
+            nXDiv += 1
+        return nXDiv, numOfTiles//nXDiv
+    
+    @property
+    def numOfTiles(self):
+        return self.nXDiv * self.nYDiv
+    
+    def viewShift(self, tileIndex):
+        """View shift and lift (-vs -vl) of a tile."""
+        col = tileIndex%self.nXDiv
+        row = tileIndex//self.nXDiv
+        return col - (self.nXDiv - 1)/2.0, row - (self.nYDiv - 1)/2.0
+    
+    def tileFile(self, view, tileIndex):
+        return os.path.join(self.workingDir, self.projectName + "_" + view + "_" + `tileIndex` + ".unf")
+    
+    def previewFile(self, view):
+        return os.path.join(self.workingDir, self.projectName + "_" + view + "_preview.HDR")
+    
+    @staticmethod
+    def pictureSize(picFile):
+        """Width and height of a Radiance picture from its resolution string. None if it can't be read."""
+        try:
+            with open(picFile, "rb") as inf:
+                # the header ends with an empty line
+                line = inf.readline()
+                while line.strip():
+                    line = inf.readline()
+                resolution = inf.readline().split()
+            sizes = dict((resolution[i][1], int(resolution[i + 1])) for i in (0, 2))
+            return sizes["X"], sizes["Y"]
+        except Exception:
+            return None
+    
+    def updatePreview(self, finishedCount, total, job):
+        """Queue the tile of a finished job for the preview."""
+        if not job.succeeded: return
+        with self.__lock:
+            self.__queuedTiles.append(job.index)
+            if self.__previewThread == None:
+                self.__previewThread = threading.Thread(target = self.__previewLoop)
+                self.__previewThread.daemon = True
+                self.__previewThread.start()
+    
+    def finishPreview(self):
+        """Add the last queued tiles to the preview and stop the preview thread."""
+        self.__finished.set()
+        if self.__previewThread != None: self.__previewThread.join()
+    
+    def __previewLoop(self):
+        while True:
+            finished = self.__finished.wait(self.previewInterval)
+            with self.__lock:
+                tileIndices, self.__queuedTiles = self.__queuedTiles, []
+            if tileIndices:
+                for view in self.views: self.writePreview(view, tileIndices)
+            if finished: return
+    
+    def writePreview(self, view, tileIndices):
+        """Add the tiles to the preview of a view and put the finished tiles together."""
+        pfilt = os.path.join(self.radPath, "pfilt")
+        pcompos = os.path.join(self.radPath, "pcompos")
+        previewTiles = self.__previewTiles.setdefault(view, {})
+        if len(previewTiles) == 0:
+            print "Preview of " + view + " is written to " + self.previewFile(view)
+        
+        # all the tiles of a view have the same size
+        tileSize = None
+        for tileIndex in tileIndices:
+            tileFile = self.tileFile(view, tileIndex)
+            tileSize = self.pictureSize(tileFile)
+            if tileSize == None: continue
+            width = max(1, tileSize[0]//self.previewScale)
+            height = max(1, tileSize[1]//self.previewScale)
+            previewTile = tileFile[:-4] + "_preview.unf"
+            with open(previewTile, "wb") as outf:
+                if subprocess.call([pfilt, "-pa", "0", "-x", str(width), "-y", str(height), tileFile], \
+                                   stdout = outf, shell = True) != 0:
+                    continue
+            previewTiles[tileIndex] = (previewTile, width, height)
+        
+        if len(previewTiles) == 0: return
+        width, height = previewTiles.values()[0][1:]
+        
+        # put the finished tiles together. The rest of the image stays black
+        args = [pcompos, "-x", str(width * self.nXDiv), "-y", str(height * self.nYDiv)]
+        for tileIndex, (previewTile, width, height) in sorted(previewTiles.items()):
+            args += [previewTile, str((tileIndex%self.nXDiv) * width), str((tileIndex//self.nXDiv) * height)]
+        
+        tempFile = self.previewFile(view) + ".tmp"
+        with open(tempFile, "wb") as outf:
+            returnCode = subprocess.call(args, stdout = outf, shell = True)
+        if returnCode == 0:
+            try:
+                if os.path.isfile(self.previewFile(view)): os.remove(self.previewFile(view))
+                os.rename(tempFile, self.previewFile(view))
+            except OSError:
+                pass
+
+
 class hb_WriteRAD(object):
     
     def __init__(self, component = ghenv.Component):
@@ -1643,6 +2360,8 @@ class hb_WriteRAD(object):
         self.component = component
         
         self.hb_writeRADAUX = sc.sticky["honeybee_WriteRADAUX"]()
+        self.hb_ambientCache = sc.sticky["honeybee_AmbientCache"]
+        self.hb_daylightCoefficients = sc.sticky["honeybee_DaylightCoefficients"]
         self.hb_RADMaterialAUX = sc.sticky["honeybee_RADMaterialAUX"]
         self.lb_preparation = sc.sticky["ladybug_Preparation"]()
         self.hb_writeDS = sc.sticky["honeybee_WriteDS"]()
@@ -1656,6 +2375,8 @@ class hb_WriteRAD(object):
         self.hb_DSCore = hb_folders["DSCorePath"]
         self.hb_DSLibPath = hb_folders["DSLibPath"]
         
+        self.imageTiles = None
+        self.dcStudy = None
         
     def writeRADAndMaterialFiles(self, originalHBObjects, subWorkingDir, radFileName, \
                                  analysisRecipe, meshParameters, exportInteriorWalls):
@@ -1930,7 +2651,14 @@ class hb_WriteRAD(object):
     
         return radFileFullName, materialFileName
     
-    def writeTestPtFile(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe):
+    def writeTestPtFile(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe, chunkSize = None):
+        """Write test points into .pts files.
+        
+        By default the points are split into numOfCPUs files. If chunkSize is provided the points
+        will be split into many small chunks of chunkSize points instead. The chunks are ran by a
+        pool of numOfCPUs workers which pull the next chunk as soon as a CPU is free.
+        Chunking is only used for grid-based studies. Daysim needs one file per CPU.
+        """
         
         if analysisRecipe.type == 0: return [], [] #image-based simulation
         
@@ -1959,7 +2687,12 @@ class hb_WriteRAD(object):
             for v in flattenPtsNormals: v.Transform(transform)    
     
         numOfPoints = len(flattenTestPoints)
-    
+        
+        if chunkSize and analysisRecipe.type != 2:
+            # each chunk will be written as a separate file and will be picked up by the next free CPU
+            chunkSize = max(1, int(chunkSize))
+            numOfCPUs = int(math.ceil(numOfPoints / float(chunkSize)))
+            
         if numOfCPUs > numOfPoints: numOfCPUs = numOfPoints
 
         if numOfCPUs > 1:
@@ -2000,11 +2733,13 @@ class hb_WriteRAD(object):
                         radFileFullName, materialFileName, \
                         numOfCPUs, testPtsEachCPU, \
                         lenOfPts, analysisRecipe, additionalRadFiles, \
-                        readyOCTFile = None, runOverture = True):
+                        readyOCTFile = None, runOverture = True, tilesPerCPU = 4):
         
         batchFiles = []
         fileNames = [] # list of only names of the files
         pcompFileName = ""
+        self.imageTiles = None
+        self.dcStudy = None
         
         # initiate RAD Parameters
         if analysisRecipe.radParameters==None:
@@ -2194,15 +2929,22 @@ class hb_WriteRAD(object):
             
             # write OCT file
             # 3.2. oconv line
-            sceneRadFiles = [materialFileName, radSkyFileName, radFileFullName]
+            sceneRadFiles = [materialFileName, radFileFullName]
             
             if additionalRadFiles:
                 for additionalFile in additionalRadFiles:
                     if additionalFile!=None:
                         sceneRadFiles.append(additionalFile)
                 
-            OCTLine = self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles)
-            if readyOCTFile ==None: batchFile.write(OCTLine)
+            skyFiles = [radSkyFileName]
+            if readyOCTFile ==None and analysisRecipe.type == 1 and analysisRecipe.simulationType == 1.1:
+                # cumulative radiation from daylight coefficients. The sky is replaced by sky patches
+                self.dcStudy = self.daylightCoefficientsStudy(subWorkingDir, radFileName, radSkyFileName, sceneRadFiles)
+                if self.dcStudy != None: skyFiles = [self.dcStudy["skyFile"]]
+            
+            if readyOCTFile ==None:
+                OCTLine = self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles, skyFiles)
+                batchFile.write(OCTLine)
             
             if analysisRecipe.type == 0:
                 # add overture line in case it is an image-based analysis
@@ -2213,24 +2955,41 @@ class hb_WriteRAD(object):
                 overtureLine = self.hb_writeRADAUX.overtureLine(viewLine, OCTFileName, view, analysisRecipe.radParameters, int(analysisRecipe.type))
                 originalView = str(viewLine).strip()
                 
-                if runOverture: batchFile.write(overtureLine)
+                # ambient files are shared between runs of the same scene and ambient parameters.
+                # materials are part of the scene since the indirect light depends on them.
+                if readyOCTFile ==None:
+                    ambientKey = self.hb_ambientCache.ambientKey(sceneRadFiles + [radSkyFileName], analysisRecipe.radParameters)
+                else:
+                    ambientKey = self.hb_ambientCache.ambientKey([readyOCTFile], analysisRecipe.radParameters)
+                
+                if ambientKey == None:
+                    if runOverture: batchFile.write(overtureLine)
+                elif runOverture and not self.hb_ambientCache.isWarm(ambientKey):
+                    # warm the cache once for all the views
+                    overtureViews = self.rhinoViewNames or [view]
+                    def overtureLines(ambFile):
+                        lines = ""
+                        for overtureView in overtureViews:
+                            overtureView = self.lb_preparation.removeBlank(overtureView)
+                            viewLine = self.hb_writeRADAUX.exportView(overtureView, analysisRecipe.radParameters, analysisRecipe.cameraType, imageSize = [64, 64])
+                            lines += self.hb_writeRADAUX.overtureLine(viewLine, OCTFileName, overtureView, analysisRecipe.radParameters, int(analysisRecipe.type), ambFile)
+                        return lines
+                    
+                    batchFile.write(self.hb_ambientCache.warmLines(ambientKey, overtureLines))
             
         if analysisRecipe.type == 0:
             # write view files
             if len(self.rhinoViewNames)==0:
                 self.rhinoViewNames = [sc.doc.Views.ActiveView.ActiveViewport.Name]
             
-            #recalculate vh and vv
-            nXDiv = int(math.sqrt(numOfCPUs))
-
-            while numOfCPUs%nXDiv !=0 and nXDiv < numOfCPUs:
-                nXDiv += 1
+            # cut the views into more tiles than CPUs. runBatchFiles hands them to the CPUs as they become free
+            nXDiv, nYDiv = hb_ImageTiles.grid(numOfCPUs * max(1, int(tilesPerCPU)))
+            self.imageTiles = hb_ImageTiles(subWorkingDir, OCTFileName, nXDiv, nYDiv, self.hb_RADPath)
+            self.imageTiles.views = [self.lb_preparation.removeBlank(viewName) for viewName in self.rhinoViewNames]
             
-            nYDiv = numOfCPUs/nXDiv
-
             fileNames = []
             HDRPieces = {}
-            for cpuCount in range(numOfCPUs):
+            for cpuCount in range(self.imageTiles.numOfTiles):
                 # create a batch file
                 batchFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '_IMG.bat')
                 batchFiles.append(batchFileName)
@@ -2242,12 +3001,14 @@ class hb_WriteRAD(object):
                 batchFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
                 batchFile.write("cd " + subWorkingDir + "\n")
                 
-                # calculate vs and vl for thi cpu
-                try: vs = (((cpuCount%nXDiv)/(nXDiv-1)) - 0.5) * (nXDiv - 1)
-                except: vs = 0
-                    
-                try: vl = ((int(cpuCount/nXDiv)/(nYDiv-1)) - 0.5) * (nYDiv - 1)
-                except: vl = 0
+                # calculate vs and vl for this tile
+                vs, vl = self.imageTiles.viewShift(cpuCount)
+                
+                # each process starts from its own copy of the cached ambient file
+                ambFile = None
+                if ambientKey != None:
+                    ambFile = OCTFileName + "_" + `cpuCount` + ".amb"
+                    batchFile.write(self.hb_ambientCache.copyLine(ambientKey, ambFile))
                 
                 # print vs, vl
                 for view in self.rhinoViewNames:
@@ -2265,36 +3026,36 @@ class hb_WriteRAD(object):
                                                               nXDiv, nYDiv, vs, vl)
                     
                     # write rpict lines
-                    RPICTLines = self.hb_writeRADAUX.rpictLine(viewLine, OCTFileName, view, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
+                    RPICTLines = self.hb_writeRADAUX.rpictLine(viewLine, OCTFileName, view, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount, ambFile)
                     batchFile.write(RPICTLines)                    
                     
                 # close the file
                 batchFile.close()
                 
-                # PCOMP to merge images into a single HDR
-                pcompFileName = os.path.join(subWorkingDir, radFileName + '_PCOMP.bat')
-                                
-                with open(pcompFileName, "w") as pcompFile:
-                    
-                    # write path files
-                    pcompFile.write(pathStr)
-                    pcompFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
-                    pcompFile.write("cd " + subWorkingDir + "\n")
+            # PCOMP to merge images into a single HDR
+            pcompFileName = os.path.join(subWorkingDir, radFileName + '_PCOMP.bat')
+                            
+            with open(pcompFileName, "w") as pcompFile:
+                
+                # write path files
+                pcompFile.write(pathStr)
+                pcompFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
+                pcompFile.write("cd " + subWorkingDir + "\n")
+                
+                for mergedName, pieces in HDRPieces.items():
                     
-                    for mergedName, pieces in HDRPieces.items():
-                        
-                        pcomposLine = "pcompos -a " + `nXDiv` + " "
-                        # pieces.reverse()
-                        for piece in pieces:
-                            pcomposLine += piece.replace('.HDR', '.unf') + " "
-                        pcomposLine += " > " + mergedName.replace('.HDR', '_temp.HDR') + "\n"
-                        
-                        pcompFile.write(pcomposLine)
+                    pcomposLine = "pcompos -a " + `nXDiv` + " "
+                    # pieces.reverse()
+                    for piece in pieces:
+                        pcomposLine += piece.replace('.HDR', '.unf') + " "
+                    pcomposLine += " > " + mergedName.replace('.HDR', '_temp.HDR') + "\n"
                     
-                        pfiltLine = 'pfilt -r .6 -x /2 -y /2 {} | getinfo -a "VIEW= {}" > {}\n' \
-                            .format(mergedName.replace('.HDR', '_temp.HDR'), originalView, mergedName)
-                        # add original view
-                        pcompFile.write(pfiltLine)
+                    pcompFile.write(pcomposLine)
+                
+                    pfiltLine = 'pfilt -r .6 -x /2 -y /2 {} | getinfo -a "VIEW= {}" > {}\n' \
+                        .format(mergedName.replace('.HDR', '_temp.HDR'), originalView, mergedName)
+                    # add original view
+                    pcompFile.write(pfiltLine)
 
             return initBatchFileName, batchFiles, fileNames, pcompFileName, HDRFileAddress
                         
@@ -2315,17 +3076,67 @@ class hb_WriteRAD(object):
                 batchFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
                 batchFile.write("cd " + subWorkingDir + "\n")
                 
-                # 3.4. add rtrace lin
-                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
-                batchFile.write(RTRACELine)
+                if self.dcStudy != None:
+                    # 3.4. add rcontrib line unless the contribution matrix of these points is in the cache
+                    ptsFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.pts')
+                    matrixKey = self.hb_daylightCoefficients.matrixKey(self.dcStudy["sceneKey"], ptsFileName, analysisRecipe.radParameters)
+                    self.dcStudy["matrixKeys"].append(matrixKey)
+                    if not self.hb_daylightCoefficients.hasMatrix(matrixKey):
+                        batchFile.write(self.hb_daylightCoefficients.rcontribLine(radFileName, OCTFileName, analysisRecipe.radParameters, cpuCount))
+                else:
+                    # 3.4. add rtrace lin
+                    RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
+                    batchFile.write(RTRACELine)
                 
                 # close the file
                 batchFile.close()
             
+            if self.dcStudy != None:
+                numOfHits = sum(1 for key in self.dcStudy["matrixKeys"] if self.hb_daylightCoefficients.hasMatrix(key))
+                print "Daylight coefficients: %d of %d contribution matrices are reused from the cache."%(numOfHits, numOfCPUs)
             
             return initBatchFileName, batchFiles, fileNames, pcompFileName, RADResultFilesAddress
         
-    def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.5):
+    def daylightCoefficientsStudy(self, subWorkingDir, radFileName, radSkyFileName, sceneRadFiles):
+        """Set up a cumulative radiation study with daylight coefficients.
+        
+        Returns None if the sky is not from Honeybee_Generate Cumulative Sky or rcontrib and
+        gendaymtx are not installed. In that case the study runs with rtrace as usual.
+        """
+        skyHeader = self.hb_daylightCoefficients.readSkyHeader(radSkyFileName)
+        if skyHeader == None or not self.hb_daylightCoefficients.isAvailable(): return None
+        
+        sceneKey = sc.sticky["honeybee_OctreeCache"].sceneKey(sceneRadFiles, 2048)
+        if sceneKey == None: return None
+        
+        dcSkyFileName = os.path.join(subWorkingDir, radFileName + '_dcSky.rad')
+        with open(dcSkyFileName, "w") as dcSkyFile:
+            dcSkyFile.write(self.hb_daylightCoefficients.skyDefinition())
+        
+        return {"skyFile": dcSkyFileName, "epwFile": skyHeader[0], "runPeriod": skyHeader[1], \
+                "sceneKey": sceneKey, "matrixKeys": []}
+    
+    def writeDCResults(self, subWorkingDir, radFileName):
+        """Write cumulative radiation of the points of each CPU to .res files from the daylight coefficients."""
+        dc = self.hb_daylightCoefficients
+        runPeriod = self.dcStudy["runPeriod"]
+        HOYs = self.lb_preparation.getHOYsBasedOnPeriod([tuple(runPeriod[:3]), tuple(runPeriod[3:])], 1)[0]
+        skyVector = dc.skyVector(self.dcStudy["epwFile"], HOYs)
+        
+        for cpuCount, matrixKey in enumerate(self.dcStudy["matrixKeys"]):
+            matrix = dc.loadMatrix(matrixKey)
+            if matrix == None:
+                matrix = dc.saveMatrix(matrixKey, os.path.join(subWorkingDir, dc.asciiMatrixFile(radFileName, cpuCount)))
+            if matrix == None:
+                print "Can't find the daylight coefficients for " + radFileName + '_' + `cpuCount` + '.pts'
+                continue
+            
+            with open(os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.res'), "w") as resFile:
+                for value in dc.radiation(matrix[0], matrix[1], skyVector):
+                    resFile.write("%.4f\t%.4f\t%.4f\t\n"%(value, value, value))
+    
+    def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.5, \
+                          timeout = None, retries = 0, progressCallback = None):
     
         """Run a number of batch files in parallel and
             wait to end of the analysis.
@@ -2334,57 +3145,40 @@ class hb_WriteRAD(object):
                 batchFileNames: List of batch files
                 maxPRuns: max number of files to be ran in parallel (default = 0)
                 shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
+                waitingTime: Not used anymore. The scheduler wakes up as soon as a process exits.
+                timeout: Optional time limit in seconds for each batch file
+                retries: Number of times that a failed batch file will be re-executed
+                progressCallback: Optional function(finishedCount, total, job)
+            
+            Returns:
+                A list of hb_BatchJob with exit code of each batch file.
         """
-    
-        if not maxPRuns : maxPRuns = 1
-        maxPRuns = int(maxPRuns)
-        total = len(batchFileNames)
-        
-        if maxPRuns < 1: maxPRuns = 1
-        if maxPRuns > total: maxPRuns = total
-        
-        running = 0
-        done = False
-        jobs = []
-        pid = 0
-        
-        try:
-            while not done:
-                if running < maxPRuns and pid < total:
-                    # execute the files
-                    jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                    pid+=1
-                    time.sleep(waitingTime)
-                
-                # count how many jobs are running and how many are done
-                running = 0
-                finished = 0
-                for job in jobs:
-                    if job.poll() is None:
-                        #one job is still running
-                        running += 1
-                    else:
-                        finished += 1
         
-                if running == maxPRuns:
-                    # wait for half a second
-                    #print "waiting..."
-                    time.sleep(waitingTime)
+        scheduler = hb_JobScheduler(maxPRuns, shell, timeout, retries, progressCallback)
+        jobs = scheduler.run([fileName.replace("\\", "/") for fileName in batchFileNames])
         
-                if finished ==  total:
-                    done = True
+        if len(hb_JobScheduler.failedJobs(jobs)) != 0:
+            print hb_JobScheduler.report(jobs)
         
-        except Exception, e:
-            print "Something went wrong: %s"%str(e) 
+        return jobs
     
     def runBatchFiles(self, initBatchFileName, batchFileNames, fileNames, \
-                      pcompBatchFile, waitingTime, runInBackground = False):
+                      pcompBatchFile, waitingTime, runInBackground = False, maxPRuns = None):
+        
+        if not maxPRuns: maxPRuns = len(batchFileNames)
+        jobs = self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground)
         
-        self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground, waitingTime = waitingTime)
-        self.executeBatchFiles(batchFileNames, maxPRuns = len(batchFileNames), shell = runInBackground, waitingTime = waitingTime)
+        # update the preview of image based studies as the tiles finish
+        progressCallback = None
+        if self.imageTiles != None: progressCallback = self.imageTiles.updatePreview
+        jobs += self.executeBatchFiles(batchFileNames, maxPRuns = maxPRuns, shell = runInBackground, \
+                                       progressCallback = progressCallback)
+        if self.imageTiles != None: self.imageTiles.finishPreview()
         
         if pcompBatchFile!="":
-            os.system(pcompBatchFile) # put all the files together
+            jobs += self.executeBatchFiles([pcompBatchFile], maxPRuns = 1, shell = runInBackground) # put all the files together
+        
+        return jobs
         
     def collectResults(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe, expectedResultFiles):
         
@@ -2445,18 +3239,68 @@ class hb_WriteRAD(object):
             return expectedResultFiles
         
         else:
+            if self.dcStudy != None:
+                self.writeDCResults(subWorkingDir, radFileName)
+            
             RADResultFilesAddress = expectedResultFiles
             # grid-based analysis
+            # count the expected files. the folder can also have a merged result file from chunks
             numRes = 0
-            files = os.listdir(subWorkingDir)
-            for file in files:
-                if file.EndsWith('res'): numRes+=1
+            for resultFile in expectedResultFiles:
+                if os.path.isfile(resultFile): numRes+=1
             if numRes != numOfCPUs:
                 print "Cannot find the results of the study"
                 RADResultFilesAddress = []
             time.sleep(1)
             return RADResultFilesAddress
         
+    def assembleChunkResults(self, subWorkingDir, radFileName, resultFiles):
+        """Merge the results of point chunks into a single result file.
+        
+        Chunks are written in the same order as the flattened test points so the results
+        will be in the original order. The number of results is checked against the pattern
+        file (.ptn) which is used to re-branch the points.
+        """
+        ptnFileName = os.path.join(subWorkingDir, radFileName + '.ptn')
+        mergedFileName = os.path.join(subWorkingDir, radFileName + '.res')
+        
+        expectedCount = None
+        if os.path.isfile(ptnFileName):
+            with open(ptnFileName, "r") as ptnFile:
+                expectedCount = sum(int(c) for c in ptnFile.read().split(",") if c.strip())
+        
+        count = 0
+        with open(mergedFileName, "w") as outf:
+            for resultFile in resultFiles:
+                with open(resultFile, "r") as inf:
+                    for line in inf:
+                        if not line.strip(): continue
+                        outf.write(line)
+                        count += 1
+        
+        if expectedCount is not None and count != expectedCount:
+            print "Number of results (%d) doesn't match the number of test points (%d)."%(count, expectedCount)
+            return []
+        
+        return [mergedFileName]
+    
+    def writeChunkTimingFile(self, subWorkingDir, radFileName, jobs, lenOfPts):
+        """Write execution time for each chunk of points to a csv file. Use it to tune chunk size."""
+        timingFileName = os.path.join(subWorkingDir, radFileName + '_chunkTiming.csv')
+        
+        if len(jobs) == 0: return timingFileName
+        startTime = min(job.startTime for job in jobs if job.startTime is not None)
+        
+        with open(timingFileName, "w") as timingFile:
+            timingFile.write("chunk,points,start (sec),duration (sec),attempts,exit code\n")
+            for job, numOfPts in zip(jobs, lenOfPts):
+                if job.startTime is None: start = -1
+                else: start = job.startTime - startTime
+                timingFile.write("%d,%d,%.3f,%.3f,%d,%s\n"%(job.index, numOfPts, start, \
+                                 job.duration, job.attempts, job.returnCode))
+        
+        return timingFileName
+    
     def shiftList(self, list, number = 1):
         newList = []
         newList.extend(list[-number:])
@@ -2571,6 +3415,184 @@ class hb_WriteRAD(object):
                 fullStr.append(self.getsurfaceStr(surface.childSrfs[0], glzCount, glzCoorList))
         return ''.join(fullStr)
 
+class hb_OctreeCache(object):
+    """Content addressed cache of frozen scene octrees.
+    
+    The scene octree (materials, geometry and additional rad files) is frozen once into the
+    cache folder under the md5 hash of the content of the files. The sky is added on top of the
+    cached octree with oconv -i so runs that only change the sky, the test points or the
+    recipe reuse the scene octree. Least recently used octrees are removed once there are more
+    than maxOctrees of them.
+    
+    Usage:
+        cache = sc.sticky["honeybee_OctreeCache"]
+        batchFile.write(cache.oconvLines(octFileName, sceneRadFiles, [radSkyFileName]))
+    """
+    
+    version = 1
+    
+    def __init__(self, maxOctrees = 20):
+        self.maxOctrees = maxOctrees
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+    
+    @property
+    def cacheFolder(self):
+        return os.path.join(sc.sticky["Honeybee_DefaultFolder"], "octreeCache")
+    
+    def sceneKey(self, sceneFiles, resolution):
+        """md5 hash of the content of the scene files. None if one of the files is missing."""
+        md5 = hashlib.md5("%d %d\n"%(self.version, resolution))
+        for filePath in sceneFiles:
+            if not os.path.isfile(filePath): return None
+            md5.update("%d\n"%os.path.getsize(filePath))
+            with open(filePath, "rb") as inf:
+                for chunk in iter(lambda: inf.read(1048576), b""):
+                    md5.update(chunk)
+        return md5.hexdigest()
+    
+    def prune(self):
+        """Remove the least recently used octrees."""
+        try:
+            octFiles = [os.path.join(self.cacheFolder, f) for f in os.listdir(self.cacheFolder) if f.endswith(".oct")]
+            octFiles.sort(key = os.path.getmtime, reverse = True)
+        except OSError:
+            return
+        for octFile in octFiles[self.maxOctrees:]:
+            try: os.remove(octFile)
+            except OSError: pass
+    
+    def oconvLines(self, octFileName, sceneFiles, skyFiles, resolution = 2048):
+        """Batch lines that write octFileName.oct from the cached scene octree and the sky files.
+        
+        On a miss the lines build the scene octree into the cache first. If the scene can't be
+        hashed the whole octree is built with oconv -f as usual.
+        """
+        skyFilesStr = " ".join(address.replace("\\" , "/") for address in skyFiles)
+        key = self.sceneKey(sceneFiles, resolution)
+        
+        if key is None:
+            sceneFilesStr = " ".join(address.replace("\\" , "/") for address in sceneFiles)
+            return "oconv -r " + str(resolution) + " -f " + sceneFilesStr + " " + skyFilesStr + " > " + octFileName + ".oct\n"
+        
+        cachedOct = os.path.join(self.cacheFolder, key + ".oct")
+        lines = ""
+        with self.__lock:
+            if os.path.isfile(cachedOct):
+                self.hits += 1
+                print "Octree cache hit: the scene octree " + key + " is reused."
+                # keep it from being pruned
+                try: os.utime(cachedOct, None)
+                except OSError: pass
+            else:
+                self.misses += 1
+                print "Octree cache miss: the scene octree " + key + " will be built."
+                if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+                self.prune()
+                # build into a temporary file so a failed or parallel run doesn't leave a broken octree
+                tempOct = os.path.join(self.cacheFolder, key + "_" + uuid.uuid4().hex[:8] + ".tmp")
+                sceneFilesStr = " ".join(address.replace("\\" , "/") for address in sceneFiles)
+                lines += "oconv -r " + str(resolution) + " -f " + sceneFilesStr + ' > "' + tempOct + '"\n'
+                lines += 'if not errorlevel 1 move /Y "' + tempOct + '" "' + cachedOct + '" > nul\n'
+        
+        lines += 'oconv -f -i "' + cachedOct.replace("\\" , "/") + '" ' + skyFilesStr + " > " + octFileName + ".oct\n"
+        return lines
+
+class hb_AmbientCache(object):
+    """Persistent cache of Radiance ambient files for image based studies.
+    
+    Ambient files are keyed by the content of the scene (materials and geometry) and sky files
+    and by the ambient parameters (-ab -ad -as -ar -aa and the additional parameters). The cache
+    is warmed once with an overture run for all the views and every parallel rpict process starts
+    from its own copy of the warmed file so tiles never write to the same ambient file. Ambient files of earlier
+    scenes are kept so going back to a previous version of the model reuses its indirect
+    calculation. Least recently used files are removed once there are more than maxFiles of them.
+    
+    Usage:
+        cache = sc.sticky["honeybee_AmbientCache"]
+        key = cache.ambientKey(sceneRadFiles + [radSkyFileName], radParameters)
+        ambFile = cache.ambientFile(key)
+    """
+    
+    version = 1
+    
+    def __init__(self, maxFiles = 10):
+        self.maxFiles = maxFiles
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+    
+    @property
+    def cacheFolder(self):
+        return os.path.join(sc.sticky["Honeybee_DefaultFolder"], "ambientCache")
+    
+    @staticmethod
+    def ambientParameters(radParameters):
+        parameters = "-ab " + `radParameters["_ab_"]` + " -ad " + `radParameters["_ad_"]` + \
+                     " -as " + `radParameters["_as_"]` + " -ar " + `radParameters["_ar_"]` + \
+                     " -aa " + '%.3f'%radParameters["_aa_"]
+        if radParameters.has_key("additional"):
+            for par in radParameters["additional"]:
+                parameters += " -%s"%par
+        return parameters
+    
+    def ambientKey(self, sceneFiles, radParameters):
+        """Key of the ambient file. None if one of the scene files is missing."""
+        md5 = hashlib.md5("%d %s\n"%(self.version, self.ambientParameters(radParameters)))
+        for filePath in sceneFiles:
+            if not os.path.isfile(filePath): return None
+            md5.update("%d\n"%os.path.getsize(filePath))
+            with open(filePath, "rb") as inf:
+                for chunk in iter(lambda: inf.read(1048576), b""):
+                    md5.update(chunk)
+        return md5.hexdigest()
+    
+    def ambientFile(self, key):
+        return os.path.join(self.cacheFolder, key + ".amb")
+    
+    def prune(self):
+        """Remove the least recently used ambient files."""
+        try:
+            ambFiles = [os.path.join(self.cacheFolder, f) for f in os.listdir(self.cacheFolder) if f.endswith(".amb")]
+            ambFiles.sort(key = os.path.getmtime, reverse = True)
+        except OSError:
+            return
+        for ambFile in ambFiles[self.maxFiles:]:
+            try: os.remove(ambFile)
+            except OSError: pass
+    
+    def isWarm(self, key):
+        """Check if the ambient file for this key exists and log the hit or miss."""
+        ambFile = self.ambientFile(key)
+        with self.__lock:
+            if os.path.isfile(ambFile):
+                self.hits += 1
+                print "Ambient cache hit: the ambient file " + key + " is reused."
+                # keep it from being pruned
+                try: os.utime(ambFile, None)
+                except OSError: pass
+                return True
+            
+            self.misses += 1
+            print "Ambient cache miss: the ambient file " + key + " will be calculated."
+            if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+            self.prune()
+            return False
+    
+    def warmLines(self, key, overtureLines):
+        """Batch lines that run the overture lines into a temporary ambient file and move it to the cache.
+        
+        overtureLines is a function that gets the path to the ambient file and returns the lines.
+        """
+        tempAmb = os.path.join(self.cacheFolder, key + "_" + uuid.uuid4().hex[:8] + ".tmp")
+        return overtureLines(tempAmb) + \
+               'if exist "' + tempAmb + '" move /Y "' + tempAmb + '" "' + self.ambientFile(key) + '" > nul\n'
+    
+    def copyLine(self, key, localAmbFile):
+        """Batch line that copies the cached ambient file for a single rpict process."""
+        return 'if exist "' + self.ambientFile(key) + '" copy /Y "' + self.ambientFile(key) + '" ' + localAmbFile + ' > nul\n'
+
 class hb_WriteRADAUX(object):
     
     def __init__(self):
@@ -3042,7 +4064,7 @@ class hb_WriteRADAUX(object):
             
             # recalculate vh and vv
             if nXDiv != 1:
-                viewHA = (2.*180./PI)*math.atan(((PI/180./2.) * viewHA)/nXDiv)
+                viewHA = (2.*180./PI)*math.atan(math.tan((PI/180./2.)*viewHA)/nXDiv)
                 viewHSize = viewHSize/nXDiv
             if nYDiv != 1:
                 viewVA = (2.*180./PI)*math.atan(math.tan((PI/180./2.)*viewVA)/nYDiv)
@@ -3082,9 +4104,14 @@ class hb_WriteRADAUX(object):
             
         return view + " "
     
-    def oconvLine(self, octFileName, radFilesList):
+    def oconvLine(self, octFileName, radFilesList, skyFilesList = None):
         # sence files
         r = 1024 * 2
+        
+        if skyFilesList:
+            # freeze the scene into the octree cache and add the sky on top of it
+            return sc.sticky["honeybee_OctreeCache"].oconvLines(octFileName, radFilesList, skyFilesList, r)
+        
         senceFiles = ""
         for address in radFilesList: senceFiles = senceFiles + address.replace("\\" , "/") + " "
         
@@ -3092,9 +4119,12 @@ class hb_WriteRADAUX(object):
         
         return line
     
-    def overtureLine(self, view, projectName, viewName, radParameters, analysisType = 0):
+    def overtureLine(self, view, projectName, viewName, radParameters, analysisType = 0, ambFile = None):
         octFile = projectName + ".oct"
-        ambFile = projectName + ".amb" #amb file is view independent and can be used globally
+        if ambFile == None:
+            ambFile = projectName + ".amb" #amb file is view independent and can be used globally
+        else:
+            ambFile = '"' + ambFile + '"'
         unfFile = projectName + ".unf" 
         
         if analysisType==0:
@@ -3130,9 +4160,10 @@ class hb_WriteRADAUX(object):
         
         return line0 + line1_1 + line1_2 + line1_3 + line2
 
-    def rpictLine(self, view, projectName, viewName, radParameters, analysisType = 0, cpuCount = 0):
+    def rpictLine(self, view, projectName, viewName, radParameters, analysisType = 0, cpuCount = 0, ambFile = None):
         octFile = projectName + ".oct"
-        ambFile = projectName + ".amb" #amb file is view independent and can be used globally
+        if ambFile == None:
+            ambFile = projectName + ".amb" #amb file is view independent and can be used globally
         unfFile = projectName + "_" + viewName + "_" + `cpuCount` + ".unf" 
         outputFile = projectName + "_" + viewName + "_" + `cpuCount` + ".HDR"
         
@@ -3619,6 +4650,751 @@ class hb_ReadAnnualResultsAux(object):
         
         return illFiles
 
+class hb_IllMatrix(object):
+    """Binary cache for a Daysim .ill file.
+    
+    The values are stored as a float32 matrix of hours x points next to the .ill file
+    (e.g. project_0.ill > project_0.illb) with a small header. The header keeps the size
+    and modified time of the source file so the cache is ignored once the .ill file changes.
+    Reading one hour or one point doesn't need parsing the text file anymore.
+    
+    Usage:
+        illMatrix = hb_IllMatrix.load(illFile)
+        values = illMatrix.getHour(HOY)
+    """
+    
+    MAGIC = "HBILLMTX"
+    VERSION = 1
+    HEADERFORMAT = "<8sIIIdq" # magic, version, hours, points, source mtime, source size
+    HEADERSIZE = struct.calcsize(HEADERFORMAT)
+    EXTENSION = ".illb"
+    
+    def __init__(self, illFile, cacheFile, hoursCount, pointsCount):
+        self.illFile = illFile
+        self.cacheFile = cacheFile
+        self.hoursCount = hoursCount
+        self.pointsCount = pointsCount
+    
+    @classmethod
+    def cachePath(cls, illFile):
+        return os.path.splitext(illFile)[0] + cls.EXTENSION
+    
+    @staticmethod
+    def parseIllLine(line):
+        """Return illuminance values of a line of a .ill file. Returns None for comments and empty lines."""
+        line = line.strip()
+        if not line or line.startswith("#"): return None
+        # first three items are month, day and hour
+        return [float(v) for v in line.split()[3:]]
+    
+    @classmethod
+    def readHeader(cls, cacheFile):
+        with open(cacheFile, "rb") as inf:
+            header = inf.read(cls.HEADERSIZE)
+        if len(header) != cls.HEADERSIZE: return None
+        header = struct.unpack(cls.HEADERFORMAT, header)
+        if header[0] != cls.MAGIC or header[1] != cls.VERSION: return None
+        return header
+    
+    @classmethod
+    def isCacheValid(cls, illFile):
+        cacheFile = cls.cachePath(illFile)
+        if not os.path.isfile(illFile) or not os.path.isfile(cacheFile): return False
+        try:
+            header = cls.readHeader(cacheFile)
+        except Exception:
+            return False
+        if header is None: return False
+        stat = os.stat(illFile)
+        return header[4] == stat.st_mtime and header[5] == stat.st_size
+    
+    @classmethod
+    def convert(cls, illFile):
+        """Convert a .ill file to the binary cache and return the path to the cache file."""
+        cacheFile = cls.cachePath(illFile)
+        stat = os.stat(illFile)
+        hoursCount = 0
+        pointsCount = None
+        
+        try:
+            with open(illFile, "r") as inf, open(cacheFile, "wb") as outf:
+                # place holder for the header. counts are updated at the end
+                outf.write(struct.pack(cls.HEADERFORMAT, cls.MAGIC, cls.VERSION, 0, 0, 0, 0))
+                for line in inf:
+                    values = cls.parseIllLine(line)
+                    if values is None: continue
+                    if pointsCount is None:
+                        pointsCount = len(values)
+                    elif len(values) != pointsCount:
+                        raise ValueError("Inconsistent number of values in line %d of %s."%(hoursCount + 1, illFile))
+                    array.array("f", values).tofile(outf)
+                    hoursCount += 1
+                
+                outf.seek(0)
+                outf.write(struct.pack(cls.HEADERFORMAT, cls.MAGIC, cls.VERSION, hoursCount, \
+                                       pointsCount or 0, stat.st_mtime, stat.st_size))
+        except Exception:
+            if os.path.isfile(cacheFile): os.remove(cacheFile)
+            raise
+        
+        return cacheFile
+    
+    @classmethod
+    def load(cls, illFile, createIfMissing = True):
+        """Return an hb_IllMatrix for a .ill file.
+        
+        Args:
+            illFile: Path to a Daysim .ill file.
+            createIfMissing: Convert the .ill file if the cache is missing or outdated.
+        Returns:
+            hb_IllMatrix or None if there is no valid cache and createIfMissing is False
+            or the file can't be converted.
+        """
+        cacheFile = cls.cachePath(illFile)
+        if not cls.isCacheValid(illFile):
+            if not createIfMissing: return None
+            try:
+                cls.convert(illFile)
+            except Exception, e:
+                print "Failed to create binary cache for %s: %s"%(illFile, str(e))
+                return None
+        
+        header = cls.readHeader(cacheFile)
+        return cls(illFile, cacheFile, header[2], header[3])
+    
+    def _checkHour(self, hourIndex):
+        if not 0 <= hourIndex < self.hoursCount:
+            raise IndexError("Hour index %d is out of range [0-%d]."%(hourIndex, self.hoursCount - 1))
+    
+    def _checkPoint(self, ptIndex):
+        if not 0 <= ptIndex < self.pointsCount:
+            raise IndexError("Point index %d is out of range [0-%d]."%(ptIndex, self.pointsCount - 1))
+    
+    def getHourByIndex(self, hourIndex):
+        """Values of all the points for a zero-based hour index."""
+        self._checkHour(hourIndex)
+        values = array.array("f")
+        with open(self.cacheFile, "rb") as inf:
+            inf.seek(self.HEADERSIZE + hourIndex * self.pointsCount * values.itemsize)
+            values.fromfile(inf, self.pointsCount)
+        return values.tolist()
+    
+    def getHour(self, HOY):
+        """Values of all the points for an hour of the year (1-8760)."""
+        return self.getHourByIndex(int(HOY) - 1)
+    
+    def getPoints(self, ptIndices):
+        """Annual values for a number of points. Returns a list of lists in the same order as input."""
+        for ptIndex in ptIndices: self._checkPoint(ptIndex)
+        results = [[] for ptIndex in ptIndices]
+        # the file is stored hour by hour so read blocks of hours and pick the points from each row
+        for blockStart, blockCount, block in self.iterBlocks():
+            for result, ptIndex in itertools.izip(results, ptIndices):
+                result.extend(block[ptIndex::self.pointsCount])
+        return results
+    
+    def getPoint(self, ptIndex):
+        """Annual values for a single point."""
+        return self.getPoints([ptIndex])[0]
+    
+    def iterBlocks(self, hoursInBlock = 168, startHour = 0, endHour = None):
+        """Yield (blockStart, blockCount, values) for blocks of hours from startHour to endHour
+        (zero-based, end excluded). values is a flat array of blockCount rows of pointsCount values.
+        """
+        if endHour is None or endHour > self.hoursCount: endHour = self.hoursCount
+        with open(self.cacheFile, "rb") as inf:
+            inf.seek(self.HEADERSIZE + startHour * self.pointsCount * array.array("f").itemsize)
+            for blockStart in range(startHour, endHour, hoursInBlock):
+                blockCount = min(hoursInBlock, endHour - blockStart)
+                block = array.array("f")
+                block.fromfile(inf, blockCount * self.pointsCount)
+                yield blockStart, blockCount, block
+    
+    def iterHours(self, hoursInBlock = 168, startHour = 0, endHour = None):
+        """Yield (hourIndex, values) for hours from startHour to endHour (zero-based, end excluded).
+        
+        The file is read in blocks of hours.
+        """
+        for blockStart, blockCount, block in self.iterBlocks(hoursInBlock, startHour, endHour):
+            for count in range(blockCount):
+                yield blockStart + count, \
+                    block[count * self.pointsCount: (count + 1) * self.pointsCount].tolist()
+    
+    @classmethod
+    def getHourFromFiles(cls, illFiles, HOY):
+        """Values for an hour of the year from a list of .ill files which are split between CPUs."""
+        values = []
+        for illFile in illFiles:
+            values.extend(cls.load(illFile).getHour(HOY))
+        return values
+    
+    @classmethod
+    def iterHoursFromFiles(cls, illFiles, startHour = 0, endHour = None):
+        """Yield (hourIndex, values) for a list of .ill files which are split between CPUs.
+        Values of each hour are joined in the same order as the files.
+        """
+        iterators = [cls.load(illFile).iterHours(startHour = startHour, endHour = endHour) \
+                     for illFile in illFiles]
+        for rows in itertools.izip(*iterators):
+            values = []
+            for hourIndex, rowValues in rows: values.extend(rowValues)
+            yield rows[0][0], values
+    
+    @classmethod
+    def getPointFromFiles(cls, illFiles, ptIndex):
+        """Annual values for a point from a list of .ill files which are split between CPUs.
+        ptIndex is the index of the point in the flattened list of points for all the files.
+        """
+        for illFile in illFiles:
+            illMatrix = cls.load(illFile)
+            if ptIndex < illMatrix.pointsCount:
+                return illMatrix.getPoint(ptIndex)
+            ptIndex -= illMatrix.pointsCount
+        raise IndexError("Point index is out of range.")
+    
+    def __repr__(self):
+        return "Ill matrix: %d hours x %d points (%s)"%(self.hoursCount, self.pointsCount, self.illFile)
+
+
+class hb_AnnualDaylightMetrics(object):
+    """Calculate annual daylight metrics for all the points in a single pass over the hours.
+    
+    Daylight Autonomy (DA), continuous DA (cDA), Useful Daylight Illuminance (UDI),
+    spatial DA (sDA) and Annual Sunlight Exposure (ASE) are all calculated from the same
+    hours x points illuminance matrix so every component gets the same numbers.
+    
+    Args:
+        occupancy: A list of 8760 values. Hours with a value larger than occupancyThreshold
+            are considered occupied. Default is all the hours.
+        DAThreshold: Illuminance threshold for DA and cDA in lux (default: 300).
+        UDIThresholds: Lower and upper illuminance thresholds for UDI (default: 100, 2000).
+        sDAThreshold: Minimum percentage of occupied hours for a point to count for sDA (default: 50).
+        ASEThreshold: Illuminance threshold for ASE in lux (default: 1000).
+        ASEHours: Number of hours above ASEThreshold for a point to count for ASE (default: 250).
+        occupancyThreshold: Values larger than this number are considered occupied (default: 0.2).
+    """
+    
+    def __init__(self, occupancy = None, DAThreshold = 300, UDIThresholds = (100, 2000), \
+                 sDAThreshold = 50, ASEThreshold = 1000, ASEHours = 250, occupancyThreshold = 0.2):
+        
+        if occupancy is None: occupancy = [1] * 8760
+        self.occupancy = [float(v) > occupancyThreshold for v in occupancy]
+        self.DAThreshold = float(DAThreshold)
+        self.UDIMin, self.UDIMax = float(UDIThresholds[0]), float(UDIThresholds[1])
+        self.sDAThreshold = float(sDAThreshold)
+        self.ASEThreshold = float(ASEThreshold)
+        self.ASEHours = ASEHours
+    
+    @staticmethod
+    def occupancyFromWorkingHours(stHour = 8, endHour = 17, lunchStHour = None, lunchEndHour = None):
+        """Create an occupancy mask from working hours and lunch hours of each day."""
+        if lunchStHour is None:
+            lunchStHour = lunchEndHour = stHour + int((endHour - stHour)/2)
+        occupancy = []
+        for hour in range(8760):
+            hourOfDay = (hour + 1) % 24
+            occupancy.append(int(stHour <= hourOfDay < lunchStHour or lunchEndHour <= hourOfDay < endHour))
+        return occupancy
+    
+    @staticmethod
+    def occupancyFromFile(occFile):
+        """Read occupancy values from a Daysim occupancy file (month,day,hour,value)."""
+        occupancy = []
+        with open(occFile, "r") as inf:
+            for line in inf:
+                if line.startswith("#"): continue
+                try: occupancy.append(float(line.strip().split(",")[-1]))
+                except ValueError: pass
+        return occupancy
+    
+    @staticmethod
+    def shadingStates(shadingProfile, numOfStates):
+        """Index of the shading state in effect for each hour.
+        
+        Args:
+            shadingProfile: List of hourly values of a blind group from Daysim annual profiles.
+            numOfStates: Number of states for the shading group.
+        Returns:
+            A list of hourly indices. 0 is the case with no blinds and n is the n-th state.
+        """
+        states = []
+        for value in shadingProfile:
+            if value > 0: states.append(max(1, int(round(numOfStates * value))))
+            else: states.append(0)
+        return states
+    
+    @staticmethod
+    def spatialDA(DAValues, threshold = 50):
+        """Percentage of points with DA larger than or equal to threshold."""
+        if len(DAValues) == 0: return 0
+        return 100.0 * sum(1 for v in DAValues if v >= threshold) / len(DAValues)
+    
+    @staticmethod
+    def annualSunlightExposure(ASEHourCounts, hours = 250):
+        """Percentage of points which receive direct sunlight for more than number of hours."""
+        if len(ASEHourCounts) == 0: return 0
+        return 100.0 * sum(1 for v in ASEHourCounts if v > hours) / len(ASEHourCounts)
+    
+    @staticmethod
+    def readDaysimResultFile(resultFile):
+        """Read the values of a Daysim standard result file (.DA, .CDA or .UDI)."""
+        values = []
+        with open(resultFile, "r") as inf:
+            for line in inf:
+                if not line.startswith("#"):
+                    values.append(float(line.split("\t")[-1]))
+        return values
+    
+    @classmethod
+    def readDaysimResults(cls, DAFile, cDAFile, UDILessFile, UDIRangeFile, UDIMoreFile, sDAThreshold = 50):
+        """Read the metrics that Daysim calculated for one space.
+        
+        Daysim applies the occupancy, the dynamic blinds and the lighting control groups of the
+        study so the values can be different from calculate which only uses the occupancy and
+        the shading states of the .ill files.
+        Returns:
+            A dictionary with DA, cDA, UDILess, UDIRange, UDIMore (percentage for each point) and sDA.
+        """
+        DA = cls.readDaysimResultFile(DAFile)
+        return {"DA": DA, "cDA": cls.readDaysimResultFile(cDAFile),
+                "UDILess": cls.readDaysimResultFile(UDILessFile),
+                "UDIRange": cls.readDaysimResultFile(UDIRangeFile),
+                "UDIMore": cls.readDaysimResultFile(UDIMoreFile),
+                "sDA": cls.spatialDA(DA, sDAThreshold)}
+    
+    def calculateBlock(self, stateIllFiles, stateIndices = None, startHour = 0, endHour = 8760):
+        """Calculate hour counts for a block of hours.
+        
+        Each block only writes to its own lists so blocks can run in parallel.
+        Returns a list of [occupiedHours, DA, cDA, UDILess, UDIRange, UDIMore, ASE] counts.
+        """
+        DAThreshold, UDIMin, UDIMax, ASEThreshold = self.DAThreshold, self.UDIMin, self.UDIMax, self.ASEThreshold
+        occupancy = self.occupancy
+        
+        iterators = [hb_IllMatrix.iterHoursFromFiles(illFiles, startHour, endHour) for illFiles in stateIllFiles]
+        
+        counts = None
+        occupiedHours = 0
+        for rows in itertools.izip(*iterators):
+            hourIndex = rows[0][0]
+            if not occupancy[hourIndex]: continue
+            
+            # pick the values based on the state of shading for this hour
+            stateIndex = stateIndices[hourIndex] if stateIndices else 0
+            values = rows[stateIndex][1]
+            
+            if counts is None:
+                counts = [[0] * len(values) for i in range(6)]
+            DA, cDA, UDILess, UDIRange, UDIMore, ASE = counts
+            occupiedHours += 1
+            
+            for ptCount, value in enumerate(values):
+                if value >= DAThreshold:
+                    DA[ptCount] += 1
+                    cDA[ptCount] += 1
+                else:
+                    cDA[ptCount] += value / DAThreshold
+                
+                # same bands as the original components: a value at UDIMin is less and at UDIMax is in range
+                if value <= UDIMin: UDILess[ptCount] += 1
+                elif value <= UDIMax: UDIRange[ptCount] += 1
+                else: UDIMore[ptCount] += 1
+                
+                if value > ASEThreshold: ASE[ptCount] += 1
+        
+        if counts is None: counts = [[] for i in range(6)]
+        return [occupiedHours] + counts
+    
+    def calculate(self, stateIllFiles, stateIndices = None, parallel = False, numOfBlocks = 12):
+        """Calculate all the metrics.
+        
+        Args:
+            stateIllFiles: A list of .ill file lists. First list is the case with no blinds and the
+                next lists are states of the shading group. Each list can include several .ill files
+                which are split between CPUs.
+            stateIndices: Optional list of shading state for each hour. Use shadingStates to create it.
+            parallel: Set to True to calculate blocks of hours in parallel.
+            numOfBlocks: Number of hour blocks.
+        Returns:
+            A dictionary with DA, cDA, UDILess, UDIRange, UDIMore (percentage for each point),
+            ASEHours (number of hours for each point), sDA, ASE (percentage of points)
+            and occupiedHours.
+        """
+        if isinstance(stateIllFiles[0], basestring): stateIllFiles = [stateIllFiles]
+        
+        # create the binary cache for all the files before reading them in parallel
+        for illFiles in stateIllFiles:
+            for illFile in illFiles: hb_IllMatrix.load(illFile)
+        
+        hoursCount = hb_IllMatrix.load(stateIllFiles[0][0]).hoursCount
+        blockSize = int(math.ceil(hoursCount / float(numOfBlocks)))
+        blocks = [(st, min(st + blockSize, hoursCount)) for st in range(0, hoursCount, blockSize)]
+        blockResults = [None] * len(blocks)
+        
+        def calculateBlock(i):
+            blockResults[i] = self.calculateBlock(stateIllFiles, stateIndices, blocks[i][0], blocks[i][1])
+        
+        if parallel:
+            tasks.Parallel.ForEach(range(len(blocks)), calculateBlock)
+        else:
+            for i in range(len(blocks)): calculateBlock(i)
+        
+        # put the blocks together
+        occupiedHours = sum(res[0] for res in blockResults)
+        numOfPts = max(len(res[1]) for res in blockResults)
+        totals = [[0] * numOfPts for i in range(6)]
+        for res in blockResults:
+            for metricCount, counts in enumerate(res[1:]):
+                total = totals[metricCount]
+                for ptCount, count in enumerate(counts): total[ptCount] += count
+        
+        if occupiedHours == 0: occupiedHours = 1 # avoid division by zero
+        DA, cDA, UDILess, UDIRange, UDIMore = \
+            [[100.0 * count / occupiedHours for count in metricTotals] for metricTotals in totals[:5]]
+        
+        return {"DA": DA, "cDA": cDA, "UDILess": UDILess, "UDIRange": UDIRange, "UDIMore": UDIMore,
+                "ASEHours": totals[5], "sDA": self.spatialDA(DA, self.sDAThreshold),
+                "ASE": self.annualSunlightExposure(totals[5], self.ASEHours),
+                "occupiedHours": occupiedHours}
+
+
+class hb_SkyPatchIndex(object):
+    """Find the sky patch that a vector falls in without intersecting the patch geometries.
+    
+    The patches are the Tregenza patches (or their Reinhart subdivisions) from Ladybug's
+    generateSkyGeo. The rows and the azimuth step of each row are read from the patch
+    geometry once. After that the patch of a vector is found from its altitude and azimuth.
+    
+    Usage:
+        skyIndex = hb_SkyPatchIndex.fromSkyPatches(skyPatches)
+        sunPatches = skyIndex.getPatches(sunVectors)
+    """
+    
+    def __init__(self, patchCenters, patchCorners):
+        """
+        Args:
+            patchCenters: A list of (x, y, z) for the center of each patch.
+            patchCorners: A list of lists of (x, y, z) for the vertices of each patch.
+        """
+        self.patchVectors = patchCenters
+        self.numOfPatches = len(patchCenters)
+        
+        # group the patches to rows by the altitude of their centers
+        rows = {}
+        for count, center in enumerate(patchCenters):
+            alt, az = self.altAz(center)
+            rows.setdefault(round(alt, 2), []).append((az, count))
+        
+        # each row is (lower altitude, first azimuth, azimuth step, patch indices sorted by azimuth)
+        # rows are next to each other so a row starts where the vertices of the row below end.
+        self.rows = []
+        upperAlt = None
+        for alt in sorted(rows.keys()):
+            patches = sorted(rows[alt])
+            cornerAlts = [self.altAz(pt)[0] for patchAz, patchCount in patches for pt in patchCorners[patchCount]]
+            lowerAlt = min(cornerAlts) if upperAlt is None else upperAlt
+            upperAlt = max(cornerAlts)
+            self.rows.append((lowerAlt, patches[0][0], 360.0 / len(patches), [patchCount for patchAz, patchCount in patches]))
+        self.lowerAlts = [row[0] for row in self.rows]
+    
+    @classmethod
+    def fromSkyPatches(cls, skyPatches):
+        """Create the index from the sky patch breps of lb_preparation.generateSkyGeo."""
+        patchCenters = []
+        patchCorners = []
+        for patch in skyPatches:
+            cenPt = rc.Geometry.AreaMassProperties.Compute(patch).Centroid
+            patchCenters.append((cenPt.X, cenPt.Y, cenPt.Z))
+            patchCorners.append([(pt.X, pt.Y, pt.Z) for pt in patch.DuplicateVertices()])
+        return cls(patchCenters, patchCorners)
+    
+    @staticmethod
+    def altAz(vector):
+        """Altitude and azimuth of a vector in degrees. Azimuth is clockwise from +Y."""
+        x, y, z = vector[0], vector[1], vector[2]
+        alt = math.degrees(math.atan2(z, math.sqrt(x * x + y * y)))
+        az = math.degrees(math.atan2(x, y)) % 360
+        return alt, az
+    
+    def getPatch(self, vector):
+        """Index of the patch for a vector. None if the vector is None or below the horizon."""
+        if vector is None: return None
+        alt, az = self.altAz(vector)
+        rowCount = bisect.bisect_right(self.lowerAlts, alt + 1e-9) - 1
+        if rowCount < 0: return None
+        lowerAlt, firstAz, azStep, patches = self.rows[rowCount]
+        patchCount = int(math.floor((az - firstAz) / azStep + 0.5)) % len(patches)
+        return patches[patchCount]
+    
+    def getPatches(self, vectors):
+        """Index of the patch for each vector. This is usually called once for all the sun vectors."""
+        return [self.getPatch(vector) for vector in vectors]
+
+
+class hb_MeshBVH(object):
+    """Bounding volume hierarchy over a list of meshes to cast many rays against them.
+    
+    The leaves of the tree are the meshes (e.g. zone surfaces). A ray is only intersected with
+    the meshes whose bounding boxes it passes through and, for the nearest hit, the meshes
+    are tested from the nearest box and the search stops once the boxes are farther than the hit.
+    
+    Meshes can be Rhino meshes or lists of triangles as ((x,y,z), (x,y,z), (x,y,z)).
+    The triangles are intersected in Python so the class can be used without Rhino.
+    
+    Usage:
+        bvh = hb_MeshBVH(zoneSrfsMesh)
+        srfIndices = bvh.nearestHits(point, viewVectors)
+    """
+    
+    def __init__(self, meshes, leafSize=2, padding=1e-5):
+        self.meshes = meshes
+        self.leafSize = leafSize
+        self.isRhinoMesh = [not isinstance(mesh, (list, tuple)) for mesh in meshes]
+        
+        boxes = [self.boundingBox(mesh, padding) for mesh in meshes]
+        # nodes are [boxMin, boxMax, leftNode, rightNode, meshIndices]
+        self.nodes = []
+        if len(meshes) != 0:
+            self.__build(range(len(meshes)), boxes)
+    
+    @staticmethod
+    def boundingBox(mesh, padding=0):
+        if isinstance(mesh, (list, tuple)):
+            pts = [pt for triangle in mesh for pt in triangle]
+            boxMin = [min(pt[i] for pt in pts) - padding for i in range(3)]
+            boxMax = [max(pt[i] for pt in pts) + padding for i in range(3)]
+        else:
+            bb = mesh.GetBoundingBox(True)
+            boxMin = [bb.Min.X - padding, bb.Min.Y - padding, bb.Min.Z - padding]
+            boxMax = [bb.Max.X + padding, bb.Max.Y + padding, bb.Max.Z + padding]
+        return boxMin, boxMax
+    
+    def __build(self, indices, boxes):
+        boxMin = [min(boxes[i][0][axis] for i in indices) for axis in range(3)]
+        boxMax = [max(boxes[i][1][axis] for i in indices) for axis in range(3)]
+        nodeIndex = len(self.nodes)
+        self.nodes.append([boxMin, boxMax, None, None, None])
+        
+        if len(indices) <= self.leafSize:
+            self.nodes[nodeIndex][4] = list(indices)
+            return nodeIndex
+        
+        # split the meshes in half along the longest axis of their centers
+        centers = dict((i, [(boxes[i][0][axis] + boxes[i][1][axis]) / 2.0 for axis in range(3)]) for i in indices)
+        extents = [max(centers[i][axis] for i in indices) - min(centers[i][axis] for i in indices) for axis in range(3)]
+        axis = extents.index(max(extents))
+        indices = sorted(indices, key=lambda i: centers[i][axis])
+        half = len(indices) // 2
+        
+        self.nodes[nodeIndex][2] = self.__build(indices[:half], boxes)
+        self.nodes[nodeIndex][3] = self.__build(indices[half:], boxes)
+        return nodeIndex
+    
+    @staticmethod
+    def boxEntry(boxMin, boxMax, origin, invDir):
+        """Ray parameter where the ray enters the box or None if the ray misses the box."""
+        tMin = 0.0
+        tMax = float('inf')
+        for axis in range(3):
+            if invDir[axis] is None:
+                if origin[axis] < boxMin[axis] or origin[axis] > boxMax[axis]: return None
+                continue
+            t1 = (boxMin[axis] - origin[axis]) * invDir[axis]
+            t2 = (boxMax[axis] - origin[axis]) * invDir[axis]
+            if t1 > t2: t1, t2 = t2, t1
+            if t1 > tMin: tMin = t1
+            if t2 < tMax: tMax = t2
+            if tMin > tMax: return None
+        return tMin
+    
+    @staticmethod
+    def intersectTriangles(triangles, origin, direction):
+        """Nearest ray parameter that hits a list of triangles or -1 (Moller-Trumbore)."""
+        nearest = -1
+        for p0, p1, p2 in triangles:
+            e1 = (p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2])
+            e2 = (p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2])
+            p = (direction[1] * e2[2] - direction[2] * e2[1],
+                 direction[2] * e2[0] - direction[0] * e2[2],
+                 direction[0] * e2[1] - direction[1] * e2[0])
+            det = e1[0] * p[0] + e1[1] * p[1] + e1[2] * p[2]
+            if abs(det) < 1e-12: continue
+            invDet = 1.0 / det
+            s = (origin[0] - p0[0], origin[1] - p0[1], origin[2] - p0[2])
+            u = (s[0] * p[0] + s[1] * p[1] + s[2] * p[2]) * invDet
+            if u < 0 or u > 1: continue
+            q = (s[1] * e1[2] - s[2] * e1[1], s[2] * e1[0] - s[0] * e1[2], s[0] * e1[1] - s[1] * e1[0])
+            v = (direction[0] * q[0] + direction[1] * q[1] + direction[2] * q[2]) * invDet
+            if v < 0 or u + v > 1: continue
+            t = (e2[0] * q[0] + e2[1] * q[1] + e2[2] * q[2]) * invDet
+            if t >= 0 and (nearest < 0 or t < nearest): nearest = t
+        return nearest
+    
+    def intersectMesh(self, meshIndex, origin, direction, ray):
+        """Ray parameter of the hit with a mesh or -1 if the ray misses the mesh."""
+        if self.isRhinoMesh[meshIndex]:
+            return rc.Geometry.Intersect.Intersection.MeshRay(self.meshes[meshIndex], ray)
+        return self.intersectTriangles(self.meshes[meshIndex], origin, direction)
+    
+    @staticmethod
+    def __ray(origin, direction):
+        o = (origin[0], origin[1], origin[2])
+        d = (direction[0], direction[1], direction[2])
+        invDir = [1.0 / d[axis] if d[axis] != 0 else None for axis in range(3)]
+        try: ray = rc.Geometry.Ray3d(origin, direction)
+        except: ray = None
+        return o, d, invDir, ray
+    
+    def nearestHit(self, origin, direction):
+        """Index of the nearest mesh that the ray hits and the ray parameter of the hit.
+        
+        Returns (None, None) if the ray doesn't hit any of the meshes.
+        """
+        if len(self.nodes) == 0: return None, None
+        o, d, invDir, ray = self.__ray(origin, direction)
+        nodes = self.nodes
+        
+        nearestIndex, nearestT = None, None
+        stack = [(0.0, 0)]
+        while stack:
+            entry, nodeIndex = stack.pop()
+            if nearestT is not None and entry > nearestT: continue
+            boxMin, boxMax, left, right, meshIndices = nodes[nodeIndex]
+            if meshIndices is not None:
+                for meshIndex in meshIndices:
+                    t = self.intersectMesh(meshIndex, o, d, ray)
+                    if t < 0: continue
+                    # the lower index wins if two meshes are hit at the same distance
+                    if nearestT is None or t < nearestT or (t == nearestT and meshIndex < nearestIndex):
+                        nearestIndex, nearestT = meshIndex, t
+                continue
+            
+            children = []
+            for child in (left, right):
+                childEntry = self.boxEntry(nodes[child][0], nodes[child][1], o, invDir)
+                if childEntry is not None: children.append((childEntry, child))
+            # push the farther child first so the nearer one is tested first
+            children.sort(reverse=True)
+            stack.extend(children)
+        
+        return nearestIndex, nearestT
+    
+    def allHits(self, origin, direction):
+        """Sorted indices of all the meshes that the ray hits."""
+        if len(self.nodes) == 0: return []
+        o, d, invDir, ray = self.__ray(origin, direction)
+        nodes = self.nodes
+        
+        hits = []
+        if self.boxEntry(nodes[0][0], nodes[0][1], o, invDir) is None: return hits
+        stack = [0]
+        while stack:
+            boxMin, boxMax, left, right, meshIndices = nodes[stack.pop()]
+            if meshIndices is not None:
+                for meshIndex in meshIndices:
+                    if self.intersectMesh(meshIndex, o, d, ray) >= 0: hits.append(meshIndex)
+                continue
+            for child in (left, right):
+                if self.boxEntry(nodes[child][0], nodes[child][1], o, invDir) is not None:
+                    stack.append(child)
+        
+        return sorted(hits)
+    
+    def nearestHits(self, origin, directions):
+        """Index of the nearest mesh (or None) for a batch of rays from the same origin."""
+        return [self.nearestHit(origin, direction)[0] for direction in directions]
+    
+    def transmissionHits(self, origin, directions, opaqueCount, transmittances):
+        """Cast a batch of rays through windows.
+        
+        The first opaqueCount meshes are opaque and the rest are windows with transmittances.
+        
+        Returns:
+            A list of (transmittance, window indices) for each ray. The transmittance of a
+            blocked ray is 0 and its window indices are None.
+        """
+        results = []
+        for direction in directions:
+            hits = self.allHits(origin, direction)
+            if len(hits) != 0 and hits[0] < opaqueCount:
+                results.append((0, None))
+                continue
+            transmiss = 1
+            windowIndices = []
+            for meshIndex in hits:
+                transmiss = transmiss * transmittances[meshIndex - opaqueCount]
+                windowIndices.append(meshIndex - opaqueCount)
+            results.append((transmiss, windowIndices))
+        return results
+
+
+class hb_ZonePointIndex(object):
+    """Find the zones that contain a point without testing the point against every zone.
+    
+    The bounding box of each zone is kept in an R-tree and the exact Brep containment
+    test is only run on the zones whose boxes contain the point. The index is meant to be
+    built once for a list of closed zone breps and queried for all the test points of a
+    comfort or view factor analysis.
+    
+    Usage:
+        zoneIndex = hb_ZonePointIndex(zoneBreps, tol)
+        pointZones = zoneIndex.getZones(zoneIndex.faceCentroids(mesh), len(zoneBreps))
+    """
+    
+    def __init__(self, zoneBreps, tol=None):
+        self.zoneBreps = zoneBreps
+        self.tol = tol if tol is not None else sc.doc.ModelAbsoluteTolerance
+        self.tree = rc.Geometry.RTree()
+        for count, zone in enumerate(zoneBreps):
+            bb = zone.GetBoundingBox(False)
+            bb.Inflate(self.tol)
+            self.tree.Insert(bb, count)
+    
+    @staticmethod
+    def faceCentroid(vertices, face):
+        """Area centroid of a mesh face from the Point3d array of the mesh vertices."""
+        ptA, ptB, ptC = vertices[face.A], vertices[face.B], vertices[face.C]
+        if not face.IsQuad:
+            return (ptA + ptB + ptC) / 3.0
+        ptD = vertices[face.D]
+        area1 = rc.Geometry.Vector3d.CrossProduct(ptB - ptA, ptC - ptA).Length
+        area2 = rc.Geometry.Vector3d.CrossProduct(ptC - ptA, ptD - ptA).Length
+        if area1 + area2 == 0:
+            return (ptA + ptB + ptC + ptD) / 4.0
+        return (ptA + ptB + ptC) * (area1 / (3 * (area1 + area2))) + \
+               (ptA + ptC + ptD) * (area2 / (3 * (area1 + area2)))
+    
+    @classmethod
+    def faceCentroids(cls, mesh):
+        """Area centroids of all the faces of a mesh."""
+        vertices = mesh.Vertices.ToPoint3dArray()
+        return [cls.faceCentroid(vertices, face) for face in mesh.Faces]
+    
+    def getCandidates(self, point):
+        """Sorted indices of the zones whose bounding boxes contain the point."""
+        ids = []
+        def collect(sender, e):
+            ids.append(e.Id)
+        self.tree.Search(rc.Geometry.BoundingBox(point, point), collect)
+        return sorted(ids)
+    
+    def zonesOfPoint(self, point):
+        """Indices of all the zones that contain the point."""
+        return [count for count in self.getCandidates(point) \
+                if self.zoneBreps[count].IsPointInside(point, self.tol, False)]
+    
+    def getZone(self, point, default=None):
+        """Index of the first zone that contains the point or default if the point is outside all zones."""
+        for count in self.getCandidates(point):
+            if self.zoneBreps[count].IsPointInside(point, self.tol, False):
+                return count
+        return default
+    
+    def getZones(self, points, default=None):
+        """Index of the zone for each point. Points outside all the zones get the default."""
+        return [self.getZone(point, default) for point in points]
+
+
 class hb_EnergySimulatioParameters(object):
     
     def readEPParams(self, EPParameters):
@@ -3868,19 +5644,17 @@ class EPMaterialAux(object):
         kWords = []
         for kw in keywords:
             kWords.append(kw.strip().upper().split(" "))
-            
-        selectedItems = []
-        alternateOptions = []
         
+        if len(kWords) == 0 or "*" in keywords:
+            return list(inputList)
+        
+        selectedItems = []
         for item in inputList:
-            if len(kWords)!= 0 and not "*" in keywords:
-                for keyword in kWords:
-                    if len(keyword) > 1 and checkMultipleKeywords(item.ToUpper(), keyword):
-                        selectedItems.append(item)
-                    elif len(keyword) == 1 and item.ToUpper().find(keyword[0])!= -1:
-                        selectedItems.append(item)
-            else:
-                selectedItems.append(item)
+            # upper case each item once and not once for every keyword
+            upperItem = item.ToUpper()
+            for keyword in kWords:
+                if checkMultipleKeywords(upperItem, keyword):
+                    selectedItems.append(item)
     
         return selectedItems
     
@@ -3900,33 +5674,40 @@ class EPMaterialAux(object):
         
         selConstr =[]
         
-        filtConstr =self.searchListByKeyword(constrList, keywords)
+        # check the standard and the surface type first so the keyword search only sees the matching names
+        standardUpper, surfaceTypeUpper = standard.upper(), surfaceType.upper()
+        matchingConstr = []
+        for cnstrName in constrList:
+            cnstrNameUpper = cnstrName.upper()
+            if cnstrNameUpper.find(standardUpper)!=-1 and cnstrNameUpper.find(surfaceTypeUpper)!=-1:
+                matchingConstr.append(cnstrName)
+        
+        filtConstr =self.searchListByKeyword(matchingConstr, keywords)
         
         
         for cnstrName in filtConstr:
-           if cnstrName.upper().find(standard.upper())!=-1 and cnstrName.upper().find(surfaceType.upper())!=-1:
-                # check for climate zone
-                if climateZone!="":
-                    clmZones = []
-                    # split by space " "
-                    possibleAlt, zoneCode = cnstrName.split(" ")[-2:]
-                    clmZoneList = zoneCode.split("-")
-                    if len(clmZoneList) != 1:
-                        try:
-                            clmZoneRange = range(int(clmZoneList[0]), int(clmZoneList[1]) + 1)
-                            for clmZone in clmZoneRange: clmZones.append(str(clmZone))
-                        except:
-                            clmZones = [clmZoneList[0], clmZoneList[1]]
-                    else:
-                        clmZones = clmZoneList
-                        
-                    if climateZone in clmZones:
-                        selConstr.append(cnstrName)
-                    elif climateZone[0] in clmZones:
-                        # cases like 3a that is included in 3
-                        selConstr.append(cnstrName)
+            # check for climate zone
+            if climateZone!="":
+                clmZones = []
+                # split by space " "
+                possibleAlt, zoneCode = cnstrName.split(" ")[-2:]
+                clmZoneList = zoneCode.split("-")
+                if len(clmZoneList) != 1:
+                    try:
+                        clmZoneRange = range(int(clmZoneList[0]), int(clmZoneList[1]) + 1)
+                        for clmZone in clmZoneRange: clmZones.append(str(clmZone))
+                    except:
+                        clmZones = [clmZoneList[0], clmZoneList[1]]
                 else:
+                    clmZones = clmZoneList
+                    
+                if climateZone in clmZones:
+                    selConstr.append(cnstrName)
+                elif climateZone[0] in clmZones:
+                    # cases like 3a that is included in 3
                     selConstr.append(cnstrName)
+            else:
+                selConstr.append(cnstrName)
 
         return selConstr
 
@@ -4262,27 +6043,17 @@ class EPObjectsAux(object):
         
         return True, name
     
-    def getEPObjectDataByName(self, objectName):
-        objectData = None
-        
-        objectName = objectName.upper()
-        
-        if objectName in sc.sticky ["honeybee_windowMaterialLib"].keys():
-            objectData = sc.sticky ["honeybee_windowMaterialLib"][objectName]
-        elif objectName in sc.sticky ["honeybee_materialLib"].keys():
-            objectData = sc.sticky ["honeybee_materialLib"][objectName]
-        elif objectName in sc.sticky ["honeybee_constructionLib"].keys():
-            objectData = sc.sticky ["honeybee_constructionLib"][objectName]
-        elif objectName in sc.sticky["honeybee_ScheduleLib"].keys():
-            objectData = sc.sticky ["honeybee_ScheduleLib"][objectName]
-        elif objectName in sc.sticky["honeybee_ScheduleTypeLimitsLib"].keys():
-            objectData = sc.sticky ["honeybee_ScheduleTypeLimitsLib"][objectName]
-        elif objectName in sc.sticky["honeybee_WindowPropLib"].keys():
-            objectData = sc.sticky["honeybee_WindowPropLib"][objectName]
-        elif objectName in sc.sticky["honeybee_SpectralDataLib"].keys():
-            objectData = sc.sticky["honeybee_SpectralDataLib"][objectName]
+    def getEPObjectDataByName(self, objectName):
+        objectName = objectName.upper()
         
-        return objectData
+        # the libraries are dictionaries by name so look the name up in each of them in order.
+        for libraryName in ("honeybee_windowMaterialLib", "honeybee_materialLib", "honeybee_constructionLib",
+                            "honeybee_ScheduleLib", "honeybee_ScheduleTypeLimitsLib",
+                            "honeybee_WindowPropLib", "honeybee_SpectralDataLib"):
+            objectData = sc.sticky[libraryName].get(objectName)
+            if objectData is not None: return objectData
+        
+        return None
     
     def getEPObjectsStr(self, objectName):
         """
@@ -4354,19 +6125,310 @@ class EPObjectsAux(object):
             component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warningMsg)
             return
 
+class hb_ScheduleCompiler(object):
+    """Compile Honeybee schedules into annual arrays of hourly values once.
+    
+    Schedule:Day:Interval, Schedule:Week:Daily, Schedule:Year, Schedule:Constant and
+    Schedule:Compact objects of the schedule library and Honeybee csv schedules are turned into
+    an array of 8760 values (8760 times the timesteps per hour for csv schedules). Day and week
+    schedules are parsed once and shared by all the schedules that use them.
+    
+    Results are memoized by schedule name, start day of the week and holidays. Each result keeps
+    the library entries (or the csv file stamp) it was compiled from and is compiled again once
+    one of them changes.
+    
+    Usage:
+        compiler = sc.sticky["honeybee_ScheduleCompiler"]
+        values = compiler.annualValues("OFFICE OCCUPANCY", startDayOfTheWeek=0, holidays=[0, 358])
+    """
+    
+    compactKeywords = ['Weekdays', 'Weekends', 'Alldays', 'AllOtherDays', 'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    
+    def __init__(self):
+        self.__entries = {}
+        # dependencies of the schedules that are being compiled. The last one is the innermost.
+        self.__dependencies = []
+        self.__lock = threading.RLock()
+        self.lb_preparation = None
+    
+    # library access
+    def __signature(self, dependency):
+        kind, name = dependency
+        if kind == "csv":
+            try: stat = os.stat(name)
+            except OSError: return None
+            return stat.st_mtime, stat.st_size
+        elif kind == "limits":
+            entry = sc.sticky["honeybee_ScheduleTypeLimitsLib"].get(name)
+        else:
+            entry = sc.sticky["honeybee_ScheduleLib"].get(name)
+        if entry is None: return None
+        return tuple(sorted(entry.items()))
+    
+    def __depend(self, dependency):
+        if len(self.__dependencies) != 0:
+            self.__dependencies[-1][dependency] = self.__signature(dependency)
+    
+    def __memoize(self, key, compileFunction):
+        """Return the memoized result for key or compile it and record what it depends on."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                dependencies, result = entry
+                if all(self.__signature(dependency) == signature \
+                       for dependency, signature in dependencies.iteritems()):
+                    if len(self.__dependencies) != 0:
+                        self.__dependencies[-1].update(dependencies)
+                    return result
+            
+            self.__dependencies.append({})
+            try:
+                result = compileFunction()
+            finally:
+                dependencies = self.__dependencies.pop()
+            self.__entries[key] = (dependencies, result)
+            if len(self.__dependencies) != 0:
+                self.__dependencies[-1].update(dependencies)
+            return result
+    
+    def scheduleValues(self, schName):
+        """Fields of a schedule in the library (see EPScheduleAux.getScheduleDataByName)."""
+        schName = schName.upper()
+        self.__depend(("schedule", schName))
+        entry = sc.sticky["honeybee_ScheduleLib"].get(schName)
+        if entry is None:
+            raise ValueError("Failed to find %s in the Honeybee schedule library."%schName)
+        values = []
+        for layer in entry.keys():
+            try:
+                value, comment = entry[layer]
+                values.append(value)
+            except:
+                values.append(entry[layer])
+        return values
+    
+    def numericType(self, typeLimitName):
+        typeLimitName = typeLimitName.upper()
+        self.__depend(("limits", typeLimitName))
+        values, comments = EPScheduleAux().getScheduleTypeLimitsDataByName(typeLimitName)
+        try: return values[3]
+        except: return "Continuous"
+    
+    def clear(self):
+        with self.__lock:
+            self.__entries = {}
+    
+    # day and week schedules
+    @staticmethod
+    def parseUntil(untilTime):
+        """Hour of an 'Until: hh:mm' or 'hh:mm' field. Minutes are ignored as EnergyPlus is run hourly."""
+        hours, minutes = map(int, untilTime.split(":")[-2:])
+        return int(hours + minutes/60)
+    
+    @staticmethod
+    def fillDay(untilValues, isDistrict):
+        """24 hourly values from a list of (until hour, value)."""
+        hourlyValues = range(24)
+        startHour = 0
+        for endHour, value in untilValues:
+            for hour in range(startHour, endHour):
+                hourlyValues[hour] = value
+            startHour = endHour
+        if isDistrict:
+            hourlyValues = map(int, hourlyValues)
+        return tuple(hourlyValues)
+    
+    def dayValues(self, schName):
+        """24 hourly values of a Schedule:Day:Interval."""
+        def compileDay():
+            values = self.scheduleValues(schName)
+            isDistrict = self.numericType(values[1]).strip().lower() == "district"
+            numberOfDaySch = int((len(values) - 3) /2)
+            untilValues = [(self.parseUntil(values[2 * i + 3]), float(values[2 * i + 4])) \
+                           for i in range(numberOfDaySch)]
+            return self.fillDay(untilValues, isDistrict)
+        return self.__memoize(("day", schName.upper()), compileDay)
+    
+    def weekValues(self, schName):
+        """Day schedules of a Schedule:Week:Daily from Sunday to Saturday followed by the holiday,
+        summer design day, winter design day and the two custom day schedules."""
+        def compileWeek():
+            values = self.scheduleValues(schName)
+            return tuple(self.dayValues(dayName) for dayName in values[1:13])
+        return self.__memoize(("week", schName.upper()), compileWeek)
+    
+    def compactValues(self, schName):
+        """Day schedules of a Schedule:Compact and the index of the day schedule of each day of
+        the week from Sunday to Saturday."""
+        def compileCompact():
+            values = self.scheduleValues(schName)
+            isDistrict = self.numericType(values[1]).strip().lower() == "district"
+            
+            #Separate out the different periods.
+            totalValues = []
+            periodValues = []
+            headerDone = False
+            for val in values:
+                newPeriod = False
+                for word in self.compactKeywords:
+                    if word in val: newPeriod = True
+                if newPeriod == True:
+                    if headerDone == True:
+                        totalValues.append(periodValues)
+                    periodValues = [val]
+                    headerDone = True
+                elif headerDone == True:
+                    periodValues.append(val)
+            totalValues.append(periodValues)
+            
+            #For each day period, construct a day schedule.
+            dayType = []
+            dayValues = []
+            for dayVals in totalValues:
+                dayType.append(dayVals[0].title().split('For: ')[-1])
+                numberOfDaySch = int((len(dayVals) - 1) /2)
+                untilValues = [(self.parseUntil(dayVals[2 * i + 1]), float(dayVals[2 * i + 2])) \
+                               for i in range(numberOfDaySch)]
+                dayValues.append(self.fillDay(untilValues, isDistrict))
+            
+            #Map the dayTypes to the days of the week.
+            weekVals = [-1, -1, -1, -1, -1, -1, -1]
+            for typeCount, type in enumerate(dayType):
+                if type == 'Alldays':
+                    for count, val in enumerate(weekVals):
+                        weekVals[count] = typeCount
+                elif type == 'Weekdays':
+                    for count, val in enumerate(weekVals):
+                        if count < 6 and count != 0: weekVals[count] = typeCount
+                elif type == 'Weekends':
+                    weekVals[0] = typeCount
+                    weekVals[-1] = typeCount
+                elif type == 'Sunday': weekVals[0] = typeCount
+                elif type == 'Monday': weekVals[1] = typeCount
+                elif type == 'Tuesday': weekVals[2] = typeCount
+                elif type == 'Wednesday': weekVals[3] = typeCount
+                elif type == 'Thursday': weekVals[4] = typeCount
+                elif type == 'Friday': weekVals[5] = typeCount
+                elif type == 'Saturday': weekVals[6] = typeCount
+                elif type == 'Allotherdays':
+                    for count, val in enumerate(weekVals):
+                        if val == -1: weekVals[count] = typeCount
+            
+            return tuple(dayValues), tuple(weekVals)
+        return self.__memoize(("compact", schName.upper()), compileCompact)
+    
+    def yearWeeks(self, schName):
+        """(week schedule name, start day, end day) of each period of a Schedule:Year. Days are 1-based."""
+        def compileYear():
+            if self.lb_preparation is None:
+                self.lb_preparation = sc.sticky["ladybug_Preparation"]()
+            values = self.scheduleValues(schName)
+            periods = []
+            for i in range(int((len(values)-2)/5)):
+                startDay = int(self.lb_preparation.getJD(int(values[5 * i + 3]), int(values[5 * i + 4])))
+                endDay = int(self.lb_preparation.getJD(int(values[5 * i + 5]), int(values[5 * i + 6])))
+                periods.append((values[5 * i + 2], startDay, endDay))
+            return tuple(periods)
+        return self.__memoize(("year", schName.upper()), compileYear)
+    
+    def scheduleType(self, schName):
+        if schName.lower().endswith(".csv"): return "csv"
+        return self.scheduleValues(schName)[0].lower()
+    
+    def yearDays(self, schName, startDayOfTheWeek=0):
+        """Day schedule of each of the 365 days of a Schedule:Year as ReadEPSchedules returns it.
+        Days that are not in any period keep their index."""
+        def compileYearDays():
+            days = range(365)
+            for weekName, startDay, endDay in self.yearWeeks(schName):
+                week = self.weekValues(weekName)[:7]
+                week = week[startDayOfTheWeek:] + week[:startDayOfTheWeek]
+                for day in range(startDay-1, endDay):
+                    days[day] = week[day%7]
+            return tuple(days)
+        return self.__memoize(("yearDays", schName.upper(), startDayOfTheWeek), compileYearDays)
+    
+    def holidayValues(self, schName):
+        """[start day, end day, holiday day schedule] of each period of a Schedule:Year."""
+        if self.scheduleType(schName) != "schedule:year": return []
+        return [[startDay, endDay, list(self.weekValues(weekName)[7])] \
+                for weekName, startDay, endDay in self.yearWeeks(schName)]
+    
+    def csvValues(self, csvFile):
+        """Values of a Honeybee csv schedule and the number of timesteps per hour."""
+        def compileCsv():
+            self.__depend(("csv", csvFile))
+            values = array.array("d")
+            timestep = 1
+            with open(csvFile, "r") as schFile:
+                for lineCount, line in enumerate(schFile):
+                    if lineCount == 2:
+                        try: timestep = int(line.split(",")[0])
+                        except: pass
+                    elif lineCount > 3:
+                        columns = line.split(',')
+                        try: values.append(float(columns[4]))
+                        except: values.append(float(columns[3]))
+            return values, timestep
+        return self.__memoize(("csv", csvFile), compileCsv)
+    
+    def annualValues(self, schName, startDayOfTheWeek=0, holidays=()):
+        """Hourly values of a schedule for a year as an array.
+        
+        Args:
+            schName: Name of a schedule in the library or the path to a Honeybee csv schedule.
+            startDayOfTheWeek: Day of the week of the first of January (0 is Sunday).
+            holidays: Days of the year (0-based) that use the holiday schedule of the week.
+        """
+        holidays = tuple(sorted(set(holidays)))
+        def compileAnnual():
+            schType = self.scheduleType(schName)
+            if schType == "csv":
+                return self.csvValues(schName)[0]
+            
+            values = array.array("d")
+            if schType == "schedule:constant":
+                values.extend([float(self.scheduleValues(schName)[2])] * 8760)
+            elif schType == "schedule:day:interval":
+                values.extend(self.dayValues(schName) * 365)
+            elif schType == "schedule:compact":
+                dayValues, weekVals = self.compactValues(schName)
+                for day in range(365):
+                    values.extend(dayValues[weekVals[(day + startDayOfTheWeek)%7]])
+            elif schType == "schedule:week:daily":
+                week = self.weekValues(schName)
+                for day in range(365):
+                    if day in holidays: values.extend(week[7])
+                    else: values.extend(week[(day + startDayOfTheWeek)%7])
+            elif schType == "schedule:year":
+                days = list(self.yearDays(schName, startDayOfTheWeek))
+                for startDay, endDay, holidaySchedule in self.holidayValues(schName):
+                    for day in holidays:
+                        if startDay-1 <= day <= endDay-1: days[day] = holidaySchedule
+                for dayValues in days:
+                    # days that are not in any period of the year are 0
+                    if isinstance(dayValues, int): dayValues = (0,) * 24
+                    values.extend(dayValues)
+            else:
+                raise ValueError("Honeybee doesn't support %s currently."%schType)
+            return values
+        return self.__memoize(("annual", schName.upper(), startDayOfTheWeek, holidays), compileAnnual)
+
+
 class ReadEPSchedules(object):
     
     def __init__(self, schName, startDayOfTheWeek):
         self.hb_EPScheduleAUX = sc.sticky["honeybee_EPScheduleAUX"]()
         self.hb_EPObjectsAUX = sc.sticky["honeybee_EPObjectsAUX"]()
         self.lb_preparation = sc.sticky["ladybug_Preparation"]()
+        self.compiler = sc.sticky["honeybee_ScheduleCompiler"]
         self.schName = schName
         self.startDayOfTheWeek = startDayOfTheWeek
         self.count = 0
         self.startHOY = 1
         self.endHOY = 24
         self.unit = "unknown"
-        self.comapctKeywords = ['Weekdays', 'Weekends', 'Alldays', 'AllOtherDays', 'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+        self.comapctKeywords = hb_ScheduleCompiler.compactKeywords
     
     def getScheduleTypeLimitsData(self, schName):
         
@@ -4390,29 +6452,10 @@ class ReadEPSchedules(object):
         
         if schName == None:
             schName = self.schName
-            
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
-        typeLimitName = values[1]
-        lowerLimit, upperLimit, numericType, unitType = \
-                self.getScheduleTypeLimitsData(typeLimitName)
-                
-        numberOfDaySch = int((len(values) - 3) /2)
         
-        hourlyValues = range(24)
-        startHour = 0
-        for i in range(numberOfDaySch):
-            value = float(values[2 * i + 4])
-            untilTime = map(int, values[2 * i + 3].split(":"))
-            endHour = int(untilTime[0] +  untilTime[1]/60)
-            for hour in range(startHour, endHour):
-                hourlyValues[hour] = value
-            
-            startHour = endHour
+        self.getScheduleTypeLimitsData(self.compiler.scheduleValues(schName)[1])
         
-        if numericType.strip().lower() == "district":
-            hourlyValues = map(int, hourlyValues)
-            
-        return hourlyValues
+        return list(self.compiler.dayValues(schName))
     
     
     def getWeeklyEPScheduleValues(self, schName = None):
@@ -4427,30 +6470,16 @@ class ReadEPSchedules(object):
         
         if schName == None:
             schName = self.schName
-            
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
         
         if self.count == 1:
             # set the last date of the schedule to one week
             self.endHOY = 24 * 7
         
-        sundaySchedule = self.getScheduleValues(values[1])
-        mondaySchedule = self.getScheduleValues(values[2])
-        tuesdaySchedule = self.getScheduleValues(values[3])
-        wednesdaySchedule = self.getScheduleValues(values[4])
-        thursdaySchedule = self.getScheduleValues(values[5])
-        fridaySchedule = self.getScheduleValues(values[6])
-        saturdaySchedule = self.getScheduleValues(values[7])
-        
-        holidaySchedule = self.getScheduleValues(values[8])
-        summerDesignDaySchedule = self.getScheduleValues(values[9])
-        winterDesignDaySchedule = self.getScheduleValues(values[10])
-        customDay1Schedule = self.getScheduleValues(values[11])
-        customDay2Schedule = self.getScheduleValues(values[12])
+        # the unit of a week comes from its day schedules
+        sundayName = self.compiler.scheduleValues(schName)[1]
+        self.getScheduleTypeLimitsData(self.compiler.scheduleValues(sundayName)[1])
         
-        hourlyValues = [sundaySchedule, mondaySchedule, tuesdaySchedule, \
-                       wednesdaySchedule, thursdaySchedule, fridaySchedule, \
-                       saturdaySchedule]
+        hourlyValues = [list(daySchedule) for daySchedule in self.compiler.weekValues(schName)[:7]]
         
         hourlyValues = hourlyValues[self.startDayOfTheWeek:] + \
                        hourlyValues[:self.startDayOfTheWeek]
@@ -4466,8 +6495,8 @@ class ReadEPSchedules(object):
         
         if schName == None:
             schName = self.schName
-            
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
+        
+        values = self.compiler.scheduleValues(schName)
         typeLimitName = values[1]
         lowerLimit, upperLimit, numericType, unitType = \
                 self.getScheduleTypeLimitsData(typeLimitName)
@@ -4476,131 +6505,38 @@ class ReadEPSchedules(object):
         
         if numericType.strip().lower() == "district":
             hourlyValues = map(int, hourlyValues)
-        return scheduleConstant
+        return hourlyValues
     
     
     def getCompactEPScheduleValues(self, schName):
         
         if schName == None: schName = self.schName
         
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
-        typeLimitName = values[1]
-        lowerLimit, upperLimit, numericType, unitType = \
-                self.getScheduleTypeLimitsData(typeLimitName)
+        self.getScheduleTypeLimitsData(self.compiler.scheduleValues(schName)[1])
+        self.endHOY = 8760
         
-        #Separate out the different periods.
-        totalValues = []
-        periodValues = []
-        headerDone = False
-        for val in values:
-            newPeriod = False
-            for word in self.comapctKeywords:
-                if word in val: newPeriod = True
-            if newPeriod == True:
-                if headerDone == True:
-                    totalValues.append(periodValues)
-                periodValues = [val]
-                headerDone = True
-            elif headerDone == True:
-                periodValues.append(val)
-        totalValues.append(periodValues)
-        
-        #For each day period, construct a day schedule.
-        dayType = []
-        dayValues = []
-        for dayVals in totalValues:
-            dayType.append(dayVals[0].title().split('For: ')[-1])
-            numberOfDaySch = int((len(dayVals) - 1) /2)
-            
-            hourlyValues = range(24)
-            startHour = 0
-            for i in range(numberOfDaySch):
-                value = float(dayVals[2 * i + 2])
-                untilTime = map(int, dayVals[2 * i + 1].split(":")[1:])
-                endHour = int(untilTime[0] +  untilTime[1]/60)
-                for hour in range(startHour, endHour):
-                    hourlyValues[hour] = value
-                
-                startHour = endHour
-            dayValues.append(hourlyValues)
-        
-        #Construct a week schedule from the day schedules.
-        #Map the dayTypes to the days of the week.
-        ['Weekdays', 'Weekends', 'Alldays', 'AllOtherDays', 'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        weekVals = [-1, -1, -1, -1, -1, -1, -1]
-        for typeCount, type in enumerate(dayType):
-            if type == 'Alldays':
-                for count, val in enumerate(weekVals):
-                    weekVals[count] = typeCount
-            elif type == 'Weekdays':
-                for count, val in enumerate(weekVals):
-                    if count < 6 and count != 0: weekVals[count] = typeCount
-            elif type == 'Weekends':
-                weekVals[0] = typeCount
-                weekVals[-1] = typeCount
-            elif type == 'Sunday': weekVals[0] = typeCount
-            elif type == 'Monday': weekVals[1] = typeCount
-            elif type == 'Tuesday': weekVals[2] = typeCount
-            elif type == 'Wednesday': weekVals[3] = typeCount
-            elif type == 'Thursday': weekVals[4] = typeCount
-            elif type == 'Friday': weekVals[5] = typeCount
-            elif type == 'Saturday': weekVals[6] = typeCount
-            elif type == 'Allotherdays':
-                for count, val in enumerate(weekVals):
-                    if val == -1: weekVals[count] = typeCount
-        
-        #Turn the week schedule into a year schedule.
-        hourlyValues = []
-        dayVals = []
-        dayofWeek = -1
-        for day in range(365):
-            if dayofWeek == 6: dayofWeek = 0
-            else: dayofWeek += 1
-            dayVals.append(weekVals[dayofWeek])
-        for day in dayVals:
-            hourlyValues.extend(dayValues[day])
-        
-        print hourlyValues
-        return hourlyValues
+        return list(self.compiler.annualValues(schName, self.startDayOfTheWeek))
     
     
     def getYearlyEPScheduleValues(self, schName = None):
-        # place holder for 365 days
-        hourlyValues = range(365)
-        
         # update last day of schedule
         self.endHOY = 8760
         
         if schName == None:
             schName = self.schName
         
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
-        
-        # generate weekly schedules
-        numOfWeeklySchedules = int((len(values)-2)/5)
+        self.getScheduleTypeLimitsData(self.compiler.scheduleValues(schName)[1])
         
-        for i in range(numOfWeeklySchedules):
-            weekDayScheduleName = values[5 * i + 2]
-            
-            startDay = int(self.lb_preparation.getJD(int(values[5 * i + 3]), int(values[5 * i + 4])))
-            endDay = int(self.lb_preparation.getJD(int(values[5 * i + 5]), int(values[5 * i + 6])))
-            
-            # 7 list for 7 days of the week
-            hourlyValuesForTheWeek = self.getScheduleValues(weekDayScheduleName)
-            
-            for day in range(startDay-1, endDay):
-                hourlyValues[day] = hourlyValuesForTheWeek[day%7]
-            
-        return hourlyValues
+        # one list of 24 values for each of the 365 days
+        return [list(daySchedule) if isinstance(daySchedule, tuple) else daySchedule \
+                for daySchedule in self.compiler.yearDays(schName, self.startDayOfTheWeek)]
     
     
     def getScheduleValues(self, schName = None):
         if schName == None:
             schName = self.schName
         if self.hb_EPObjectsAUX.isSchedule(schName):
-            scheduleValues, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
-            
-            scheduleType = scheduleValues[0].lower()
+            scheduleType = self.compiler.scheduleType(schName)
             if self.count == 0:
                 self.schType = scheduleType
             
@@ -4625,24 +6561,11 @@ class ReadEPSchedules(object):
             return hourlyValues
     
     def getHolidaySchedValues(self, schName = None):
-        hourlyValues = []
         if schName == None:
             schName = self.schName
         if self.hb_EPObjectsAUX.isSchedule(schName):
-            values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
-            scheduleType = values[0].lower()
-            if scheduleType == "schedule:year":
-                # generate weekly schedules
-                numOfWeeklySchedules = int((len(values)-2)/5)
-                for i in range(numOfWeeklySchedules):
-                    weekDayScheduleName = values[5 * i + 2]
-                    startDay = int(self.lb_preparation.getJD(int(values[5 * i + 3]), int(values[5 * i + 4])))
-                    endDay = int(self.lb_preparation.getJD(int(values[5 * i + 5]), int(values[5 * i + 6])))
-                    weekValues, comments = self.hb_EPScheduleAUX.getScheduleDataByName(weekDayScheduleName.upper(), ghenv.Component)
-                    holidaySchedule = self.getScheduleValues(weekValues[8])
-                    hourlyValues.append([startDay,endDay,holidaySchedule])
-        
-        return hourlyValues
+            return self.compiler.holidayValues(schName)
+        return []
 
 class EPTypes(object):
     def __init__(self):
@@ -4967,10 +6890,52 @@ class EPHvac(object):
         self.heatingDetails = heatingDetails
         self.coolingDetails = coolingDetails
 
+class hb_LazyAttribute(object):
+    """Class-level default for an optional attribute that is only allocated on first access.
+    
+    The value is created by calling factory and is stored in the instance __dict__ so
+    in-place edits (e.g. list.append), copy, pickle and Dump/Load work as before."""
+    __slots__ = ("name", "factory")
+    
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+    
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.factory()
+        instance.__dict__[self.name] = value
+        return value
+
 class EPZone(object):
     """This calss represents a honeybee zone that will be used for energy and daylighting
     simulatios"""
     
+    # Optional blocks (air mixing, natural ventilation and internal masses) are
+    # only allocated for the zones that use them.
+    mixAirZoneList = hb_LazyAttribute("mixAirZoneList", list)
+    mixAirFlowList = hb_LazyAttribute("mixAirFlowList", list)
+    mixAirFlowSched = hb_LazyAttribute("mixAirFlowSched", list)
+    natVentType = hb_LazyAttribute("natVentType", list)
+    natVentMinIndoorTemp = hb_LazyAttribute("natVentMinIndoorTemp", list)
+    natVentMaxIndoorTemp = hb_LazyAttribute("natVentMaxIndoorTemp", list)
+    natVentMinOutdoorTemp = hb_LazyAttribute("natVentMinOutdoorTemp", list)
+    natVentMaxOutdoorTemp = hb_LazyAttribute("natVentMaxOutdoorTemp", list)
+    natVentDeltaTemp = hb_LazyAttribute("natVentDeltaTemp", list)
+    windowOpeningArea = hb_LazyAttribute("windowOpeningArea", list)
+    windowHeightDiff = hb_LazyAttribute("windowHeightDiff", list)
+    natVentSchedule = hb_LazyAttribute("natVentSchedule", list)
+    natVentWindDischarge = hb_LazyAttribute("natVentWindDischarge", list)
+    natVentStackDischarge = hb_LazyAttribute("natVentStackDischarge", list)
+    windowAngle = hb_LazyAttribute("windowAngle", list)
+    fanFlow = hb_LazyAttribute("fanFlow", list)
+    FanEfficiency = hb_LazyAttribute("FanEfficiency", list)
+    FanPressure = hb_LazyAttribute("FanPressure", list)
+    internalMassNames = hb_LazyAttribute("internalMassNames", list)
+    internalMassSrfAreas = hb_LazyAttribute("internalMassSrfAreas", list)
+    internalMassConstructions = hb_LazyAttribute("internalMassConstructions", list)
+    
     def __init__(self, zoneBrep, zoneID, zoneName, program = [None, None], isConditioned = True):
         self.north = 0
         self.objectType = "HBZone"
@@ -4994,33 +6959,12 @@ class EPZone(object):
         
         # Air Mixing with Adjacent Zones
         self.mixAir = False
-        self.mixAirZoneList = []
-        self.mixAirFlowList = []
         self.mixAirFlowRate = 0.0963
-        self.mixAirFlowSched = []
         
         # Natural Ventilation Properties
         self.natVent = False
-        self.natVentType = []
-        self.natVentMinIndoorTemp = []
-        self.natVentMaxIndoorTemp = []
-        self.natVentMinOutdoorTemp = []
-        self.natVentMaxOutdoorTemp = []
-        self.natVentDeltaTemp = []
-        self.windowOpeningArea = []
-        self.windowHeightDiff = []
-        self.natVentSchedule = []
-        self.natVentWindDischarge = []
-        self.natVentStackDischarge = []
-        self.windowAngle = []
-        self.fanFlow = []
-        self.FanEfficiency = []
-        self.FanPressure = []
         
         # Zone Internal Masses (or Furniture)
-        self.internalMassNames = []
-        self.internalMassSrfAreas = []
-        self.internalMassConstructions = []
         
         # Zone Surfaces
         self.surfaces = []
@@ -5107,6 +7051,8 @@ class EPZone(object):
             for count, mixZ in enumerate(self.mixAirZoneList):
                 self.mixAirZoneList[count] = mixZ + newKey
         
+        hb_Hive.ownGeometry(self)
+        
         # Transform any daylight control sensor points.
         if self.illumCntrlSensorPt != None:
             self.illumCntrlSensorPt.Transform(transform)
@@ -5251,6 +7197,7 @@ class EPZone(object):
                 if cenpt.X <= HBSrf.cenPt.X +tol and cenpt.X >= HBSrf.cenPt.X - tol and cenpt.Y <= HBSrf.cenPt.Y +tol and cenpt.Y >= HBSrf.cenPt.Y - tol and cenpt.Z <= HBSrf.cenPt.Z +tol and cenpt.Z >= HBSrf.cenPt.Z - tol:
                     if nVecs[count] != HBSrf.normalVector:
                         print "Normal direction for " + HBSrf.name + " is fixed by Honeybee!"
+                        hb_Hive.ownGeometry(HBSrf)
                         HBSrf.geometry.Flip()
                         HBSrf.normalVector.Reverse()
                         HBSrf.basePlane.Flip()
@@ -5267,11 +7214,13 @@ class EPZone(object):
                             for childSrf in HBSrf.childSrfs:
                                 if childSrf.normalVector != nVecs[count]:
                                     print "Normal direction for " + childSrf.name + " is fixed by Honeybee!"
+                                    hb_Hive.ownGeometry(childSrf)
                                     childSrf.geometry.Flip()
                                     childSrf.normalVector.Reverse()
                                     childSrf.basePlane.Flip()
                         elif HBSrf.hasChild:
                             for childSrf in HBSrf.childSrfs:
+                                hb_Hive.ownGeometry(childSrf)
                                 # print childSrf.normalVector
                                 childSrf.cenPt = rc.Geometry.AreaMassProperties.Compute(childSrf.geometry).Centroid
                                 uv = childSrf.geometry.Faces[0].ClosestPoint(childSrf.cenPt)
@@ -6018,6 +7967,97 @@ class hb_reEvaluateHBZones(object):
             return newSurfaces
 
 class hb_EPSurface(object):
+    # Lookup tables are shared by all the surfaces.
+    # 4 represents an Air Wall
+    srfType = {0:'WALL',
+       0.5: 'UndergroundWall',
+       1:'ROOF',
+       1.5: 'UndergroundCeiling',
+       2:'FLOOR',
+       2.25: 'UndergroundSlab',
+       2.5: 'SlabOnGrade',
+       2.75: 'ExposedFloor',
+       3:'CEILING',
+       4:'AIRWALL',
+       5:'WINDOW',
+       6:'SHADING',
+       'WALL': 'WALL',
+       'ROOF':'ROOF',
+       'FLOOR': 'FLOOR',
+       'CEILING': 'CEILING',
+       'WINDOW':'WINDOW',
+       'SHADING': 'SHADING'}
+       
+    cnstrSet = {0:'Exterior Wall',
+            0.5: 'Exterior Wall',
+            1: 'Exterior Roof',
+            1.5: 'Exterior Roof',
+            2:'Interior Floor',
+            2.25: 'Exterior Floor',
+            2.5: 'Exterior Floor',
+            2.75: 'Exterior Floor',
+            3:'Interior Ceiling',
+            4:'Air Wall',
+            5:'Exterior Window',
+            6:'Interior Wall'}
+    
+    intCnstrSet = {
+            0:'Interior Wall',
+            0.5: 'Exterior Wall',
+            1:'Exterior Roof',
+            1.5:'Exterior Roof',
+            2:'Interior Floor',
+            2.25: 'Exterior Floor',
+            2.5: 'Exterior Floor',
+            2.75: 'Exterior Floor',
+            3:'Interior Ceiling',
+            4:'Air Wall',
+            5:'Interior Window',
+            6:'Interior Wall'}
+    
+    srfBC = {0:'Outdoors',
+                 0.5: 'ground',
+                 1:'Outdoors',
+                 1.5: 'ground',
+                 2: 'outdoors', # this will be changed to surface once solveAdjacency is used 
+                 2.25: 'ground',
+                 2.5: 'ground',
+                 2.75: 'outdoors',
+                 3: 'outdoors', # this will be changed to surface once solveAdjacency is used 
+                 4: 'surface',
+                 5: 'Outdoors',
+                 6: 'surface'}
+     
+    srfSunExposure = {0:'SunExposed',
+                 0.5:'NoSun',
+                 1:'SunExposed',
+                 1.5:'NoSun', 
+                 2:'NoSun',
+                 2.25: 'NoSun',
+                 2.5: 'NoSun',
+                 2.75: 'SunExposed',
+                 3:'NoSun',
+                 4:'NoSun',
+                 6: 'NoSun'}
+         
+    srfWindExposure = {0:'WindExposed',
+                 0.5:'NoWind',
+                 1:'WindExposed',
+                 1.5:'NoWind',
+                 2:'NoWind',
+                 2.25:'NoWind',
+                 2.5:'NoWind',
+                 2.75:'WindExposed',
+                 3:'NoWind',
+                 4:'NoWind',
+                 6:'NoWind'}
+    
+    # Optional attributes that are only allocated when they are used.
+    meshedFace = hb_LazyAttribute("meshedFace", rc.Geometry.Mesh)
+    # Special attribute for shading control on inidivdual windows that influences the zone properties
+    shdCntrlZoneInstructs = hb_LazyAttribute("shdCntrlZoneInstructs", list)
+    # PV - A Honeybee surface can hold one PV generator
+    PVgenlist = hb_LazyAttribute("PVgenlist", list)
     
     def __init__(self, surface, srfNumber, srfID, *arg):
         """EP surface Class
@@ -6037,7 +8077,6 @@ class hb_EPSurface(object):
         
         self.isPlanar = self.checkPlanarity()
         self.hasInternalEdge = self.checkForInternalEdge()
-        self.meshedFace = rc.Geometry.Mesh()
         self.RadMaterial = None
         self.EPConstruction = None # this gets overwritten below
         
@@ -6049,102 +8088,11 @@ class hb_EPSurface(object):
         self.srfTypeByUser = False
         self.srfBCByUser = False
         self.BCObject = self.outdoorBCObject()
-
-        # Special attribute for shading control on inidivdual windows that influences the zone properties
-        self.shdCntrlZoneInstructs = []
-        
-        # PV - A Honeybee surface can hold one PV generator
-        
-        self.PVgenlist = []
         
         # Does this Honeybee surface contain a PV generator?
         
         self.containsPVgen = False
         
-        # 4 represents an Air Wall
-        self.srfType = {0:'WALL',
-           0.5: 'UndergroundWall',
-           1:'ROOF',
-           1.5: 'UndergroundCeiling',
-           2:'FLOOR',
-           2.25: 'UndergroundSlab',
-           2.5: 'SlabOnGrade',
-           2.75: 'ExposedFloor',
-           3:'CEILING',
-           4:'AIRWALL',
-           5:'WINDOW',
-           6:'SHADING',
-           'WALL': 'WALL',
-           'ROOF':'ROOF',
-           'FLOOR': 'FLOOR',
-           'CEILING': 'CEILING',
-           'WINDOW':'WINDOW',
-           'SHADING': 'SHADING'}
-           
-        self.cnstrSet = {0:'Exterior Wall',
-                0.5: 'Exterior Wall',
-                1: 'Exterior Roof',
-                1.5: 'Exterior Roof',
-                2:'Interior Floor',
-                2.25: 'Exterior Floor',
-                2.5: 'Exterior Floor',
-                2.75: 'Exterior Floor',
-                3:'Interior Ceiling',
-                4:'Air Wall',
-                5:'Exterior Window',
-                6:'Interior Wall'}
-        
-        self.intCnstrSet = {
-                0:'Interior Wall',
-                0.5: 'Exterior Wall',
-                1:'Exterior Roof',
-                1.5:'Exterior Roof',
-                2:'Interior Floor',
-                2.25: 'Exterior Floor',
-                2.5: 'Exterior Floor',
-                2.75: 'Exterior Floor',
-                3:'Interior Ceiling',
-                4:'Air Wall',
-                5:'Interior Window',
-                6:'Interior Wall'}
-        
-        self.srfBC = {0:'Outdoors',
-                     0.5: 'ground',
-                     1:'Outdoors',
-                     1.5: 'ground',
-                     2: 'outdoors', # this will be changed to surface once solveAdjacency is used 
-                     2.25: 'ground',
-                     2.5: 'ground',
-                     2.75: 'outdoors',
-                     3: 'outdoors', # this will be changed to surface once solveAdjacency is used 
-                     4: 'surface',
-                     5: 'Outdoors',
-                     6: 'surface'}
-         
-        self.srfSunExposure = {0:'SunExposed',
-                     0.5:'NoSun',
-                     1:'SunExposed',
-                     1.5:'NoSun', 
-                     2:'NoSun',
-                     2.25: 'NoSun',
-                     2.5: 'NoSun',
-                     2.75: 'SunExposed',
-                     3:'NoSun',
-                     4:'NoSun',
-                     6: 'NoSun'}
-             
-        self.srfWindExposure = {0:'WindExposed',
-                     0.5:'NoWind',
-                     1:'WindExposed',
-                     1.5:'NoWind',
-                     2:'NoWind',
-                     2.25:'NoWind',
-                     2.5:'NoWind',
-                     2.75:'WindExposed',
-                     3:'NoWind',
-                     4:'NoWind',
-                     6:'NoWind'}
-        
         self.numOfVertices = 'autocalculate'
         
         if len(arg) == 0:
@@ -6478,11 +8426,13 @@ class hb_EPSurface(object):
         #print self.meshedFace.Faces.Count
     
     def disposeCurrentMeshes(self):
+        hb_Hive.ownGeometry(self)
         if self.meshedFace.Faces.Count>0:
             self.meshedFace.Dispose()
             self.meshedFace = rc.Geometry.Mesh()
         if self.hasChild:
             for fenSrf in self.childSrfs:
+                hb_Hive.ownGeometry(fenSrf)
                 if fenSrf.meshedFace.Faces.Count>0:
                     fenSrf.meshedFace.Dispose()
                     fenSrf.meshedFace = rc.Geometry.Mesh()
@@ -6621,6 +8571,7 @@ class hb_EPSurface(object):
                 self.name += newKey
         except:
             pass
+        hb_Hive.ownGeometry(self)
         self.geometry.Transform(transform)
         self.meshedFace.Transform(transform)
         # move center point and normal
@@ -6947,6 +8898,11 @@ class hb_EPShdSurface(hb_EPSurface):
 
 class hb_EPFenSurface(hb_EPSurface):
     """..."""
+    # Special inputs for shading control.
+    shadingSchName = hb_LazyAttribute("shadingSchName", list)
+    shadingControlName = hb_LazyAttribute("shadingControlName", list)
+    shadeMaterialName = hb_LazyAttribute("shadeMaterialName", list)
+    
     def __init__(self, surface, srfNumber, srfName, parentSurface, surafceType, punchedWall = None):
         """This function initiates the class for an EP surface.
             surface: surface geometry as a Brep
@@ -6955,11 +8911,6 @@ class hb_EPFenSurface(hb_EPSurface):
             parentZone: class of the zone that this surface belongs to"""
         hb_EPSurface.__init__(self, surface, srfNumber, srfName, parentSurface, surafceType)
         
-        # Special inputs for shading control.
-        self.shadingSchName = []
-        self.shadingControlName = []
-        self.shadeMaterialName = []
-        
         if not self.isPlanar:
             try:
                 self.parent.parent.hasNonplanarSrf = True
@@ -8196,7 +10147,431 @@ class thermBC(object):
                '\nFilm Coefficient: ' + str(self.BCProperties['H']) + ' W/m2-K' + \
                '\n-------------------------------------'
 
+class hb_ZoneVector(object):
+    """List-like view of consecutive values in the array of a hb_ZoneMatrix.
+    
+    Values are read from and written to the matrix so a vector zone or a row is never copied."""
+    __slots__ = ("data", "offset", "length")
+    
+    def __init__(self, data, offset, length):
+        self.data = data
+        self.offset = offset
+        self.length = length
+    
+    def __len__(self):
+        return self.length
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.data[self.offset + i] for i in range(*index.indices(self.length))]
+        if index < 0: index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("index out of range")
+        return self.data[self.offset + index]
+    
+    def __setitem__(self, index, value):
+        if index < 0: index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("index out of range")
+        self.data[self.offset + index] = value
+    
+    def __iter__(self):
+        return iter(self.data[self.offset:self.offset + self.length])
+    
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return False
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __repr__(self):
+        return repr(list(self))
+
+
+class hb_ZoneRows(object):
+    """List-like view of the rows of one zone of a hb_ZoneMatrix.
+    
+    Every row is returned as a hb_ZoneVector so a zone is never expanded to nested lists."""
+    __slots__ = ("data", "offset", "rows", "cols")
+    
+    def __init__(self, data, offset, rows, cols):
+        self.data = data
+        self.offset = offset
+        self.rows = rows
+        self.cols = cols
+    
+    def __len__(self):
+        return self.rows
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.rows))]
+        if index < 0: index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError("row index out of range")
+        return hb_ZoneVector(self.data, self.offset + index * self.cols, self.cols)
+    
+    def __iter__(self):
+        for index in xrange(self.rows):
+            yield self[index]
+    
+    def __eq__(self, other):
+        try:
+            if len(self) != len(other): return False
+        except TypeError:
+            return False
+        return all(list(row) == list(otherRow) for row, otherRow in itertools.izip(self, other))
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __repr__(self):
+        return repr([list(row) for row in self])
+
+
+class hb_ZoneMatrix(object):
+    """Test point values of several zones stored in one contiguous typed array.
+    
+    Each zone is either a matrix with one row per test point (e.g. the view factors to the
+    zone surfaces or the transmissivity of each sky patch) or a vector with one value per test
+    point (e.g. the sky view). Zones that are neither (e.g. the placeholders of the zones
+    without windows) are kept as they are.
+    
+    Indexing a zone returns an hb_ZoneRows for a matrix zone and a hb_ZoneVector for a vector
+    zone so the matrix can be used in place of the nested lists it replaces. Both are views of
+    the matrix so values that are set through them are kept. Zones without test points are
+    returned as empty lists like the lists they replace.
+    
+    Usage:
+        skyView = hb_ZoneMatrix.fromLists(testPtSkyView)
+        skyView[zoneCount][ptCount]
+        skyView.column(zoneCount, patchCount)
+    """
+    packTag = "HBZoneMatrix"
+    
+    def __init__(self, typecode="d"):
+        self.data = array.array(typecode)
+        # (offset, number of rows, number of columns) of each zone. The number of columns is
+        # None for vector zones and the shape is None for the zones in rawZones.
+        self.shapes = []
+        self.rawZones = {}
+    
+    @classmethod
+    def fromLists(cls, zoneLists, typecode="d"):
+        matrix = cls(typecode)
+        for zoneValues in zoneLists:
+            matrix.appendZone(zoneValues)
+        return matrix
+    
+    @classmethod
+    def fromValue(cls, value, typecode="d"):
+        """Return a matrix for nested lists, a packed matrix or a matrix."""
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, tuple) and len(value) != 0 and value[0] == cls.packTag:
+            return cls.unpack(value)
+        return cls.fromLists(value, typecode)
+    
+    def appendZone(self, zoneValues):
+        offset = len(self.data)
+        try:
+            if len(zoneValues) != 0 and not isinstance(zoneValues[0], (int, long, float)):
+                cols = len(zoneValues[0])
+                for row in zoneValues:
+                    if len(row) != cols: raise ValueError("rows have different lengths")
+                    self.data.extend(row)
+            else:
+                cols = None
+                self.data.extend(zoneValues)
+        except (TypeError, ValueError):
+            del self.data[offset:]
+            self.rawZones[len(self.shapes)] = zoneValues
+            self.shapes.append(None)
+        else:
+            self.shapes.append((offset, len(zoneValues), cols))
+    
+    def __len__(self):
+        return len(self.shapes)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            sliced = hb_ZoneMatrix(self.data.typecode)
+            for i in range(*index.indices(len(self))):
+                shape = self.shapes[i]
+                if shape is None:
+                    sliced.rawZones[len(sliced.shapes)] = self.rawZones[i]
+                    sliced.shapes.append(None)
+                    continue
+                offset, rows, cols = shape
+                size = rows if cols is None else rows * cols
+                sliced.shapes.append((len(sliced.data), rows, cols))
+                sliced.data.extend(self.data[offset:offset + size])
+            return sliced
+        if index < 0: index += len(self)
+        shape = self.shapes[index]
+        if shape is None:
+            return self.rawZones[index]
+        offset, rows, cols = shape
+        if rows == 0:
+            return []
+        if cols is None:
+            return hb_ZoneVector(self.data, offset, rows)
+        return hb_ZoneRows(self.data, offset, rows, cols)
+    
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+    
+    def __add__(self, other):
+        # e.g. testPtViewFactor[:-1] + [[]]. The zones are added as views, not copied.
+        return list(self) + list(other)
+    
+    def __radd__(self, other):
+        return list(other) + list(self)
+    
+    def zoneValues(self, index):
+        """Values of a zone as lists."""
+        zone = self[index]
+        if isinstance(zone, hb_ZoneRows):
+            return [list(row) for row in zone]
+        elif isinstance(zone, hb_ZoneVector):
+            return list(zone)
+        return zone
+    
+    def toLists(self):
+        return [self.zoneValues(index) for index in xrange(len(self))]
+    
+    def column(self, index, col):
+        """Value of one column (e.g. one sky patch) for all the test points of a zone."""
+        offset, rows, cols = self.shapes[index]
+        return self.data[offset + col:offset + rows * cols:cols]
+    
+    def rowCount(self):
+        count = 0
+        for index, shape in enumerate(self.shapes):
+            if shape is not None: count += shape[1]
+            else:
+                try: count += len(self.rawZones[index])
+                except TypeError: pass
+        return count
+    
+    def shadeByWindows(self, windowChains, hour, winShdDict):
+        """Sky patch transmissivity of every test point for one hour of window shading.
+        
+        The sky patches that are seen through windows are set to the product of the hourly
+        transmissivity of the windows. Other patches keep 0 if they are blocked and are 1
+        otherwise.
+        
+        Returns:
+            skyView: a vector matrix with the average transmissivity of each test point.
+            blockedVec: a matrix with the transmissivity of each sky patch.
+        """
+        chainFactors = windowChains.chainFactors(hour, winShdDict)
+        skyView = hb_ZoneMatrix(self.data.typecode)
+        blockedVec = hb_ZoneMatrix(self.data.typecode)
+        for index, shape in enumerate(self.shapes):
+            chainShape = windowChains.shapes[index] if index < len(windowChains.shapes) else None
+            if shape is None or shape[2] is None or chainShape is None:
+                zoneSkyView, zoneBlockedVec = windowChains.shadeZoneValues(index, self.zoneValues(index), hour, winShdDict)
+                skyView.appendZone(zoneSkyView)
+                blockedVec.appendZone(zoneBlockedVec)
+                continue
+            
+            offset, rows, cols = shape
+            zoneData = self.data[offset:offset + rows * cols]
+            # Gather the window transmissivity into the patches that are not blocked. The
+            # other patches are already 0 when blocked and 1 when open.
+            for position, chainId in itertools.izip(windowChains.positions[index], windowChains.chainIds[index]):
+                if zoneData[position] != 0: zoneData[position] = chainFactors[chainId]
+            
+            blockedVec.shapes.append((len(blockedVec.data), rows, cols))
+            blockedVec.data.extend(zoneData)
+            skyView.shapes.append((len(skyView.data), rows, None))
+            skyView.data.extend(sum(zoneData[start:start + cols]) / cols for start in xrange(0, rows * cols, cols))
+        
+        return skyView, blockedVec
+    
+    def pack(self):
+        """Plain data that can be dumped and loaded without this class."""
+        return (self.packTag, self.data.typecode, zlib.compress(self.data.tostring()), list(self.shapes), dict(self.rawZones))
+    
+    @classmethod
+    def unpack(cls, packed):
+        tag, typecode, dataString, shapes, rawZones = packed
+        matrix = cls(typecode)
+        matrix.data.fromstring(zlib.decompress(dataString))
+        matrix.shapes = list(shapes)
+        matrix.rawZones = dict(rawZones)
+        return matrix
+
+
+class hb_WindowNameChains(object):
+    """Sparse form of testPtBlockName.
+    
+    testPtBlockName has an entry for every sky patch of every test point. The entry is the
+    list of windows that the patch is seen through or 0 if the patch is not seen through a
+    window. Here only the patches that are seen through windows are kept, as the position of
+    the patch in the zone and the index of its window chain. Each unique chain of window names
+    is stored once.
+    """
+    packTag = "HBWindowNameChains"
+    
+    def __init__(self):
+        self.windowNames = []
+        self.chains = []
+        # (number of rows, number of columns) of each zone. None for the zones in rawZones.
+        self.shapes = []
+        self.positions = []
+        self.chainIds = []
+        self.rawZones = {}
+        self._windowIndex = {}
+        self._chainIndex = {}
+    
+    @classmethod
+    def fromLists(cls, zoneLists):
+        chains = cls()
+        for zoneValues in zoneLists:
+            chains.appendZone(zoneValues)
+        return chains
+    
+    @classmethod
+    def fromValue(cls, value):
+        """Return chains for nested lists, packed chains or chains."""
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, tuple) and len(value) != 0 and value[0] == cls.packTag:
+            return cls.unpack(value)
+        return cls.fromLists(value)
+    
+    def chainId(self, windowNames):
+        chain = []
+        for name in windowNames:
+            windowIndex = self._windowIndex.get(name)
+            if windowIndex is None:
+                windowIndex = self._windowIndex[name] = len(self.windowNames)
+                self.windowNames.append(name)
+            chain.append(windowIndex)
+        chain = tuple(chain)
+        chainId = self._chainIndex.get(chain)
+        if chainId is None:
+            chainId = self._chainIndex[chain] = len(self.chains)
+            self.chains.append(chain)
+        return chainId
+    
+    def appendZone(self, zoneValues):
+        positions = array.array("i")
+        chainIds = array.array("i")
+        try:
+            cols = len(zoneValues[0]) if len(zoneValues) != 0 else 0
+            for ptCount, ptValues in enumerate(zoneValues):
+                if len(ptValues) != cols: raise ValueError("rows have different lengths")
+                for vecCount, windowNames in enumerate(ptValues):
+                    if isinstance(windowNames, list):
+                        positions.append(ptCount * cols + vecCount)
+                        chainIds.append(self.chainId(windowNames))
+                    elif windowNames != 0:
+                        raise ValueError("not a window name chain")
+        except (TypeError, ValueError):
+            self.rawZones[len(self.shapes)] = zoneValues
+            self.shapes.append(None)
+            self.positions.append(array.array("i"))
+            self.chainIds.append(array.array("i"))
+        else:
+            self.shapes.append((len(zoneValues), cols))
+            self.positions.append(positions)
+            self.chainIds.append(chainIds)
+    
+    def __len__(self):
+        return len(self.shapes)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.fromLists([self[i] for i in range(*index.indices(len(self)))])
+        if index < 0: index += len(self)
+        shape = self.shapes[index]
+        if shape is None:
+            return self.rawZones[index]
+        rows, cols = shape
+        zoneValues = [[0] * cols for row in xrange(rows)]
+        for position, chainId in itertools.izip(self.positions[index], self.chainIds[index]):
+            ptCount, vecCount = divmod(position, cols)
+            zoneValues[ptCount][vecCount] = [self.windowNames[i] for i in self.chains[chainId]]
+        return zoneValues
+    
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+    
+    def toLists(self):
+        return list(self)
+    
+    def chainFactors(self, hour, winShdDict):
+        """Transmissivity of every window chain for an hour."""
+        factors = array.array("d")
+        for chain in self.chains:
+            transFactor = 1
+            try:
+                for windowIndex in chain:
+                    transFactor = transFactor * winShdDict[self.windowNames[windowIndex]][hour-1]
+            except: pass
+            factors.append(transFactor)
+        return factors
+    
+    def shadeZoneValues(self, index, zoneBlockedVec, hour, winShdDict):
+        """Shade one zone element by element for the zones that are not stored as matrices."""
+        zoneNames = self[index] if index < len(self) else []
+        newZoneBlockedVec = []
+        newZoneSkyView = []
+        for ptCount, vecList in enumerate(zoneBlockedVec):
+            newVecList = []
+            for vecCount, transmiss in enumerate(vecList):
+                if transmiss == 0: newVecList.append(transmiss)
+                else:
+                    transFactor = 1
+                    try:
+                        for window in zoneNames[ptCount][vecCount]:
+                            transFactor = transFactor * winShdDict[window][hour-1]
+                    except: pass
+                    newVecList.append(transFactor)
+            newZoneBlockedVec.append(newVecList)
+            newZoneSkyView.append(sum(newVecList)/len(newVecList))
+        return newZoneSkyView, newZoneBlockedVec
+    
+    def pack(self):
+        """Plain data that can be dumped and loaded without this class."""
+        return (self.packTag, list(self.windowNames), list(self.chains), list(self.shapes), \
+                [zlib.compress(positions.tostring()) for positions in self.positions], \
+                [zlib.compress(chainIds.tostring()) for chainIds in self.chainIds], dict(self.rawZones))
+    
+    @classmethod
+    def unpack(cls, packed):
+        tag, windowNames, chains, shapes, positions, chainIds, rawZones = packed
+        windowChains = cls()
+        windowChains.windowNames = list(windowNames)
+        windowChains.chains = [tuple(chain) for chain in chains]
+        windowChains._windowIndex = dict((name, i) for i, name in enumerate(windowChains.windowNames))
+        windowChains._chainIndex = dict((chain, i) for i, chain in enumerate(windowChains.chains))
+        windowChains.shapes = list(shapes)
+        for positionString, chainIdString in zip(positions, chainIds):
+            zonePositions, zoneChainIds = array.array("i"), array.array("i")
+            zonePositions.fromstring(zlib.decompress(positionString))
+            zoneChainIds.fromstring(zlib.decompress(chainIdString))
+            windowChains.positions.append(zonePositions)
+            windowChains.chainIds.append(zoneChainIds)
+        windowChains.rawZones = dict(rawZones)
+        return windowChains
+
+
 class viewFactorInfo(object):
+    """View factors and sky view of the test points of a comfort map.
+    
+    testPtViewFactor, testPtSkyView and testPtBlockedVec are kept as hb_ZoneMatrix and
+    testPtBlockName as hb_WindowNameChains. They can be set with nested lists and are returned
+    as they are stored since they can be indexed like the lists they replace.
+    """
     
     def __init__(self, testPtViewFactor=None, zoneSrfNames=None, testPtSkyView=None, testPtBlockedVec=None, testPtZoneWeights=None, \
     testPtZoneNames=None, ptHeightWeights=None, zoneInletInfo=None, zoneHasWindows=None, outdoorIsThere=None, outdoorNonSrfViewFac=None, \
@@ -8235,16 +10610,56 @@ class viewFactorInfo(object):
         self.finalAddShdTransmiss = finalAddShdTransmiss
         
         # Calculate the number of points.
-        self.NumPts = 0
-        if testPtViewFactor != None:
-            for zList in testPtViewFactor:
-                self.NumPts = self.NumPts + len(zList)
+        self.calcNumPts()
+    
+    @property
+    def testPtViewFactor(self):
+        return self.__dict__.get("_testPtViewFactor")
+    
+    @testPtViewFactor.setter
+    def testPtViewFactor(self, value):
+        self._testPtViewFactor = hb_ZoneMatrix.fromValue(value)
+    
+    @property
+    def testPtSkyView(self):
+        return self.__dict__.get("_testPtSkyView")
+    
+    @testPtSkyView.setter
+    def testPtSkyView(self, value):
+        self._testPtSkyView = hb_ZoneMatrix.fromValue(value)
+    
+    @property
+    def testPtBlockedVec(self):
+        return self.__dict__.get("_testPtBlockedVec")
+    
+    @testPtBlockedVec.setter
+    def testPtBlockedVec(self, value):
+        # Single precision is plenty for the transmissivity of the sky patches.
+        self._testPtBlockedVec = hb_ZoneMatrix.fromValue(value, "f")
+    
+    @property
+    def testPtBlockName(self):
+        return self.__dict__.get("_testPtBlockName")
+    
+    @testPtBlockName.setter
+    def testPtBlockName(self, value):
+        self._testPtBlockName = hb_WindowNameChains.fromValue(value)
     
     def calcNumPts(self):
         self.NumPts = 0
-        if self.testPtViewFactor != None:
-            for zList in self.testPtViewFactor:
-                self.NumPts = self.NumPts + len(zList)
+        matrix = self.__dict__.get("_testPtViewFactor")
+        if matrix != None:
+            self.NumPts = matrix.rowCount()
+    
+    def toDict(self):
+        """Properties of the object as plain data for Dump Honeybee Objects."""
+        data = {}
+        for key, value in self.__dict__.iteritems():
+            if isinstance(value, (hb_ZoneMatrix, hb_WindowNameChains)):
+                data[key[1:]] = value.pack()
+            else:
+                data[key] = value
+        return data
     
     def recallAllProps(self):
         return [self.testPtViewFactor, self.zoneSrfNames, self.testPtSkyView, self.testPtBlockedVec, self.testPtZoneWeights, \
@@ -8350,6 +10765,11 @@ class hb_Hive(object):
                     # if there is not child object use the geometry as it is
                     geometry = HBObject.geometry
                 
+                # the output geometry of the component that made the object carries its own key
+                if geometry is HBObject.geometry:
+                    hb_Hive.ownGeometry(HBObject)
+                    geometry = HBObject.geometry
+                
                 # assign the key to surface
                 geometry.UserDictionary.Set('HBID', '{}#{}'.format(baseKey, key))
                 outGeometry.append(geometry)
@@ -8368,7 +10788,83 @@ class hb_Hive(object):
         HBID = '{}#{}'.format(baseKey, key)
         return 'Honeybee View Factor Info - ' + HBID
     
-    def callFromHoneybeeHive(self, geometryList):
+    shareableTypes = (rc.Geometry.GeometryBase, rc.Geometry.Point3d, rc.Geometry.Vector3d, rc.Geometry.Plane)
+    
+    def shareGeometry(self, HBObject, memo):
+        """Put the Rhino geometry of an object in a deepcopy memo so the copy uses it instead of copying it.
+        
+        Geometry is by far the largest part of a Honeybee object. Sharing it makes the copy
+        cheap and leaves only the Python properties to be copied.
+        """
+        stack = [HBObject]
+        visited = set()
+        while stack:
+            obj = stack.pop()
+            if id(obj) in visited: continue
+            visited.add(id(obj))
+            if isinstance(obj, self.shareableTypes):
+                memo[id(obj)] = obj
+                self.copyStats["sharedGeometry"] += 1
+                if isinstance(obj, rc.Geometry.GeometryBase):
+                    try: self.copyStats["sharedBytes"] += obj.MemoryEstimate()
+                    except: pass
+            elif isinstance(obj, (list, tuple)):
+                stack.extend(obj)
+            elif isinstance(obj, dict):
+                stack.extend(obj.values())
+            elif not isinstance(obj, (str, int, float, bool)) and obj is not None:
+                try: stack.extend(vars(obj).values())
+                except: pass
+    
+    @staticmethod
+    def markSharedGeometry(HBObject):
+        """Flag a copied object and its surfaces as sharing their geometry with the hive."""
+        HBObject.sharesGeometry = True
+        if HBObject.objectType == "HBZone":
+            for surface in HBObject.surfaces:
+                surface.sharesGeometry = True
+                for childSrf in surface.childSrfs: childSrf.sharesGeometry = True
+        elif HBObject.objectType == "HBSurface":
+            for childSrf in HBObject.childSrfs: childSrf.sharesGeometry = True
+    
+    @staticmethod
+    def ownGeometry(HBObject):
+        """Copy the geometry that an object shares with the hive before it is changed in place."""
+        if not getattr(HBObject, "sharesGeometry", False): return
+        for attr, value in vars(HBObject).items():
+            if isinstance(value, rc.Geometry.GeometryBase):
+                setattr(HBObject, attr, value.Duplicate())
+            elif isinstance(value, (rc.Geometry.Point3d, rc.Geometry.Vector3d, rc.Geometry.Plane)):
+                setattr(HBObject, attr, type(value)(value))
+        HBObject.sharesGeometry = False
+    
+    @property
+    def copyStats(self):
+        """Number of copied objects, copy time and shared geometry of the calls of this hive."""
+        if "_copyStats" not in self.__dict__:
+            self._copyStats = {"objects": 0, "copyTime": 0.0, "sharedGeometry": 0, "sharedBytes": 0}
+        return self._copyStats
+    
+    def getCopyReport(self):
+        """A short report of the objects copied by callFromHoneybeeHive and the geometry they share."""
+        return "%d Honeybee objects copied in %.3f seconds. %d geometries (%.1f MB) are shared with the hive."%(
+            self.copyStats["objects"], self.copyStats["copyTime"], self.copyStats["sharedGeometry"],
+            self.copyStats["sharedBytes"] / 1048576.0)
+    
+    def reportCopies(self, Component):
+        """Print the copy report to the out of the component and keep it in sc.sticky['HBHiveCopyStats']."""
+        if not sc.sticky.has_key('HBHiveCopyStats'): sc.sticky['HBHiveCopyStats'] = {}
+        baseKey = '{}_{}'.format(Component.OnPingDocument().DocumentID, Component.InstanceGuid)
+        sc.sticky['HBHiveCopyStats'][baseKey] = dict(self.copyStats)
+        print self.getCopyReport()
+    
+    def callFromHoneybeeHive(self, geometryList, Component = None):
+        """Get copies of the Honeybee objects of the input geometries.
+        
+        Component: Set to the component that calls the objects to print the copy report to its out.
+            Components that call the objects one by one should leave it out and call reportCopies
+            once all the objects are copied.
+        """
         HBObjects = []
         for geometry in geometryList:
             try:
@@ -8391,18 +10887,12 @@ class hb_Hive(object):
                     pass
                 
                 try:
-                    # after the first round meshedFace makes copy.deepcopy crash
-                    # so I need to regenerate meshFaces
+                    # keep track of boundary conditions
+                    # and then set them to None not to create
+                    # memory issues for large models.
                     bc = []
                     if HBObject.objectType == "HBZone":
                         for surface in HBObject.surfaces:
-                            newMesh = rc.Geometry.Mesh()
-                            newMesh.Append(surface.meshedFace)
-                            surface.meshedFace = newMesh
-                            
-                            # keep track of boundary conditions
-                            # and then set them to None not to create
-                            # memory issues for large models.
                             bc.append(copy.copy(surface.BCObject))
                             surface.BCObject = None
                             for csrf in surface.childSrfs:
@@ -8410,19 +10900,21 @@ class hb_Hive(object):
                                 csrf.BCObject = None
                                 
                     elif HBObject.objectType == "HBSurface": 
-                        newMesh = rc.Geometry.Mesh()
-                        newMesh.Append(HBObject.meshedFace)
-                        HBObject.meshedFace = newMesh
-                        # keep track of boundary conditions
-                        # and then set them to None not to create
-                        # memory issues for large models.
                         bc.append(copy.copy(HBObject.BCObject))
                         HBObject.BCObject = None
                         for csrf in HBObject.childSrfs:
                             bc.append(copy.copy(csrf.BCObject))
                             csrf.BCObject = None                    
                     
-                    newObject = copy.deepcopy(HBObject)
+                    # the copy shares the Rhino geometry of the hive object. Honeybee methods
+                    # that change geometry in place call ownGeometry to copy it first.
+                    startTime = time.time()
+                    memo = {}
+                    self.shareGeometry(HBObject, memo)
+                    newObject = copy.deepcopy(HBObject, memo)
+                    self.copyStats["copyTime"] += time.time() - startTime
+                    self.copyStats["objects"] += 1
+                    self.markSharedGeometry(newObject)
                     
                     # put the boundary condition objects back
                     count = 0
@@ -8454,7 +10946,9 @@ class hb_Hive(object):
                     HBObjects.append(sc.sticky['HBHive'][baseKey][key])
             else:
                 raise Exception('HoneybeeKeyMismatch: Failed to call the object from Honeybee hive.')
-                
+        
+        if Component != None: self.reportCopies(Component)
+        
         return HBObjects
     
     def visualizeFromHoneybeeHive(self, geometryList):
@@ -8602,6 +11096,236 @@ class CalculateGridBasedDLAnalysisResults(object):
             result.append(res)
         return result
 
+class hb_EPResultReader(object):
+    """Read EnergyPlus csv results column by column.
+    
+    The header is parsed once and only the requested columns are converted to numbers
+    in a single pass over the file. Values are stored in typed arrays (array.array('d')).
+    Cells that can't be converted are stored as NaN and the column is added to invalidColumns.
+    
+    Usage:
+        reader = hb_EPResultReader(csvFile)
+        series = reader.getSeriesByKey('Zone Mean Air Temperature')
+    """
+    
+    def __init__(self, csvFile):
+        self.csvFile = csvFile
+        with open(csvFile, "r") as inf:
+            self.headerLine = inf.readline()
+        self.header = self.headerLine.rstrip("\r\n").split(",")
+        self.columns = [self.parseColumnName(column) for column in self.header]
+        self.invalidColumns = set()
+        # columns that are already read. Reading them again only returns the stored arrays
+        self.data = {}
+        # optional function that is called after new columns are read (see hb_EPResultCache)
+        self.onRead = None
+    
+    @staticmethod
+    def parseColumnName(column):
+        """Split a column heading to (keyName, outputName, units, timestep).
+        
+        e.g. 'ZONE1:Zone Mean Air Temperature [C](Hourly)' > ('ZONE1', 'Zone Mean Air Temperature', 'C', 'Hourly')
+        """
+        column = column.strip()
+        timestep = column.split('(')[-1].split(')')[0] if column.endswith(')') else ''
+        units = column.split('[')[-1].split(']')[0] if '[' in column else ''
+        name = column.split(' [')[0]
+        if ':' in name:
+            keyName = ":".join(name.split(":")[:-1])
+            outputName = name.split(":")[-1]
+        else:
+            keyName, outputName = None, name
+        return keyName, outputName, units, timestep
+    
+    def findColumns(self, outputName):
+        """Index of columns for an output (e.g. Zone Mean Air Temperature)."""
+        outputName = outputName.lower()
+        return [count for count, column in enumerate(self.columns) \
+                if column[1].lower() == outputName]
+    
+    def readColumns(self, columnIndices):
+        """Read the values of a number of columns in a single pass.
+        
+        Columns that have been read before are not read again.
+        
+        Returns:
+            A dictionary of column index: array.array('d') of values.
+        """
+        columnIndices = sorted(set(columnIndices))
+        missingIndices = [index for index in columnIndices if index not in self.data]
+        
+        if len(missingIndices) != 0:
+            data = dict((index, array.array('d')) for index in missingIndices)
+            projection = [(index, data[index].append) for index in missingIndices]
+            nan = float('nan')
+            with open(self.csvFile, "r") as inf:
+                inf.readline() # header
+                for line in inf:
+                    if not line.strip(): continue
+                    values = line.split(",")
+                    for index, append in projection:
+                        try:
+                            append(float(values[index]))
+                        except (ValueError, IndexError):
+                            append(nan)
+                            self.invalidColumns.add(index)
+            self.data.update(data)
+            if self.onRead: self.onRead()
+        
+        return dict((index, self.data[index]) for index in columnIndices)
+    
+    def memorySize(self):
+        """Size of the values that are read so far in bytes."""
+        return sum(len(values) * values.itemsize for values in self.data.values())
+    
+    def getSeriesByKey(self, outputName):
+        """Values of an output for all the keys (e.g. zones) as a dictionary of keyName: values."""
+        indices = self.findColumns(outputName)
+        data = self.readColumns(indices)
+        return dict((self.columns[index][0], data[index]) for index in indices)
+    
+    @staticmethod
+    def findEIOFile(csvFile):
+        """Find the .eio file next to the csv file."""
+        eioFileAddress = csvFile[0:-3] + "eio"
+        if not os.path.isfile(eioFileAddress):
+            # try to find the file from the list
+            studyFolder = os.path.dirname(csvFile)
+            for fileName in os.listdir(studyFolder):
+                if fileName.lower().endswith("eio"):
+                    return os.path.join(studyFolder, fileName)
+        return eioFileAddress
+    
+    @staticmethod
+    def parseEIO(eioFileAddress):
+        """Read location, run period, zone names and floor areas from an EnergyPlus .eio file.
+        
+        Returns:
+            A dictionary with location, start, end, zoneNames and floorAreas.
+        """
+        location = "NoLocation"
+        start = "NoDate"
+        end = "NoDate"
+        zoneNameList = []
+        floorAreaList = []
+        numZonesLine = 0
+        numZonesIndex = 0
+        numZones = 0
+        zoneAreaLines = []
+        areaIndex = 0
+        
+        with open(eioFileAddress, 'r') as eioResult:
+            for lineCount, line in enumerate(eioResult):
+                if "Site:Location," in line:
+                    location = line.split(",")[1].split("WMO")[0]
+                elif "WeatherFileRunPeriod" in line:
+                    start = (int(line.split(",")[3].split("/")[0]), int(line.split(",")[3].split("/")[1]), 1)
+                    end = (int(line.split(",")[4].split("/")[0]), int(line.split(",")[4].split("/")[1]), 24)
+                elif "Zone Summary" in line and "Number of Zones" in line:
+                    numZonesLine = lineCount+1
+                    for index, text in enumerate(line.split(",")):
+                        if "Number of Zones" in text: numZonesIndex = index
+                elif lineCount == numZonesLine:
+                    numZones = line.split(",")[numZonesIndex]
+                elif "Zone Information" in line and "Floor Area {m2}" in line:
+                    zoneAreaLines = range(lineCount+1, lineCount+1+int(numZones))
+                    for index, text in enumerate(line.split(",")):
+                        if "Floor Area {m2}" in text: areaIndex = index
+                elif lineCount in zoneAreaLines:
+                    zoneNameList.append(line.split(",")[1])
+                    floorAreaList.append(float(line.split(",")[areaIndex]))
+        
+        return {"location": location, "start": start, "end": end,
+                "zoneNames": zoneNameList, "floorAreas": floorAreaList}
+
+
+class hb_EPResultCache(object):
+    """Keep parsed EnergyPlus results in memory so several components can share one load.
+    
+    Results are keyed by file path, modification time and size so a new simulation
+    invalidates them. The least recently used files are removed once the size of
+    the stored values goes over maxMemory (in MB).
+    
+    Usage:
+        cache = sc.sticky["honeybee_EPResultCache"]
+        reader = cache.getReader(csvFile)
+        eioData = cache.getEIO(csvFile)
+    """
+    
+    def __init__(self, maxMemory=500):
+        self.maxMemory = maxMemory
+        self.__entries = {}
+        self.__order = [] # least recently used first
+        self.__lock = threading.Lock()
+    
+    @staticmethod
+    def fileKey(filePath):
+        filePath = os.path.normcase(os.path.abspath(filePath))
+        stat = os.stat(filePath)
+        return filePath, stat.st_mtime, stat.st_size
+    
+    def __get(self, key):
+        # remove the outdated results for the same file
+        for cachedKey in self.__order[:]:
+            if cachedKey[0] == key[0] and cachedKey != key:
+                self.__remove(cachedKey)
+        
+        if key in self.__entries:
+            self.__order.remove(key)
+            self.__order.append(key)
+            return self.__entries[key]
+    
+    def __add(self, key, entry):
+        self.__entries[key] = entry
+        self.__order.append(key)
+    
+    def __remove(self, key):
+        del(self.__entries[key])
+        self.__order.remove(key)
+    
+    def getReader(self, csvFile):
+        """Return hb_EPResultReader for a csv file. Columns that are read once are kept."""
+        key = ("csv",) + self.fileKey(csvFile)
+        with self.__lock:
+            reader = self.__get(key)
+            if reader is None:
+                reader = hb_EPResultReader(csvFile)
+                reader.onRead = self.trim
+                self.__add(key, reader)
+            return reader
+    
+    def getEIO(self, csvFile):
+        """Return the parsed .eio file next to the csv file. See hb_EPResultReader.parseEIO."""
+        eioFile = hb_EPResultReader.findEIOFile(csvFile)
+        key = ("eio",) + self.fileKey(eioFile)
+        with self.__lock:
+            eioData = self.__get(key)
+            if eioData is None:
+                eioData = hb_EPResultReader.parseEIO(eioFile)
+                self.__add(key, eioData)
+            return eioData
+    
+    def memorySize(self):
+        """Size of the stored values in bytes."""
+        return sum(entry.memorySize() for entry in self.__entries.values() \
+                   if isinstance(entry, hb_EPResultReader))
+    
+    def trim(self):
+        """Remove the least recently used results until the cache fits in maxMemory.
+        
+        The most recently used file is always kept.
+        """
+        maxBytes = self.maxMemory * 1024 * 1024
+        with self.__lock:
+            while len(self.__order) > 1 and self.memorySize() > maxBytes:
+                self.__remove(self.__order[0])
+    
+    def clear(self):
+        with self.__lock:
+            self.__entries = {}
+            self.__order = []
+
+
 class SerializeObjects(object):
     
     def __init__(self, filePath, data = None):
@@ -8617,6 +11341,243 @@ class SerializeObjects(object):
             self.data = pickle.load(inf)
 
 
+class hb_HBObjectFile(object):
+    """Chunked binary file of dumped Honeybee objects.
+    
+    Layout:
+        header: magic and format version.
+        chunks: pickled {ID: object data} dictionaries. A zone is written in one chunk
+            with its surfaces, so one zone can be read without reading the rest of the file.
+            HVAC and library objects are kept in shared chunks that are always read.
+        table of contents: the object IDs, the offset and length of every chunk, the chunk
+            of every object and the string table.
+        footer: offset of the table of contents and the magic again.
+    
+    Meshes are packed as binary arrays of vertex coordinates and face indices, and points,
+    vectors and planes as tuples of numbers. Breps are pickled as they are so they keep their
+    exact trimming. Strings such as EnergyPlus and Radiance definitions, construction and
+    schedule names are written once in the string table and referenced by index.
+    """
+    
+    magic = "HBOBJECTS"
+    version = 2
+    headerFormat = "<%dsI"%len(magic)
+    footerFormat = "<Q%ds"%len(magic)
+    geometryTag = "\x00HBGEO"
+    stringTag = "\x00HBSTR"
+    
+    @classmethod
+    def isChunkedFile(cls, filePath):
+        """Files written before the chunked format are a single pickle."""
+        with open(filePath, "rb") as inf:
+            return inf.read(len(cls.magic)) == cls.magic
+
+
+class hb_HBObjectFileWriter(hb_HBObjectFile):
+    """Write dumped Honeybee objects to a chunked file one chunk at a time.
+    
+    The file is written to a temporary file and only replaces filePath once it is closed.
+    
+    Usage:
+        writer = hb_HBObjectFileWriter(filePath)
+        writer.writeChunk({HBZone.ID: zoneData, HBSurface.ID: surfaceData})
+        writer.writeChunk(libraryObjects, shared=True)
+        writer.close(ids)
+    """
+    
+    def __init__(self, filePath, minStringLength=8):
+        self.filePath = filePath
+        self.tempFilePath = filePath + ".tmp"
+        self.minStringLength = minStringLength
+        self.chunks = []
+        self.sharedChunks = []
+        self.objectChunks = {}
+        self.strings = []
+        self.stringIndex = {}
+        self.outf = open(self.tempFilePath, "wb")
+        self.outf.write(struct.pack(self.headerFormat, self.magic, self.version))
+    
+    def packValue(self, value):
+        if isinstance(value, basestring):
+            if len(value) < self.minStringLength: return value
+            index = self.stringIndex.get(value)
+            if index is None:
+                index = self.stringIndex[value] = len(self.strings)
+                self.strings.append(value)
+            return (self.stringTag, index)
+        elif isinstance(value, rc.Geometry.Mesh):
+            vertices = array.array("f", value.Vertices.ToFloatArray())
+            faces = array.array("i", value.Faces.ToIntArray(False))
+            return (self.geometryTag, "Mesh", vertices.tostring(), faces.tostring())
+        elif isinstance(value, rc.Geometry.Point3d):
+            return (self.geometryTag, "Point3d", value.X, value.Y, value.Z)
+        elif isinstance(value, rc.Geometry.Vector3d):
+            return (self.geometryTag, "Vector3d", value.X, value.Y, value.Z)
+        elif isinstance(value, rc.Geometry.Plane):
+            origin, xAxis, yAxis = value.Origin, value.XAxis, value.YAxis
+            return (self.geometryTag, "Plane", origin.X, origin.Y, origin.Z, \
+                    xAxis.X, xAxis.Y, xAxis.Z, yAxis.X, yAxis.Y, yAxis.Z)
+        elif isinstance(value, list):
+            return [self.packValue(item) for item in value]
+        elif isinstance(value, tuple):
+            return tuple(self.packValue(item) for item in value)
+        elif isinstance(value, dict):
+            return dict((key, self.packValue(item)) for key, item in value.iteritems())
+        return value
+    
+    def writeChunk(self, objs, shared=False):
+        """Pack and write a dictionary of {ID: object data}."""
+        if len(objs) == 0: return
+        packedObjs = dict((ID, self.packValue(data)) for ID, data in objs.iteritems())
+        chunkData = pickle.dumps(packedObjs, pickle.HIGHEST_PROTOCOL)
+        chunkIndex = len(self.chunks)
+        self.chunks.append((self.outf.tell(), len(chunkData)))
+        self.outf.write(chunkData)
+        if shared: self.sharedChunks.append(chunkIndex)
+        for ID in objs: self.objectChunks[ID] = chunkIndex
+    
+    def hasObject(self, ID):
+        return ID in self.objectChunks
+    
+    def close(self, ids):
+        """Write the table of contents and move the file to filePath."""
+        toc = {"ids": ids, "chunks": self.chunks, "sharedChunks": self.sharedChunks,
+               "objectChunks": self.objectChunks, "strings": self.strings}
+        tocOffset = self.outf.tell()
+        pickle.dump(toc, self.outf, pickle.HIGHEST_PROTOCOL)
+        self.outf.write(struct.pack(self.footerFormat, tocOffset, self.magic))
+        self.outf.close()
+        if os.path.isfile(self.filePath): os.remove(self.filePath)
+        os.rename(self.tempFilePath, self.filePath)
+    
+    def abort(self):
+        """Close and remove the temporary file."""
+        self.outf.close()
+        try: os.remove(self.tempFilePath)
+        except: pass
+
+
+class hb_HBObjectFileReader(hb_HBObjectFile):
+    """Read the objects of a chunked Honeybee object file.
+    
+    Only the table of contents is read when the file is opened. A chunk is read the first
+    time one of its objects is needed.
+    
+    Usage:
+        reader = hb_HBObjectFileReader(filePath)
+        HBData = {'ids': reader.ids, 'objs': reader.readObjects(reader.ids)}
+    """
+    
+    def __init__(self, filePath):
+        self.filePath = filePath
+        with open(filePath, "rb") as inf:
+            headerSize = struct.calcsize(self.headerFormat)
+            magic, version = struct.unpack(self.headerFormat, inf.read(headerSize))
+            if magic != self.magic:
+                raise ValueError("%s is not a chunked Honeybee object file."%filePath)
+            if version > self.version:
+                raise ValueError("%s is written by a newer version of Honeybee. Update Honeybee to load it."%filePath)
+            
+            footerSize = struct.calcsize(self.footerFormat)
+            inf.seek(-footerSize, os.SEEK_END)
+            tocOffset, magic = struct.unpack(self.footerFormat, inf.read(footerSize))
+            if magic != self.magic:
+                raise ValueError("%s is not complete. Dump the objects again."%filePath)
+            inf.seek(tocOffset)
+            toc = pickle.load(inf)
+        
+        self.ids = toc["ids"]
+        self.chunks = toc["chunks"]
+        self.sharedChunks = toc["sharedChunks"]
+        self.objectChunks = toc["objectChunks"]
+        self.strings = toc["strings"]
+        self.loadedChunks = {}
+    
+    def unpackValue(self, value):
+        if isinstance(value, tuple):
+            if len(value) > 1 and value[0] == self.stringTag: return self.strings[value[1]]
+            if len(value) > 1 and value[0] == self.geometryTag: return self.unpackGeometry(value[1], value[2:])
+            return tuple(self.unpackValue(item) for item in value)
+        elif isinstance(value, list):
+            return [self.unpackValue(item) for item in value]
+        elif isinstance(value, dict):
+            return dict((key, self.unpackValue(item)) for key, item in value.iteritems())
+        return value
+    
+    @staticmethod
+    def unpackGeometry(geometryType, data):
+        if geometryType == "Mesh":
+            vertices, faces = array.array("f"), array.array("i")
+            vertices.fromstring(data[0])
+            faces.fromstring(data[1])
+            mesh = rc.Geometry.Mesh()
+            for i in xrange(0, len(vertices), 3):
+                mesh.Vertices.Add(vertices[i], vertices[i + 1], vertices[i + 2])
+            for i in xrange(0, len(faces), 4):
+                mesh.Faces.AddFace(faces[i], faces[i + 1], faces[i + 2], faces[i + 3])
+            mesh.Normals.ComputeNormals()
+            return mesh
+        elif geometryType == "Point3d":
+            return rc.Geometry.Point3d(*data)
+        elif geometryType == "Vector3d":
+            return rc.Geometry.Vector3d(*data)
+        elif geometryType == "Plane":
+            return rc.Geometry.Plane(rc.Geometry.Point3d(*data[:3]), \
+                                     rc.Geometry.Vector3d(*data[3:6]), rc.Geometry.Vector3d(*data[6:]))
+        raise ValueError("Unknown geometry type in Honeybee object file: %s"%geometryType)
+    
+    def readChunk(self, chunkIndex):
+        if chunkIndex not in self.loadedChunks:
+            offset, length = self.chunks[chunkIndex]
+            with open(self.filePath, "rb") as inf:
+                inf.seek(offset)
+                packedObjs = pickle.loads(inf.read(length))
+            self.loadedChunks[chunkIndex] = \
+                dict((ID, self.unpackValue(data)) for ID, data in packedObjs.iteritems())
+        return self.loadedChunks[chunkIndex]
+    
+    @staticmethod
+    def getReferencedIds(data):
+        """IDs of the other objects that an object refers to."""
+        objectType = data.get('objectType')
+        referencedIds = []
+        if objectType == 'HBZone':
+            referencedIds.extend(data['surfaces'])
+            referencedIds.append(data['HVACSystem'])
+        elif objectType == 'HBHvac':
+            for key in ('airDetails', 'heatingDetails', 'coolingDetails'):
+                if data[key] != None: referencedIds.append(data[key])
+        elif objectType == 'HBSurface':
+            if data['parent'] != None: referencedIds.append(data['parent'])
+            if (not data['isChild'] and data['hasChild']) or data['type'] == 6:
+                referencedIds.extend(data['childSrfs'])
+            if data['type'] != 6 and data['BC'].lower() == 'surface':
+                referencedIds.append(data['BCObject'])
+        return referencedIds
+    
+    def readObjects(self, ids):
+        """Read the objects with the input IDs, all of the objects they refer to and the shared objects.
+        
+        Returns:
+            A dictionary of {ID: object data} like the objs of the files before the chunked format.
+        """
+        objs = {}
+        for chunkIndex in self.sharedChunks:
+            objs.update(self.readChunk(chunkIndex))
+        
+        idsToRead = list(ids)
+        while idsToRead:
+            ID = idsToRead.pop()
+            if ID in objs: continue
+            if ID not in self.objectChunks:
+                raise ValueError("Failed to find object %s in %s."%(ID, self.filePath))
+            chunkObjs = self.readChunk(self.objectChunks[ID])
+            objs.update(chunkObjs)
+            for data in chunkObjs.values():
+                idsToRead.extend(self.getReferencedIds(data))
+        return objs
+
+
 
 class hb_hvacProperties(object):
     def __init__(self):
@@ -9734,16 +12695,14 @@ if checkIn.letItFly:
             EPLibs = HB_GetEPLibraries()
             
             try:
-                for pathCount, path in enumerate(libFilePaths):
-                    if "honeybee_Hive" not in sc.sticky:
-                        # This is first time loading so clean the library
-                        cleanLibs = True if pathCount == 0 else False
-                    else:
-                        cleanLibs = False
-                    if path.endswith('.csv'): isMatFile = True
-                    else: isMatFile = False
-                    
-                    EPLibs.importEPLibrariesFromFile(path, isMatFile, cleanLibs, False)                
+                # This is first time loading so clean the library
+                cleanLibs = "honeybee_Hive" not in sc.sticky
+                idfFilePaths = [filePath for filePath in libFilePaths if not filePath.endswith('.csv')]
+                EPLibs.importEPLibrariesFromFiles(idfFilePaths, templateFilesPrep.workingDir, cleanLibs, False)
+                
+                for path in libFilePaths:
+                    if path.endswith('.csv'):
+                        EPLibs.importEPLibrariesFromFile(path, True, False, False)
                 
                 EPLibs.report()
                 sc.sticky["honeybee_materialLib"].update(EPLibs.getEPMaterials())
@@ -9771,6 +12730,7 @@ if checkIn.letItFly:
         sc.sticky["honeybee_EPScheduleAUX"] = EPScheduleAux
         sc.sticky["honeybee_EPObjectsAUX"] = EPObjectsAux
         sc.sticky["honeybee_ReadSchedules"] = ReadEPSchedules
+        sc.sticky["honeybee_ScheduleCompiler"] = hb_ScheduleCompiler()
         sc.sticky["honeybee_BuildingProgramsLib"] = BuildingProgramsLib
         sc.sticky["honeybee_EPTypes"] = EPTypes()
         sc.sticky["honeybee_EPZone"] = EPZone
@@ -9801,13 +12761,26 @@ if checkIn.letItFly:
         sc.sticky["honeybee_DLAnalysisRecipe"] = DLAnalysisRecipe
         sc.sticky["honeybee_MeshToRAD"] = hb_MSHToRAD
         sc.sticky["honeybee_WriteRAD"] = hb_WriteRAD
+        sc.sticky["honeybee_JobScheduler"] = hb_JobScheduler
         sc.sticky["honeybee_WriteRADAUX"] = hb_WriteRADAUX
+        sc.sticky["honeybee_OctreeCache"] = hb_OctreeCache()
+        sc.sticky["honeybee_AmbientCache"] = hb_AmbientCache()
+        sc.sticky["honeybee_DaylightCoefficients"] = hb_DaylightCoefficients()
         sc.sticky["honeybee_WriteDS"] = hb_WriteDS
         sc.sticky["honeybee_RADParameters"] = hb_RADParameters
         sc.sticky["honeybee_DSParameters"] = hb_DSParameters
         sc.sticky["honeybee_ReadAnnualResultsAux"] = hb_ReadAnnualResultsAux
+        sc.sticky["honeybee_IllMatrix"] = hb_IllMatrix
+        sc.sticky["honeybee_AnnualDaylightMetrics"] = hb_AnnualDaylightMetrics
+        sc.sticky["honeybee_SkyPatchIndex"] = hb_SkyPatchIndex
+        sc.sticky["honeybee_MeshBVH"] = hb_MeshBVH
+        sc.sticky["honeybee_ZonePointIndex"] = hb_ZonePointIndex
         sc.sticky["honeybee_EPParameters"] = hb_EnergySimulatioParameters
         sc.sticky["honeybee_SerializeObjects"] = SerializeObjects
+        sc.sticky["honeybee_HBObjectFileWriter"] = hb_HBObjectFileWriter
+        sc.sticky["honeybee_HBObjectFileReader"] = hb_HBObjectFileReader
+        sc.sticky["honeybee_EPResultReader"] = hb_EPResultReader
+        sc.sticky["honeybee_EPResultCache"] = hb_EPResultCache()
         sc.sticky["honeybee_GridBasedDLResults"] = CalculateGridBasedDLAnalysisResults
         sc.sticky["honeybee_DLAnalaysisTypes"] = {0: ["0: illuminance" , "lux"],
                                                   1: ["1: radiation" , "wh/m2"],
@@ -76,7 +76,6 @@ from Grasshopper.Kernel.Data import GH_Path
 import Rhino as rc
 import rhinoscriptsyntax as rs
 import scriptcontext as sc
-import operator
 import System.Threading.Tasks as tasks
 import time
 
@@ -523,6 +522,7 @@ def prepareGeometry(gridSize, distFromFloor, removeInt, sectionMethod, sectionBr
     
     #Set meshing parameters to be used throughout the function.
     srfMeshPar = rc.Geometry.MeshingParameters.Coarse
+    zonePointIndex = sc.sticky["honeybee_ZonePointIndex"]
     
     #Create the lists that will be filled.
     geoCheck = True
@@ -786,13 +786,15 @@ def prepareGeometry(gridSize, distFromFloor, removeInt, sectionMethod, sectionBr
                 for meshCount, mesh in enumerate(finalMesh):
                     allTestPts.append([])
                     allFaceBreps.append([])
+                    meshVertices = mesh.Vertices.ToPoint3dArray()
                     for faceCount, face in enumerate(mesh.Faces):
                         if face.IsQuad:
                             faceBrep = rc.Geometry.Brep.CreateFromCornerPoints(rc.Geometry.Point3d(mesh.Vertices[face.A]), rc.Geometry.Point3d(mesh.Vertices[face.B]), rc.Geometry.Point3d(mesh.Vertices[face.C]), rc.Geometry.Point3d(mesh.Vertices[face.D]), sc.doc.ModelAbsoluteTolerance)
                         if face.IsTriangle:
                             faceBrep = rc.Geometry.Brep.CreateFromCornerPoints(rc.Geometry.Point3d(mesh.Vertices[face.A]), rc.Geometry.Point3d(mesh.Vertices[face.B]), rc.Geometry.Point3d(mesh.Vertices[face.C]), sc.doc.ModelAbsoluteTolerance)
+                        if faceBrep == None: continue
                         try:
-                            centPt = rc.Geometry.AreaMassProperties.Compute(faceBrep).Centroid
+                            centPt = zonePointIndex.faceCentroid(meshVertices, face)
                             allTestPts[meshCount].append(centPt)
                             allFaceBreps[meshCount].append(faceBrep)
                         except:
@@ -893,13 +895,15 @@ def prepareGeometry(gridSize, distFromFloor, removeInt, sectionMethod, sectionBr
                         deleteIndices = []
                         deleteTestPts = []
                         deleteFaceBreps = []
+                        meshVertices = mesh.Vertices.ToPoint3dArray()
                         for faceCount, face in enumerate(mesh.Faces):
                             if face.IsQuad:
                                 faceBrep = rc.Geometry.Brep.CreateFromCornerPoints(rc.Geometry.Point3d(mesh.Vertices[face.A]), rc.Geometry.Point3d(mesh.Vertices[face.B]), rc.Geometry.Point3d(mesh.Vertices[face.C]), rc.Geometry.Point3d(mesh.Vertices[face.D]), sc.doc.ModelAbsoluteTolerance)
                             if face.IsTriangle:
                                 faceBrep = rc.Geometry.Brep.CreateFromCornerPoints(rc.Geometry.Point3d(mesh.Vertices[face.A]), rc.Geometry.Point3d(mesh.Vertices[face.B]), rc.Geometry.Point3d(mesh.Vertices[face.C]), sc.doc.ModelAbsoluteTolerance)
+                            if faceBrep == None: continue
                             try:
-                                centPt = rc.Geometry.AreaMassProperties.Compute(faceBrep).Centroid
+                                centPt = zonePointIndex.faceCentroid(meshVertices, face)
                                 #Do a final check to be sure that the test point does not lie outside the zone and, if so, delete the mesh face, and don't append the point.
                                 if zoneBreps[zoneCount].IsPointInside(centPt, tol, False) == False:
                                     deleteIndices.append(faceCount)
@@ -1065,18 +1069,14 @@ def prepareGeometry(gridSize, distFromFloor, removeInt, sectionMethod, sectionBr
                             zoneWeights[falseZoneCount][pointCount].append(weight/sum(initPointWeights))
         else:
             #For each of the test points, give them a weight totalling to 1 based on which zone they belong to.
+            oldZoneIndex = sc.sticky["honeybee_ZonePointIndex"](oldZoneBreps, tol)
             for falseZoneCount, falseZone in enumerate(testPts):
-                if sectionMethod != 0 and includeOutdoor == True:
-                    if falseZoneCount != len(testPts)-1:
-                        for pointCount, point in enumerate(falseZone):
-                            for orignalZoneCount, oirignalZone in enumerate(oldZoneBreps):
-                                if oirignalZone.IsPointInside(point, tol, False) == True: zoneWeights[falseZoneCount][pointCount].append(1)
-                                else: zoneWeights[falseZoneCount][pointCount].append(0)
-                else:
-                    for pointCount, point in enumerate(falseZone):
-                        for orignalZoneCount, oirignalZone in enumerate(oldZoneBreps):
-                            if oirignalZone.IsPointInside(point, tol, False) == True: zoneWeights[falseZoneCount][pointCount].append(1)
-                            else: zoneWeights[falseZoneCount][pointCount].append(0)
+                if sectionMethod != 0 and includeOutdoor == True and falseZoneCount == len(testPts)-1: continue
+                for pointCount, point in enumerate(falseZone):
+                    pointZones = oldZoneIndex.zonesOfPoint(point)
+                    for orignalZoneCount in range(len(oldZoneBreps)):
+                        if orignalZoneCount in pointZones: zoneWeights[falseZoneCount][pointCount].append(1)
+                        else: zoneWeights[falseZoneCount][pointCount].append(0)
         
         #Calculate height weights for each of the points.
         for falseZoneCount, falseZone in enumerate(testPts):
@@ -1257,45 +1257,52 @@ def checkViewResolution(viewResolution, lb_preparation):
     
     return newVecs, skyViewVecs, newVecsAreas, skyViewVecsAreas
 
-def allSame(items):
-    return all(x == items[0] for x in items)
+def pointViewFactors(srfBVH, numOfSrfs, point, viewVectors):
+    #Find the surface that each ray hits first.
+    divisor = len(viewVectors)
+    srfHits = []
+    for srf in range(numOfSrfs): srfHits.append(0)
+    for srfIndex in srfBVH.nearestHits(point, viewVectors):
+        if srfIndex != None: srfHits[srfIndex] += 1
+    
+    #Divide the hits by the total rays to get the view factor.
+    return [hitCount/divisor for hitCount in srfHits]
+
+def pointSkyView(srfBVH, opaqueCount, point, skyViewVecs, zoneWindowTransmiss, zoneHasWindows, zoneWindowNames):
+    #Cast the sky rays through the windows and check if they are blocked by an opaque surface.
+    divisor = len(skyViewVecs)
+    finalViewCount = []
+    finalWindowNameCount = []
+    for transmiss, windowIndices in srfBVH.transmissionHits(point, skyViewVecs, opaqueCount, zoneWindowTransmiss):
+        if windowIndices == None:
+            #The ray has been blocked by an opaque surface.
+            finalViewCount.append(0)
+            finalWindowNameCount.append(0)
+        elif zoneHasWindows == 2:
+            finalViewCount.append(1) #This is the code to indicate that the point is outside and there is no need to calculate a window transmissivity.
+            finalWindowNameCount.append(0)
+        else:
+            #The ray is not blocked but it is hitting a window and so we need to factor in the window transmissivity.
+            finalViewCount.append(transmiss)
+            finalWindowNameCount.append([zoneWindowNames[winCount].upper() for winCount in windowIndices])
+    
+    #Sum up the lists and divide by the total rays to get the view factor.
+    return sum(finalViewCount)/divisor, finalViewCount, finalWindowNameCount
+
+def zoneSkyBVH(zoneOpaqueMesh, zoneWindowMesh, zoneHasWindows):
+    #Put the opaque and the window meshes of a zone in one BVH. Windows don't matter for outdoor points.
+    if zoneHasWindows == 2: zoneWindowMesh = []
+    return sc.sticky["honeybee_MeshBVH"](list(zoneOpaqueMesh) + list(zoneWindowMesh))
 
 def parallel_projection(zoneSrfsMesh, viewVectors, pointList):
     #Placeholder for the outcome of the parallel projection.
     pointIntList = []
     for point in pointList: pointIntList.append([])
     
-    #Keep track of the divisor.
-    divisor = len(viewVectors)
+    srfBVH = sc.sticky["honeybee_MeshBVH"](zoneSrfsMesh)
     
     def intersect(i):
-        point = pointList[i]
-        #Create the rays to be projected from each point.
-        pointRays = []
-        for vec in viewVectors: pointRays.append(rc.Geometry.Ray3d(point, vec))
-        
-        #Create a list that will hold the intersection hits of each surface
-        srfHits = []
-        for srf in zoneSrfsMesh: srfHits.append([])
-        
-        #Perform the intersection of the rays with the mesh.
-        pointIntersectList = []
-        for rayCount, ray in enumerate(pointRays):
-            pointIntersectList.append([])
-            for srf in zoneSrfsMesh:
-                intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                if intersect == -1: intersect = "N"
-                pointIntersectList[rayCount].append(intersect)
-        
-        #Find the intersection that was the closest for each ray.
-        for list in pointIntersectList:
-            if allSame(list) == False:
-                minIndex, minValue = min(enumerate(list), key=operator.itemgetter(1))
-                srfHits[minIndex].append(1)
-        
-        #Sum up the lists and divide by the total rays to get the view factor.
-        for hitList in srfHits:
-            pointIntList[i].append(sum(hitList)/divisor)
+        pointIntList[i] = pointViewFactors(srfBVH, len(zoneSrfsMesh), pointList[i], viewVectors)
     
     tasks.Parallel.ForEach(range(len(pointList)), intersect)
     
@@ -1312,58 +1319,11 @@ def parallel_skyProjection(zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, pointL
         skyBlockedList.append([])
         skyBlockWindowNameCount.append([])
     
-    #Keep track of the divisor.
-    divisor = len(skyViewVecs)
+    srfBVH = zoneSkyBVH(zoneOpaqueMesh, zoneWindowMesh, zoneHasWindows)
     
     def intersect(i):
-        point = pointList[i]
-        #Create the rays to be projected from each point.
-        pointRays = []
-        for vec in skyViewVecs: pointRays.append(rc.Geometry.Ray3d(point, vec))
-        
-        #Perform the intersection of the rays with the opaque mesh.
-        pointIntersectList = []
-        for rayCount, ray in enumerate(pointRays):
-            pointIntersectList.append([])
-            for srf in zoneOpaqueMesh:
-                intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                if intersect == -1: pass
-                else: pointIntersectList[rayCount].append(1)
-        
-        #See if the ray passed all of the context meshes.
-        finalIntersectList = []
-        for ray in pointRays:
-            finalIntersectList.append([])
-        for listCt, rayList in enumerate(pointIntersectList):
-            for intersect in rayList:
-                finalIntersectList[listCt].append(intersect)
-        
-        finalViewCount = []
-        finalWindowNameCount = []
-        for rayListCount, rayList in enumerate(finalIntersectList):
-            if sum(rayList) == 0:
-                if zoneHasWindows == 2:
-                    finalViewCount.append(1)
-                    finalWindowNameCount.append(0)
-                else:
-                    transmiss = 1
-                    winNameList = []
-                    for winCount, winMesh in enumerate(zoneWindowMesh):
-                        intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, pointRays[rayListCount])
-                        if intersect == -1: pass
-                        else:
-                            transmiss = transmiss * zoneWindowTransmiss[winCount]
-                            winNameList.append(zoneWindowNames[winCount].upper())
-                    finalViewCount.append(transmiss)
-                    finalWindowNameCount.append(winNameList)
-            else:
-                finalViewCount.append(0)
-                finalWindowNameCount.append(0)
-        
-        #Sum up the lists and divide by the total rays to get the view factor.
-        skyBlockedList[i] = finalViewCount
-        skyBlockWindowNameCount[i] = finalWindowNameCount
-        pointIntList[i] = sum(finalViewCount)/divisor
+        pointIntList[i], skyBlockedList[i], skyBlockWindowNameCount[i] = \
+            pointSkyView(srfBVH, len(zoneOpaqueMesh), pointList[i], skyViewVecs, zoneWindowTransmiss, zoneHasWindows, zoneWindowNames)
     
     tasks.Parallel.ForEach(range(len(pointList)), intersect)
     
@@ -1392,58 +1352,11 @@ def skyViewCalc(testPts, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasW
                 testPtSkyView.append([])
                 testPtSkyBlockedList.append([])
                 testPtBlockName.append([])
+                srfBVH = zoneSkyBVH(zoneOpaqueMesh[zoneCount], zoneWindowMesh[zoneCount], zoneHasWindows[zoneCount])
                 for pointCount, point in enumerate(pointList):
-                    #Make the list that will eventually hold the view factors of each surface.
-                    divisor = len(skyViewVecs)
-                    
-                    #Create the rays to be projected from each point.
-                    pointRays = []
-                    for vec in skyViewVecs: pointRays.append(rc.Geometry.Ray3d(point, vec))
-                    
-                    #Perform the intersection of the rays with the opaque mesh.
-                    pointIntersectList = []
-                    for rayCount, ray in enumerate(pointRays):
-                        pointIntersectList.append([])
-                        for srf in zoneOpaqueMesh[zoneCount]:
-                            intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                            if intersect == -1: pointIntersectList[rayCount].append(0)
-                            else: pointIntersectList[rayCount].append(1)
-                    
-                    #See if the ray passed all of the context meshes.
-                    finalIntersectList = []
-                    for ray in pointRays:
-                        finalIntersectList.append([])
-                    for listCt, rayList in enumerate(pointIntersectList):
-                        for intersect in rayList:
-                            finalIntersectList[listCt].append(intersect)
-                    
-                    finalViewCount = []
-                    finalWindowNameCount = []
-                    for rayListCount, rayList in enumerate(finalIntersectList):
-                        if sum(rayList) == 0:
-                            if zoneHasWindows[zoneCount] == 2:
-                                finalViewCount.append(1) #This is the code to indicate that the point is outside and there is no need to calculate a window transmissivity.
-                                finalWindowNameCount.append(0)
-                            else:
-                                #The ray is not blocked but it is hitting a window and so we need to factor in the window transmissivity.
-                                transmiss = 1
-                                winNameList = []
-                                for winCount, winMesh in enumerate(zoneWindowMesh[zoneCount]):
-                                    intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, pointRays[rayListCount])
-                                    if intersect == -1: pass
-                                    else:
-                                        transmiss = transmiss * zoneWindowTransmiss[zoneCount][winCount]
-                                        winNameList.append(zoneWindowNames[zoneCount][winCount].upper())
-                                finalViewCount.append(transmiss)
-                                finalWindowNameCount.append(winNameList)
-                        else:
-                            #The ray has been blocked by an opaque surface.
-                            finalViewCount.append(0)
-                            finalWindowNameCount.append(0)
-                    
-                    #Sum up the lists and divide by the total rays to get the view factor.
+                    skyViewFactor, finalViewCount, finalWindowNameCount = pointSkyView(srfBVH, len(zoneOpaqueMesh[zoneCount]), point, skyViewVecs, zoneWindowTransmiss[zoneCount], zoneHasWindows[zoneCount], zoneWindowNames[zoneCount])
                     testPtSkyBlockedList[zoneCount].append(finalViewCount)
-                    testPtSkyView[zoneCount].append(sum(finalViewCount)/divisor)
+                    testPtSkyView[zoneCount].append(skyViewFactor)
                     testPtBlockName[zoneCount].append(finalWindowNameCount)
         else:
             testPtSkyView.append(0)
@@ -1462,39 +1375,9 @@ def main(testPts, zoneSrfsMesh, viewVectors, includeOutdoor):
             testPtViewFactor.append(viewFactors)
         else:
             testPtViewFactor.append([])
+            srfBVH = sc.sticky["honeybee_MeshBVH"](zoneSrfsMesh[zoneCount])
             for pointCount, point in enumerate(pointList):
-                #Make the list that will eventually hold the view factors of each surface.
-                testPtViewFactor[zoneCount].append([])
-                divisor = len(viewVectors)
-                
-                #Create the rays to be projected from each point.
-                pointRays = []
-                for vec in viewVectors: pointRays.append(rc.Geometry.Ray3d(point, vec))
-                
-                #Create a list that will hold the intersection hits of each surface
-                srfHits = []
-                for srf in zoneSrfsMesh[zoneCount]: srfHits.append([])
-                
-                #Perform the intersection of the rays with the mesh.
-                pointIntersectList = []
-                for rayCount, ray in enumerate(pointRays):
-                    pointIntersectList.append([])
-                    for srf in zoneSrfsMesh[zoneCount]:
-                        intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                        if intersect == -1: intersect = "N"
-                        pointIntersectList[rayCount].append(intersect)
-                
-                #Find the intersection that was the closest for each ray.
-                for list in pointIntersectList:
-                    try:
-                        if allSame(list) == False:
-                            minIndex, minValue = min(enumerate(list), key=operator.itemgetter(1))
-                            srfHits[minIndex].append(1)
-                    except: pass
-                
-                #Sum up the lists and divide by the total rays to get the view factor.
-                for hitList in srfHits:
-                    testPtViewFactor[zoneCount][pointCount].append(sum(hitList)/divisor)
+                testPtViewFactor[zoneCount].append(pointViewFactors(srfBVH, len(zoneSrfsMesh[zoneCount]), point, viewVectors))
     
     
     return testPtViewFactor
@@ -89,7 +89,7 @@ def loadHBObjects(HBData):
         HBViewFac = hb_viewFac()
         # update fields in HBZone
         for key, value in HBViewFacInfo.iteritems():
-            HBViewFac.__dict__[key] = value
+            setattr(HBViewFac, key, value)
         HBViewFac.calcNumPts()
         HBObjects[HBViewFac.ID] = HBViewFac
     
@@ -246,6 +246,12 @@ def main(filePath):
     if not os.path.isfile(filePath):
         raise ValueError("Can't find %s"%filePath)
     
+    hb_HBObjectFileReader = sc.sticky["honeybee_HBObjectFileReader"]
+    if hb_HBObjectFileReader.isChunkedFile(filePath):
+        reader = hb_HBObjectFileReader(filePath)
+        return loadHBObjects({'ids': reader.ids, 'objs': reader.readObjects(reader.ids)})
+    
+    # files that are dumped before the chunked format are a single pickle.
     with open(filePath, "rb") as inf:
         return loadHBObjects(pickle.load(inf))
 
@@ -84,7 +84,7 @@ def main(HBZones):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     
     #Get the types to be made adiabatic.
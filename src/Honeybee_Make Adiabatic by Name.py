@@ -77,7 +77,7 @@ def main(HBObjs,nameList):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjects = hb_hive.callFromHoneybeeHive(HBObjs)
+    HBObjects = hb_hive.callFromHoneybeeHive(HBObjs, ghenv.Component)
     
     for HBO in HBObjects:
         if HBO.objectType == "HBZone":
@@ -77,7 +77,7 @@ def main(HBSrfs):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBSurfaces = hb_hive.callFromHoneybeeHive(HBSrfs)
+    HBSurfaces = hb_hive.callFromHoneybeeHive(HBSrfs, ghenv.Component)
     for HBS in HBSurfaces:
         HBS.BC = "Adiabatic"
         changeSrfType(HBS)
@@ -77,6 +77,9 @@ import Rhino as rc
 import scriptcontext as sc
 import math
 import os
+import array
+import operator
+import itertools
 import System.Threading.Tasks as tasks
 
 
@@ -282,31 +285,38 @@ def processPrevailOutdoorTemp(prevailingOutdoorTemp, avgMonthOrRunMean):
     return prevailTemp, coldTimes
 
 
-def calculatePointMRT(srfTempDict, testPtsViewFactor, hour, originalHour, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp):
+def buildSrfTempMatrix(srfTempDict, testPtsViewFactor, hourIndices, outdoorClac, outSrfTempDict):
+    #Turn the surface temperatures of each zone into a dense surface x hour matrix of (T+273.15)^4.
+    #This way the MRT of a point is a single product of its view factors and a column of the matrix.
+    hourColumns = dict((hour, col) for col, hour in enumerate(hourIndices))
+    zoneMatrices = []
+    for zoneCount, pointList in enumerate(testPtsViewFactor):
+        if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1: tempDict = srfTempDict
+        else: tempDict = outSrfTempDict
+        numOfSrfs = max([len(pointViewFactor) for pointViewFactor in pointList] + [0])
+        zoneMatrix = []
+        for srfCount in range(numOfSrfs):
+            srfTemps = tempDict[str([zoneCount,srfCount])]["srfTemp"]
+            zoneMatrix.append(array.array('d', [math.pow((srfTemps[hour] + 273.15),4) for hour in hourIndices]))
+        zoneMatrices.append(zoneMatrix)
+    
+    return hourColumns, zoneMatrices
+
+def calculatePointMRT(srfTempMatrix, testPtsViewFactor, hour, originalHour, outdoorClac, outdoorNonSrfViewFac, prevailingOutdoorTemp):
     #Calculate the MRT for each point.
+    hourColumns, zoneMatrices = srfTempMatrix
+    col = hourColumns[hour]
     pointMRTValues = []
     for zoneCount, pointList in enumerate(testPtsViewFactor):
+        srfTemps = [srfRow[col] for srfRow in zoneMatrices[zoneCount]]
         if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
-            pointMRTValues.append([])
-            for pointViewFactor in pointList:
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((srfTempDict[path]["srfTemp"][hour] + 273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
+            pointMRTValues.append([round(math.pow(sum(itertools.imap(operator.mul, pointViewFactor, srfTemps)),0.25) - 273.15, 3) \
+                                   for pointViewFactor in pointList])
         else:
+            outdoorTemp = math.pow((prevailingOutdoorTemp[originalHour]+273.15),4)
             pointMRTValues.append([])
             for ptCount, pointViewFactor in enumerate(pointList):
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((outSrfTempDict[path]["srfTemp"][hour]+273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                
-                weightedSrfTemp = outdoorNonSrfViewFac[ptCount]*(math.pow((prevailingOutdoorTemp[originalHour]+273.15),4))
-                pointMRT = pointMRT+weightedSrfTemp
+                pointMRT = sum(itertools.imap(operator.mul, pointViewFactor, srfTemps)) + outdoorNonSrfViewFac[ptCount]*outdoorTemp
                 pointMRT = pointMRT / (sum(pointViewFactor) + outdoorNonSrfViewFac[ptCount])
                 pointMRT = math.pow(pointMRT,0.25) - 273.15
                 pointMRTValues[zoneCount].append(round(pointMRT, 3))
@@ -314,6 +324,10 @@ def calculatePointMRT(srfTempDict, testPtsViewFactor, hour, originalHour, outdoo
     return pointMRTValues
 
 def computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac):
+    #The dense sky matrices of the view factor info gather the window transmissivity into the sky patches.
+    if hasattr(testPtBlockedVec, 'shadeByWindows') and hasattr(testPtBlockName, 'chainFactors'):
+        return testPtBlockedVec.shadeByWindows(testPtBlockName, hour, winShdDict)
+    
     #Build a new testPtBlockedVec that checks with the window transmissivity status.
     newTestPtBlockedVec = []
     newTestPtSkyView = []
@@ -343,25 +357,35 @@ def computeSkyTemp(La):
     
     return skyTemp
 
-def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, diffSolarRad, directSolarRad, globHorizRadList, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels):
+def getSunPatches(skyPatches, sunVecs):
+    #Find the sky patch of each sun vector once for all of the hours.
+    if sc.sticky.has_key("honeybee_SkyPatchIndex"):
+        return sc.sticky["honeybee_SkyPatchIndex"].fromSkyPatches(skyPatches).getPatches(sunVecs)
+    
+    #If Honeybee is not flying, intersect the sun vectors with the patches.
+    skyPatchMeshes = []
+    for patch in skyPatches:
+        skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
+    sunPatches = []
+    for sunVec in sunVecs:
+        sunPatch = None
+        if sunVec != None:
+            ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, sunVec)
+            for patchCount, patch in enumerate(skyPatchMeshes):
+                if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0:
+                    sunPatch = patchCount
+                    break
+        sunPatches.append(sunPatch)
+    
+    return sunPatches
+
+def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, diffSolarRad, directSolarRad, globHorizRadList, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels):
     #Pull out the correct sun vector.
     sunVec = sunVecInfo[0][count]
     altitude = sunVecInfo[1][count]
     
-    #Assign the sun vector to a sky patch that aligns with the testPtBlockedVec list.
-    vectorskyPatches = []
-    
-    if sunVec != None:
-        intersected = False
-        ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, sunVec)
-        for patchCount, patch in enumerate(skyPatchMeshes):
-            if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0:
-                vectorskyPatches.append(patchCount)
-                intersected = True
-        if intersected == False:
-            vectorskyPatches.append(None)
-    else:
-        vectorskyPatches.append(None)
+    #The sky patch of the sun vector that aligns with the testPtBlockedVec list is found once for all of the hours.
+    vectorskyPatches = [sunVecInfo[3][count]]
     
     
     ##Calculate the diffuse, direct, and global horizontal components of the solar radiation at the hour.
@@ -395,10 +419,15 @@ def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, di
         for zoneCount, zonePtsList in enumerate(pointMRTValues):
             if zoneHasWindows[zoneCount] != 0:
                 solarAdjustedPointMRTValues.append([])
+                #Get the transmissivity of the sun patch for all of the points at once.
+                if vectorskyPatches[0] != None:
+                    if hasattr(testPtBlockedVec, 'column'): sunPatchTransmiss = testPtBlockedVec.column(zoneCount, vectorskyPatches[0])
+                    else: sunPatchTransmiss = [ptBlockedVec[vectorskyPatches[0]] for ptBlockedVec in testPtBlockedVec[zoneCount]]
+                zoneSkyView = testPtSkyView[zoneCount]
                 for pointCount, pointMRT in enumerate(zonePtsList):
                     #Check if the sunray is blocked.
                     if vectorskyPatches[0] != None:
-                        if testPtBlockedVec[zoneCount][pointCount][vectorskyPatches[0]] == 0: sunBlocked = True
+                        if sunPatchTransmiss[pointCount] == 0: sunBlocked = True
                         else: sunBlocked = False
                     else: sunBlocked = True
                     
@@ -408,17 +437,17 @@ def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, di
                         dirRadFinal = 0.0
                         globHorizRadFinal = diffRad
                     else:
-                        dirRadFinal = dirNormRad*(testPtBlockedVec[zoneCount][pointCount][vectorskyPatches[0]])
+                        dirRadFinal = dirNormRad*(sunPatchTransmiss[pointCount])
                         globHorizRadFinal = globHorizRad
                     
                     if outdoorClac == False or zoneCount != len(pointMRTValues)-1:
-                        hourERF = ((0.5*fracEff*testPtSkyView[zoneCount][pointCount]*(diffRad + (globHorizRadFinal*floorR[zoneCount][pointCount]))+ (fracEff*ProjAreaFac*dirRadFinal))*winTrans[originalHour-1])*(cloA/0.95)
+                        hourERF = ((0.5*fracEff*zoneSkyView[pointCount]*(diffRad + (globHorizRadFinal*floorR[zoneCount][pointCount]))+ (fracEff*ProjAreaFac*dirRadFinal))*winTrans[originalHour-1])*(cloA/0.95)
                         mrtDelt = (hourERF/(fracEff*radTransCoeff))
                         hourMRT = mrtDelt + pointMRT
                     else:
-                        hourERF = ((0.5*fracEff*testPtSkyView[zoneCount][pointCount]*(diffRad + (globHorizRadFinal*floorR[zoneCount][pointCount]))+ (fracEff*ProjAreaFac*dirRadFinal)))*(cloA/0.95)
+                        hourERF = ((0.5*fracEff*zoneSkyView[pointCount]*(diffRad + (globHorizRadFinal*floorR[zoneCount][pointCount]))+ (fracEff*ProjAreaFac*dirRadFinal)))*(cloA/0.95)
                         mrtDelt = (hourERF/(fracEff*radTransCoeff))
-                        hourMRT = mrtDelt + (skyTemp*(testPtSkyView[zoneCount][pointCount]/2) + pointMRT*(1-(testPtSkyView[zoneCount][pointCount]/2)))
+                        hourMRT = mrtDelt + (skyTemp*(zoneSkyView[pointCount]/2) + pointMRT*(1-(zoneSkyView[pointCount]/2)))
                     
                     solarAdjustedPointMRTValues[zoneCount].append(round(hourMRT, 3))
             else:
@@ -431,24 +460,26 @@ def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, di
     return solarAdjustedPointMRTValues
 
 
-def getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour, originalHour, outdoorClac, prevailingOutdoorTemp):
-    #Calculate the value for each point.
+def buildZoneValueMatrix(zoneDict, testPtZoneWeights, testPtsViewFactor, outdoorClac):
+    #Pull the hourly zone values out of the dictionary once as a zone x hour matrix.
+    numOfZones = 0
+    for zoneCount, pointList in enumerate(testPtsViewFactor):
+        if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
+            for pointWeght in testPtZoneWeights[zoneCount]: numOfZones = max(numOfZones, len(pointWeght))
+    
+    return [zoneDict[count]["airTemp"] for count in range(numOfZones)]
+
+def getAirPointValue(zoneValueMatrix, testPtZoneWeights, testPtsViewFactor, hour, originalHour, outdoorClac, prevailingOutdoorTemp):
+    #Calculate the value for each point as a weighted product of the zone values at the hour.
+    zoneValues = [zoneVal[hour] for zoneVal in zoneValueMatrix]
     pointValues = []
     for zoneCount, pointList in enumerate(testPtsViewFactor):
         if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
-            pointValues.append([])
-            for pointWeght in testPtZoneWeights[zoneCount]:
-                pointValue = 0
-                for Count, weight in enumerate(pointWeght):
-                    path  = Count
-                    weightedPointVal = weight*(airTempDict[path]["airTemp"][hour])
-                    pointValue = pointValue+weightedPointVal
-                pointValues[zoneCount].append(round(pointValue, 3))
+            pointValues.append([round(sum(itertools.imap(operator.mul, pointWeght, zoneValues)), 3) \
+                                for pointWeght in testPtZoneWeights[zoneCount]])
         else:
-            pointValues.append([])
-            for pointWeght in pointList:
-                pointValue = prevailingOutdoorTemp[originalHour]
-                pointValues[zoneCount].append(round(pointValue, 3))
+            pointValue = round(prevailingOutdoorTemp[originalHour], 3)
+            pointValues.append([pointValue for pointWeght in pointList])
     
     return pointValues
 
@@ -822,9 +853,6 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
         if sum(zoneHasWindows) != 0:
             #Create a meshed sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -844,7 +872,7 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 sunVecs.append(sunVec)
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
-            sunVecInfo = [sunVecs, altitudes, azimuths]
+            sunVecInfo = [sunVecs, altitudes, azimuths, getSunPatches(skyPatches, sunVecs)]
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -863,6 +891,11 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            #Make dense matrices of the surface temperatures and zone values for all of the hours.
+            hourIndices = [hour-1 for hour in HOYs]
+            srfTempMatrix = buildSrfTempMatrix(srfTempDict, testPtsViewFactor, hourIndices, outdoorClac, outSrfTempDict)
+            airTempMatrix = buildZoneValueMatrix(airTempDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            
             def climateMap(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -878,18 +911,18 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp)
+                pointMRTValues = calculatePointMRT(srfTempMatrix, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outdoorNonSrfViewFac, prevailingOutdoorTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
                         hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
-                pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, prevailingOutdoorTemp)
+                pointAirTempValues = getAirPointValue(airTempMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, prevailingOutdoorTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, prevailingOutdoorTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
                 airTempMtx[count+1] = pointAirTempValues
@@ -1017,9 +1050,6 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         if sum(zoneHasWindows) != 0:
             #Create a meshed sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -1039,7 +1069,7 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 sunVecs.append(sunVec)
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
-            sunVecInfo = [sunVecs, altitudes, azimuths]
+            sunVecInfo = [sunVecs, altitudes, azimuths, getSunPatches(skyPatches, sunVecs)]
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1059,6 +1089,12 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            #Make dense matrices of the surface temperatures and zone values for all of the hours.
+            hourIndices = [hour-1 for hour in HOYs]
+            srfTempMatrix = buildSrfTempMatrix(srfTempDict, testPtsViewFactor, hourIndices, outdoorClac, outSrfTempDict)
+            airTempMatrix = buildZoneValueMatrix(airTempDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            relHumidMatrix = buildZoneValueMatrix(relHumidDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            
             def climateMapPMV(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -1074,24 +1110,24 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = calculatePointMRT(srfTempMatrix, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outdoorNonSrfViewFac, outDryBulbTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
                         hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
-                pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
+                pointAirTempValues = getAirPointValue(airTempMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, outDryBulbTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
                 airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the relative humidity.
-                pointRelHumidValues = getAirPointValue(relHumidDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
+                pointRelHumidValues = getAirPointValue(relHumidMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
                 pointRelHumidValues = lb_preparation.flattenList(pointRelHumidValues)
                 
                 #Compute the wind speed.
@@ -1224,9 +1260,6 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
         if sum(zoneHasWindows) != 0:
             #Create a meshed sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -1246,7 +1279,7 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 sunVecs.append(sunVec)
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
-            sunVecInfo = [sunVecs, altitudes, azimuths]
+            sunVecInfo = [sunVecs, altitudes, azimuths, getSunPatches(skyPatches, sunVecs)]
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         try: airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1268,6 +1301,12 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            #Make dense matrices of the surface temperatures and zone values for all of the hours.
+            hourIndices = [hour-1 for hour in HOYs]
+            srfTempMatrix = buildSrfTempMatrix(srfTempDict, testPtsViewFactor, hourIndices, outdoorClac, outSrfTempDict)
+            airTempMatrix = buildZoneValueMatrix(airTempDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            relHumidMatrix = buildZoneValueMatrix(relHumidDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            
             def climateMapUTCI(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -1283,24 +1322,24 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = calculatePointMRT(srfTempMatrix, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outdoorNonSrfViewFac, outDryBulbTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
                         hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
-                pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
+                pointAirTempValues = getAirPointValue(airTempMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, outDryBulbTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
                 airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the relative humidity.
-                pointRelHumidValues = getAirPointValue(relHumidDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
+                pointRelHumidValues = getAirPointValue(relHumidMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
                 pointRelHumidValues = lb_preparation.flattenList(pointRelHumidValues)
                 
                 #Compute the wind speed.
@@ -1429,9 +1468,6 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         if sum(zoneHasWindows) != 0:
             #Create a meshed sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -1451,7 +1487,7 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 sunVecs.append(sunVec)
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
-            sunVecInfo = [sunVecs, altitudes, azimuths]
+            sunVecInfo = [sunVecs, altitudes, azimuths, getSunPatches(skyPatches, sunVecs)]
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         try: airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1473,6 +1509,12 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            #Make dense matrices of the surface temperatures and zone values for all of the hours.
+            hourIndices = [hour-1 for hour in HOYs]
+            srfTempMatrix = buildSrfTempMatrix(srfTempDict, testPtsViewFactor, hourIndices, outdoorClac, outSrfTempDict)
+            airTempMatrix = buildZoneValueMatrix(airTempDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            relHumidMatrix = buildZoneValueMatrix(relHumidDict, testPtZoneWeights, testPtsViewFactor, outdoorClac)
+            
             def climateMapPET(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -1488,24 +1530,24 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = calculatePointMRT(srfTempMatrix, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outdoorNonSrfViewFac, outDryBulbTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
                         hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
-                pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
+                pointAirTempValues = getAirPointValue(airTempMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, outDryBulbTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
                 airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the relative humidity.
-                pointRelHumidValues = getAirPointValue(relHumidDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
+                pointRelHumidValues = getAirPointValue(relHumidMatrix, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
                 pointRelHumidValues = lb_preparation.flattenList(pointRelHumidValues)
                 
                 #Compute the wind speed.
@@ -74,7 +74,7 @@ def main(HBObj, plane, name, keepAdj=False):
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
     try:
-        HBObject = hb_hive.callFromHoneybeeHive(HBObj)
+        HBObject = hb_hive.callFromHoneybeeHive(HBObj, ghenv.Component)
     except:
         raise TypeError("Wrong input type for _HBObj. Connect a Honeybee Surface or a HoneybeeZone to HBObject input")
     
@@ -51,6 +51,7 @@ except: pass
 
 
 import os
+import scriptcontext as sc
 from System import Object
 import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
@@ -186,11 +187,20 @@ def main(illFilesAddress, testPoints, annualProfiles):
                 # add an empty list for each state
                 illuminanceValues[shadingGroupCount][HOY].append([])
     
+    # use binary cache of ill files if Honeybee is flying
+    hb_illMatrix = sc.sticky.get("honeybee_IllMatrix")
+    
     totalPtCount = 0
     ptsCountSoFar = 0
     for shadingGroupCount in range(len(illFileSets.keys())):
         for shadingState, resultFiles in enumerate(illFileSets[shadingGroupCount]):
             for resultFile in resultFiles:
+                illMatrix = hb_illMatrix.load(resultFile) if hb_illMatrix else None
+                if illMatrix:
+                    for HOY, hourlyValues in illMatrix.iterHours():
+                        illuminanceValues[shadingGroupCount][HOY][shadingState].extend(hourlyValues)
+                    continue
+                
                 result = open(resultFile, 'r')
                 for HOY, line in enumerate(result):
                    line = line.replace('\n', '', 10)
@@ -23,6 +23,9 @@
 """
 Read Annual Daylight Results I [Standard Daysim Results]
 
+-
+The results are calculated by Daysim which applies the occupancy, dynamic blinds and lighting control groups and are read with the same annual metrics engine that Read Annual Result II uses. Read Annual Result II calculates the metrics from the .ill files with working hours and without the lighting control groups so the results of the two components can be different for the same study.
+
 -
 Provided by Honeybee 0.0.65
 
@@ -93,48 +96,16 @@ def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False, waitingTim
             batchFileNames: List of batch files
             maxPRuns: max number of files to be ran in parallel (default = 0)
             shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
+            waitingTime: Not used anymore. Kept for backwards compatibility.
     """
-
-    if not maxPRuns : maxPRuns = 1
-    maxPRuns = int(maxPRuns)
-    total = len(batchFileNames)
     
-    if maxPRuns < 1: maxPRuns = 1
-    if maxPRuns > total: maxPRuns = total
+    hb_scheduler = sc.sticky["honeybee_JobScheduler"]
+    jobs = hb_scheduler(maxPRuns, shell).run([fileName.replace("\\", "/") for fileName in batchFileNames])
     
-    running = 0
-    done = False
-    jobs = []
-    pid = 0
+    if len(hb_scheduler.failedJobs(jobs)) != 0:
+        print hb_scheduler.report(jobs)
     
-    try:
-        while not done:
-            if running < maxPRuns and pid < total:
-                # execute the files
-                jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                pid+=1
-                time.sleep(waitingTime)
-            
-            # count how many jobs are running and how many are done
-            running = 0
-            finished = 0
-            for job in jobs:
-                if job.poll() is None:
-                    #one job is still running
-                    running += 1
-                else:
-                    finished += 1
-    
-            if running == maxPRuns:
-                # wait for half a second
-                #print "waiting..."
-                time.sleep(waitingTime)
-    
-            if finished ==  total:
-                done = True
-    
-    except Exception, e:
-        print "Something went wrong: %s"%str(e) 
+    return jobs
 
 
 def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
@@ -190,11 +161,7 @@ def convertEPScheduleToDSSchedule(scheduleName, folder):
           "daylight savings time is based on user input),,\n" + \
           "# month,day,time,occupancy (1=present/0=absent)\n"
 
-    readSchedules = sc.sticky["honeybee_ReadSchedules"](scheduleName, 0)
-    dailyValues  = readSchedules.getScheduleValues()
-        
-    hourlyValues = []
-    for values in dailyValues: hourlyValues.extend(values)
+    hourlyValues = sc.sticky["honeybee_ScheduleCompiler"].annualValues(scheduleName, 0)
     
     # create a temp folder inside folder will .ill files
     if not os.path.isdir(folder): os.mkdir(folder)
@@ -927,31 +894,19 @@ if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
             sDA = DataTree[Object]()
             htmReport = DataTree[Object]()
             
-            def readDSStandardResults(filePath):
-                results = []
-                with open(filePath, "r") as inf:
-                    for line in inf:
-                        if not line.startswith("#"):
-                            results.append(float(line.split("\t")[-1]))
-                return results
-            
-            def getsDA(DLARes, threshold = 50):
-                moreThan = 0
-                for res in DLARes:
-                    if res >= threshold:
-                        moreThan += 1
-                return "%.2f"%((moreThan/len(DLARes)) * 100)
-            
+            # Daysim's results go through the same engine as the other annual components
+            hb_annualMetrics = sc.sticky["honeybee_AnnualDaylightMetrics"]
             
             for branchNum in range(_testPoints.BranchCount):
                 p = GH_Path(branchNum)
-                DLARes = readDSStandardResults(DLALists[branchNum])
-                DLA.AddRange(DLARes, p)
-                UDLI_Less_100.AddRange(readDSStandardResults(underUDLILists[branchNum]), p)
-                UDLI_100_2000.AddRange(readDSStandardResults(inRangeUDLILists[branchNum]), p)
-                UDLI_More_2000.AddRange(readDSStandardResults(overUDLILists[branchNum]), p)
-                CDA.AddRange(readDSStandardResults(CDALists[branchNum]), p)
+                metrics = hb_annualMetrics.readDaysimResults(DLALists[branchNum], CDALists[branchNum], \
+                    underUDLILists[branchNum], inRangeUDLILists[branchNum], overUDLILists[branchNum])
+                DLA.AddRange(metrics["DA"], p)
+                UDLI_Less_100.AddRange(metrics["UDILess"], p)
+                UDLI_100_2000.AddRange(metrics["UDIRange"], p)
+                UDLI_More_2000.AddRange(metrics["UDIMore"], p)
+                CDA.AddRange(metrics["cDA"], p)
                 annualProfiles.Add(EPLSchLists[branchNum], p)
-                sDA.Add(getsDA(DLARes), p)
+                sDA.Add("%.2f"%metrics["sDA"], p)
                 htmReport.Add(htmLists[branchNum], p)
                     
\ No newline at end of file
@@ -56,6 +56,7 @@ except: pass
 from System import Object
 from clr import AddReference
 AddReference('Grasshopper')
+import scriptcontext as sc
 import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
 from Grasshopper.Kernel.Data import GH_Path
@@ -66,7 +67,12 @@ def isAllNone(dataList):
         if item!=None: return False
     return True
 
-if _runIt and (testPts.DataCount!=0 or not isAllNone(testPts.AllData())) \
+if not sc.sticky.has_key('honeybee_release'):
+    msg = "You should first let Honeybee to fly..."
+    w = gh.GH_RuntimeMessageLevel.Warning
+    ghenv.Component.AddRuntimeMessage(w, msg)
+
+elif _runIt and (testPts.DataCount!=0 or not isAllNone(testPts.AllData())) \
    and resultFilesAddress and resultFilesAddress[0]!=None:
     
     numOfPts = 0
@@ -101,37 +107,16 @@ if _runIt and (testPts.DataCount!=0 or not isAllNone(testPts.AllData())) \
     if not maxThreshold: maxThreshold = float('+Inf')
     print 'Maximum threshold is set to ' + `maxThreshold`
     
-    underValues = [0] * numOfPts
-    values = [0] * numOfPts
-    overValues = [0] * numOfPts
-    
-    # number of study hours during a year
-    studyHours = ((lunchStHour - stHour) + (endHour - lunchEndHour)) * 365
-    
-    totalPtCount = 0
-    ptsCountSoFar = 0
-    for resultFile in resultFilesAddress:
-        result = open(resultFile, 'r')
-        for hour, line in enumerate(result):
-            line = line.replace('\n', '', 10)
-            lineSeg = line.Split(' ')
-            #if len(lineSeg)!= len(testPts) + 4: print 'ERROR!'
-            for ptCount, hourLuxValue in enumerate(lineSeg[4:]):
-                if hour == 0: totalPtCount += 1
-                if  stHour <= (hour + 1)%24 < lunchStHour or lunchEndHour <= (hour + 1)%24 < endHour:
-                    if float(hourLuxValue) <= minThreshold: underValues[ptsCountSoFar + ptCount] += 1
-                    elif minThreshold <= float(hourLuxValue) <= maxThreshold: values[ptsCountSoFar + ptCount] += 1
-                    elif maxThreshold <= float(hourLuxValue): overValues[ptsCountSoFar + ptCount] += 1
-        result.close()
-        ptsCountSoFar = ptsCountSoFar + (len(lineSeg) - 4)
-        
-    
+    # calculate the results with the same engine that is used by other annual components
+    hb_annualMetrics = sc.sticky["honeybee_AnnualDaylightMetrics"]
+    occupancy = hb_annualMetrics.occupancyFromWorkingHours(stHour, endHour, lunchStHour, lunchEndHour)
+    annualMetrics = hb_annualMetrics(occupancy, DAThreshold = minThreshold, \
+                                     UDIThresholds = (minThreshold, maxThreshold))
+    metrics = annualMetrics.calculate(list(resultFilesAddress), parallel = True)
     
-    # Change values to %
-    for ptCount, v in enumerate(values):
-        underValues[ptCount] = round((underValues[ptCount]/studyHours) * 100, 2)
-        values[ptCount] = round((values[ptCount]/studyHours) * 100, 2)
-        overValues[ptCount] = round((overValues[ptCount]/studyHours) * 100, 2)
+    underValues = [round(v, 2) for v in metrics["UDILess"]]
+    values = [round(v, 2) for v in metrics["UDIRange"]]
+    overValues = [round(v, 2) for v in metrics["UDIMore"]]
     
     lessThanRange = DataTree[Object]()
     inTheRange = DataTree[Object]()    
@@ -185,8 +185,15 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
     # check number of points in each of the ill files
     # number of points should be the same in all the illfile lists
     # that's why I just try the first list of the ill files
+    # use binary cache of ill files if Honeybee is flying
+    hb_illMatrix = sc.sticky.get("honeybee_IllMatrix")
+    
     numOfPtsInEachFile = []
     for illFile in illFileSets[0][0]:
+        illMatrix = hb_illMatrix.load(illFile) if hb_illMatrix else None
+        if illMatrix:
+            numOfPtsInEachFile.append(illMatrix.pointsCount)
+            continue
         with open(illFile, "r") as illInf:
             for lineCount, line in enumerate(illInf):
                 if not line.startswith("#"):
@@ -241,6 +248,11 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
     for shadingGroupCount in illFileSets.keys():
         for stateCount, targetIllFiles in enumerate(illFileSets[shadingGroupCount]):
             targetIllFile = targetIllFiles[targetListNumber]
+            illMatrix = hb_illMatrix.load(targetIllFile) if hb_illMatrix else None
+            if illMatrix:
+                illuminanceValues[shadingGroupCount][stateCount].extend(illMatrix.getPoint(targetIndexNumber))
+                continue
+            
             result = open(targetIllFile, 'r')
             for lineCount, line in enumerate(result):
                 hourLuxValue = line.strip().split(" ")[targetIndexNumber + 4]
@@ -153,44 +153,37 @@ if hbCheck and _resultFileAddress and _keywords and _resultFileAddress != None:
             keywords.append(word)
     
     try:
-        result = open(_resultFileAddress, 'r')
+        hb_resultReader = sc.sticky["honeybee_EPResultCache"].getReader(_resultFileAddress)
         
-        for lineCount, line in enumerate(result):
-            if lineCount == 0:
-                # PARSE THE FILE HEADING
-                colHeaders = []
-                for column in line.split(','):
-                    colHeaders.append(column)
-                # SEARCH THROUGH THE FILE HEADING
-                simOutputs = hb_EPMaterialAUX.searchListByKeyword(colHeaders, keywords)
-                simOutLower = []
-                for outp in simOutputs:
-                    simOutLower.append(outp.lower())
-                key = []
-                path = []
-                for outp in colHeaders:
-                    if outp.lower() in simOutLower:
-                        outpName = outp.split(' [')[0]
-                        timestep = outp.split('(')[-1].split(')')[0]
-                        units = outp.split('[')[-1].split(']')[0]
-                        makeHeader(results, resultCount, timestep, outpName, units)
-                        key.append(0)
-                        path.append(resultCount)
-                        resultCount += 1
-                    else:
-                        key.append(-1)
-                        path.append(-1)
+        # PARSE THE FILE HEADING
+        colHeaders = hb_resultReader.header
+        # SEARCH THROUGH THE FILE HEADING
+        simOutputs = hb_EPMaterialAUX.searchListByKeyword(colHeaders, keywords)
+        simOutLower = []
+        for outp in simOutputs:
+            simOutLower.append(outp.lower())
+        key = []
+        path = []
+        for outp in colHeaders:
+            if outp.lower() in simOutLower:
+                outpName = outp.split(' [')[0]
+                timestep = outp.split('(')[-1].split(')')[0]
+                units = outp.split('[')[-1].split(']')[0]
+                makeHeader(results, resultCount, timestep, outpName, units)
+                key.append(0)
+                path.append(resultCount)
+                resultCount += 1
             else:
-                for columnCount, column in enumerate(line.split(',')):
-                    p = GH_Path(int(path[columnCount]))
-                    
-                    if key[columnCount] != -1:
-                        results.Add(float(column), p)
-        result.close()
+                key.append(-1)
+                path.append(-1)
+        
+        # read only the columns that match the keywords
+        columnData = hb_resultReader.readColumns([count for count, k in enumerate(key) if k != -1])
+        if hb_resultReader.invalidColumns.intersection(columnData.keys()): raise ValueError("Failed to convert values to numbers.")
+        for columnCount in sorted(columnData.keys()):
+            results.AddRange(columnData[columnCount].tolist(), GH_Path(int(path[columnCount])))
         parseSuccess = True
     except:
-        try: result.close()
-        except: pass
         parseSuccess = False
         warn = 'Failed to parse the result file.'
         print warn
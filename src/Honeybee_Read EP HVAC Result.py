@@ -60,34 +60,56 @@ from Grasshopper.Kernel.Data import GH_Path
 import scriptcontext as sc
 import copy
 import os
+import array
 
-#Read the location and the analysis period info from the eio file, if there is one.
-#Also try to read the floor areas from this file to be used in EUI calculations.
-location = "NoLocation"
-start = "NoDate"
-end = "NoDate"
-zoneNameList = []
-floorAreaList = []
-gotData = False
+#Use the result cache of Honeybee if it is flying so the results are shared with the other components.
+#Otherwise this component reads the file itself.
+class csvResultReader(object):
+    """Read the columns of an EnergyPlus csv file. Cells that can't be converted are set to NaN."""
+    
+    def __init__(self, csvFile):
+        self.csvFile = csvFile
+        with open(csvFile, "r") as inf:
+            self.header = inf.readline().rstrip("\r\n").split(",")
+        self.invalidColumns = set()
+    
+    def readColumns(self, columnIndices):
+        data = dict((index, array.array('d')) for index in columnIndices)
+        nan = float('nan')
+        with open(self.csvFile, "r") as inf:
+            inf.readline() # header
+            for line in inf:
+                if not line.strip(): continue
+                values = line.split(",")
+                for index in columnIndices:
+                    try: data[index].append(float(values[index]))
+                    except (ValueError, IndexError):
+                        data[index].append(nan)
+                        self.invalidColumns.add(index)
+        return data
 
-if _resultFileAddress:
-    try:
-        numZonesLine = 0
-        numZonesIndex = 0
-        zoneAreaLines = []
-        areaIndex = 0
-        
-        eioFileAddress = _resultFileAddress[0:-3] + "eio"
-        if not os.path.isfile(eioFileAddress):
-            # try to find the file from the list
-            studyFolder = os.path.dirname(_resultFileAddress)
-            fileNames = os.listdir(studyFolder)
-            for fileName in fileNames:
-                if fileName.lower().endswith("eio"):
-                    eioFileAddress = os.path.join(studyFolder, fileName)
-                    break
-                    
-        eioResult = open(eioFileAddress, 'r')
+def readEIO(csvFile):
+    """Read location, run period, zone names and floor areas from the .eio file next to the csv file."""
+    eioFileAddress = csvFile[0:-3] + "eio"
+    if not os.path.isfile(eioFileAddress):
+        # try to find the file from the list
+        studyFolder = os.path.dirname(csvFile)
+        for fileName in os.listdir(studyFolder):
+            if fileName.lower().endswith("eio"):
+                eioFileAddress = os.path.join(studyFolder, fileName)
+    
+    location = "NoLocation"
+    start = "NoDate"
+    end = "NoDate"
+    zoneNameList = []
+    floorAreaList = []
+    numZonesLine = 0
+    numZonesIndex = 0
+    numZones = 0
+    zoneAreaLines = []
+    areaIndex = 0
+    
+    with open(eioFileAddress, 'r') as eioResult:
         for lineCount, line in enumerate(eioResult):
             if "Site:Location," in line:
                 location = line.split(",")[1].split("WMO")[0]
@@ -95,26 +117,49 @@ if _resultFileAddress:
                 start = (int(line.split(",")[3].split("/")[0]), int(line.split(",")[3].split("/")[1]), 1)
                 end = (int(line.split(",")[4].split("/")[0]), int(line.split(",")[4].split("/")[1]), 24)
             elif "Zone Summary" in line and "Number of Zones" in line:
+                numZonesLine = lineCount+1
                 for index, text in enumerate(line.split(",")):
-                    numZonesLine = lineCount+1
                     if "Number of Zones" in text: numZonesIndex = index
-                    else: pass
             elif lineCount == numZonesLine:
                 numZones = line.split(",")[numZonesIndex]
             elif "Zone Information" in line and "Floor Area {m2}" in line:
                 zoneAreaLines = range(lineCount+1, lineCount+1+int(numZones))
                 for index, text in enumerate(line.split(",")):
                     if "Floor Area {m2}" in text: areaIndex = index
-                    else: pass
             elif lineCount in zoneAreaLines:
                 zoneNameList.append(line.split(",")[1])
                 floorAreaList.append(float(line.split(",")[areaIndex]))
-                gotData = True
-            else: pass
-        eioResult.close()
+    
+    return {"location": location, "start": start, "end": end,
+            "zoneNames": zoneNameList, "floorAreas": floorAreaList}
+
+if sc.sticky.has_key("honeybee_EPResultCache"):
+    getResultReader = sc.sticky["honeybee_EPResultCache"].getReader
+    getEIO = sc.sticky["honeybee_EPResultCache"].getEIO
+else:
+    getResultReader = csvResultReader
+    getEIO = readEIO
+
+
+#Read the location and the analysis period info from the eio file, if there is one.
+#Also try to read the floor areas from this file to be used in EUI calculations.
+location = "NoLocation"
+start = "NoDate"
+end = "NoDate"
+zoneNameList = []
+floorAreaList = []
+gotData = False
+
+if _resultFileAddress:
+    try:
+        eioData = getEIO(_resultFileAddress)
+        location = eioData["location"]
+        start = eioData["start"]
+        end = eioData["end"]
+        zoneNameList = eioData["zoneNames"]
+        floorAreaList = eioData["floorAreas"]
+        gotData = len(zoneNameList) != 0
     except:
-        try: eioResult.close()
-        except: pass 
         warning = 'Your simulation probably did not run correctly. \n' + \
                   'Check the report out of the Run Simulation component to see what severe or fatal errors happened in the simulation. \n' + \
                   'If there are no severe or fatal errors, the issue could just be that there is .eio file adjacent to the .csv _resultFileAddress. \n'+ \
@@ -177,158 +222,147 @@ def checkCentralSys(sysInt, sysType):
 # PARSE THE RESULT FILE.
 if _resultFileAddress and gotData == True:
     try:
-        result = open(_resultFileAddress, 'r')
+        hb_resultReader = getResultReader(_resultFileAddress)
         
-        for lineCount, line in enumerate(result):
-            if lineCount == 0:
-                #ANALYZE THE FILE HEADING
-                key = []; path = []
-                for columnCount, column in enumerate(line.split(',')):
-                    """
-                    if 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column:
-                        key.append(0)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(sensibleCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Cooling Energy", "kWh", True)
+        #ANALYZE THE FILE HEADING
+        key = []; path = []
+        for columnCount, column in enumerate(hb_resultReader.header):
+            """
+            if 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column:
+                key.append(0)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(sensibleCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Cooling Energy", "kWh", True)
+                dataTypeList[0] = True
+            
+            elif 'Zone Ideal Loads Supply Air Latent Cooling Energy' in column:
+                key.append(1)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(latentCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Cooling Energy", "kWh", True)
+                dataTypeList[1] = True
+            
+            elif 'Zone Ideal Loads Supply Air Sensible Heating Energy' in column:
+                key.append(2)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(sensibleHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Heating Energy", "kWh", True)
+                dataTypeList[2] = True
+            
+            elif 'Zone Ideal Loads Supply Air Latent Heating Energy' in column:
+                key.append(3)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(latentHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Heating Energy", "kWh", True)
+                dataTypeList[3] = True
+            """
+            if 'System Node Standard Density Volume Flow Rate' in column:
+                if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    key.append(-1)
+                    path.append(-1)
+                else:
+                    if ' IDEAL LOADS SUPPLY INLET' in column:
+                        key.append(4)
+                        zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
+                        makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
                         dataTypeList[0] = True
-                    
-                    elif 'Zone Ideal Loads Supply Air Latent Cooling Energy' in column:
-                        key.append(1)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(latentCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Cooling Energy", "kWh", True)
-                        dataTypeList[1] = True
-                    
-                    elif 'Zone Ideal Loads Supply Air Sensible Heating Energy' in column:
-                        key.append(2)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(sensibleHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Heating Energy", "kWh", True)
-                        dataTypeList[2] = True
-                    
-                    elif 'Zone Ideal Loads Supply Air Latent Heating Energy' in column:
-                        key.append(3)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(latentHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Heating Energy", "kWh", True)
-                        dataTypeList[3] = True
-                    """
-                    if 'System Node Standard Density Volume Flow Rate' in column:
-                        if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    else:
+                        try:
+                            zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 0)
+                            centralSys = True
+                            makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
+                            dataTypeList[0] = True
+                            key.append(4)
+                            print zoneName
+                        except:
                             key.append(-1)
                             path.append(-1)
-                        else:
-                            if ' IDEAL LOADS SUPPLY INLET' in column:
-                                key.append(4)
-                                zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
-                                makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
-                                dataTypeList[0] = True
-                            else:
-                                try:
-                                    zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 0)
-                                    centralSys = True
-                                    makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
-                                    dataTypeList[0] = True
-                                    key.append(4)
-                                    print zoneName
-                                except:
-                                    key.append(-1)
-                                    path.append(-1)
-                    
-                    elif 'System Node Temperature' in column:
-                        if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+            
+            elif 'System Node Temperature' in column:
+                if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    key.append(-1)
+                    path.append(-1)
+                else:
+                    if ' IDEAL LOADS SUPPLY INLET' in column:
+                        key.append(5)
+                        zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
+                        makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
+                        dataTypeList[1] = True
+                    else:
+                        try:
+                            zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 1)
+                            centralSys = True
+                            makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
+                            dataTypeList[1] = True
+                            key.append(5)
+                        except:
                             key.append(-1)
                             path.append(-1)
-                        else:
-                            if ' IDEAL LOADS SUPPLY INLET' in column:
-                                key.append(5)
-                                zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
-                                makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
-                                dataTypeList[1] = True
-                            else:
-                                try:
-                                    zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 1)
-                                    centralSys = True
-                                    makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
-                                    dataTypeList[1] = True
-                                    key.append(5)
-                                except:
-                                    key.append(-1)
-                                    path.append(-1)
-                    
-                    elif 'System Node Relative Humidity' in column:
-                        if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+            
+            elif 'System Node Relative Humidity' in column:
+                if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    key.append(-1)
+                    path.append(-1)
+                else:
+                    if ' IDEAL LOADS SUPPLY INLET' in column:
+                        key.append(6)
+                        zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
+                        makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
+                        dataTypeList[2] = True
+                    else:
+                        try:
+                            zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 2)
+                            centralSys = True
+                            makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
+                            dataTypeList[2] = True
+                            key.append(6)
+                        except:
                             key.append(-1)
                             path.append(-1)
-                        else:
-                            if ' IDEAL LOADS SUPPLY INLET' in column:
-                                key.append(6)
-                                zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
-                                makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
-                                dataTypeList[2] = True
-                            else:
-                                try:
-                                    zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 2)
-                                    centralSys = True
-                                    makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
-                                    dataTypeList[2] = True
-                                    key.append(6)
-                                except:
-                                    key.append(-1)
-                                    path.append(-1)
-                    
-                    elif 'Zone Cooling Setpoint Not Met Time' in column:
-                        key.append(7)
-                        zoneName = checkZone(" " + column.split(':')[0])
-                        makeHeader(unmetHoursCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Cooling hours", "hours", True)
-                        dataTypeList[3] = True
-                    
-                    elif 'Zone Heating Setpoint Not Met Time' in column:
-                        key.append(8)
-                        zoneName = checkZone(" " + column.split(':')[0])
-                        makeHeader(unmetHoursHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Heating hours", "hours", True)
-                        dataTypeList[4] = True
-                    
-                    else:
-                        key.append(-1)
-                        path.append(-1)
-                    
+            
+            elif 'Zone Cooling Setpoint Not Met Time' in column:
+                key.append(7)
+                zoneName = checkZone(" " + column.split(':')[0])
+                makeHeader(unmetHoursCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Cooling hours", "hours", True)
+                dataTypeList[3] = True
+            
+            elif 'Zone Heating Setpoint Not Met Time' in column:
+                key.append(8)
+                zoneName = checkZone(" " + column.split(':')[0])
+                makeHeader(unmetHoursHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Heating hours", "hours", True)
+                dataTypeList[4] = True
+            
             else:
-                for columnCount, column in enumerate(line.split(',')):
-                    p = GH_Path(int(path[columnCount]))
-                    
-                    if key[columnCount] == 0:
-                        sensibleCooling.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 1:
-                        latentCooling.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 2:
-                        sensibleHeating.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 3:
-                        latentHeating.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 4:
-                        supplyVolFlow.Add((float(column)), p)
-                    elif key[columnCount] == 5:
-                        supplyAirTemp.Add(float(column), p)
-                    elif key[columnCount] == 6:
-                        supplyAirHumidity.Add(float(column), p)
-                    elif key[columnCount] == 7:
-                        unmetHoursCooling.Add(float(column),p)
-                    elif key[columnCount] == 8:
-                        unmetHoursHeating.Add(float(column),p)
-                    
-        result.close()
+                key.append(-1)
+                path.append(-1)
+            
+        # read only the columns that are used by this component
+        columnData = hb_resultReader.readColumns([count for count, k in enumerate(key) if k != -1])
+        if hb_resultReader.invalidColumns.intersection(columnData.keys()): raise ValueError("Failed to convert values to numbers.")
+        
+        # energy values are converted from J to kWh
+        outputTrees = {0: (sensibleCooling, 3600000), 1: (latentCooling, 3600000),
+                       2: (sensibleHeating, 3600000), 3: (latentHeating, 3600000),
+                       4: (supplyVolFlow, 1), 5: (supplyAirTemp, 1), 6: (supplyAirHumidity, 1),
+                       7: (unmetHoursCooling, 1), 8: (unmetHoursHeating, 1)}
+        
+        for columnCount in sorted(columnData.keys()):
+            tree, factor = outputTrees[key[columnCount]]
+            values = columnData[columnCount]
+            if factor != 1: values = [v/factor for v in values]
+            else: values = values.tolist()
+            tree.AddRange(values, GH_Path(int(path[columnCount])))
+        
         parseSuccess = True
     except:
-        try: result.close()
-        except: pass
         parseSuccess = False
         warn = 'Failed to parse the result file.  Check the folder of the file address you are plugging into this component and make sure that there is a .csv file in the folder. \n'+ \
                   'If there is no csv file or there is a file with no data in it (it is 0 kB), your simulation probably did not run correctly. \n' + \
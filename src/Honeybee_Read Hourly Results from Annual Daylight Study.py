@@ -52,6 +52,7 @@ except: pass
 
 
 import os
+import scriptcontext as sc
 from System import Object
 import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
@@ -184,6 +185,9 @@ def main(illFilesAddress, testPoints, HOY, annualProfiles):
             # add an empty list for each state
             illuminanceValues[shadingGroupCount].append([])
     
+    # use binary cache of ill files if Honeybee is flying
+    hb_illMatrix = sc.sticky.get("honeybee_IllMatrix")
+    
     totalPtCount = 0
     ptsCountSoFar = 0
     for shadingGroupCount in range(len(illFileSets.keys())):
@@ -191,6 +195,11 @@ def main(illFilesAddress, testPoints, HOY, annualProfiles):
         for stateCount, resultFiles in enumerate(illFileSets[shadingGroupCount]):
             
             for resultFile in resultFiles:
+                illMatrix = hb_illMatrix.load(resultFile) if hb_illMatrix else None
+                if illMatrix:
+                    illuminanceValues[shadingGroupCount][stateCount].extend(illMatrix.getHour(HOY))
+                    continue
+                
                 result = open(resultFile, 'r')
                 for lineCount, line in enumerate(result):
                     if lineCount == int(HOY-1):
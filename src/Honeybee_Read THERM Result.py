@@ -61,6 +61,7 @@ from System import Object
 from Grasshopper import DataTree
 from Grasshopper.Kernel.Data import GH_Path
 import math
+import array
 
 ghenv.Component.Name = 'Honeybee_Read THERM Result'
 ghenv.Component.NickName = 'readTHERM'
@@ -203,113 +204,129 @@ def checkTheInputs():
     return dataType, planeReorientation, unitsScale, rhinoOrig, uFactorNames, uFactors, uFactorLength, deltaT
 
 
+def parseResultFile(resultFile):
+    """Parse the nodes, elements, node results and disjoint nodes of a THERM result file.
+    
+    Lines are read one at a time. Only the lines that do not start with a number are checked for
+    the section headers. The nodes and their results are kept in typed arrays.
+    """
+    nodeX = array.array('d')
+    nodeY = array.array('d')
+    faces = array.array('i')
+    temperatures = array.array('d')
+    fluxes = array.array('d')
+    disjointTokens = []
+    section = None
+    
+    resultFi = open(resultFile, 'r')
+    for line in resultFi:
+        columns = line.split()
+        if len(columns) == 0: continue
+        if not columns[0][0].isdigit():
+            if 'node number    x1-coordinate     x2-coordinate      temperature' in line: section = 'nodes'
+            elif 'elem. no.   i      j      k      l      matl. no.    matl. angle       volume' in line: section = 'elements'
+            elif 'node    temperature          x-flux         y-flux' in line: section = 'values'
+            elif 'warning --- mesh is disjoint at these nodes' in line: section = 'disjoint'
+            elif '********************************************************************************' in line:
+                if section != 'values': section = None
+            elif 'Boundary Element Edge Data:' in line:
+                if section == 'values': section = None
+            continue
+        
+        try:
+            if section == 'nodes':
+                if len(columns) < 3: continue
+                x, y = float(columns[1]), float(columns[2])
+                nodeX.append(x)
+                nodeY.append(y)
+            elif section == 'elements':
+                if len(columns) < 5: continue
+                face = [int(col) - 1 for col in columns[1:5]]
+                faces.extend(face)
+            elif section == 'values':
+                if len(columns) < 4: continue
+                temperature, xFlux, yFlux = float(columns[1]), float(columns[2]), float(columns[3])
+                temperatures.append(temperature)
+                fluxes.append(math.sqrt(xFlux*xFlux + yFlux*yFlux))
+            elif section == 'disjoint':
+                disjointTokens.extend(columns)
+        except ValueError: pass
+    resultFi.close()
+    
+    #The disjoint node numbers run together when they have as many digits as the column width.
+    nodeCount = len(nodeX)
+    width = max(len(str(nodeCount)), 5)
+    disjointIndices = []
+    for token in disjointTokens:
+        if not token.isdigit(): continue
+        if nodeCount > 10000 and len(token) > width:
+            disjointIndices.extend(int(token[i:i+width]) for i in range(0, len(token), width))
+        else: disjointIndices.append(int(token))
+    
+    #Remove the disjoint nodes with one mask and renumber the element vertices.
+    if disjointIndices != []:
+        keep = array.array('b', [1]) * nodeCount
+        for index in disjointIndices:
+            if 0 < index <= nodeCount: keep[index-1] = 0
+        newIndex = array.array('i', [-1]) * nodeCount
+        count = 0
+        for index in xrange(nodeCount):
+            if keep[index]:
+                newIndex[index] = count
+                count += 1
+        nodeX = array.array('d', (x for x, k in zip(nodeX, keep) if k))
+        nodeY = array.array('d', (y for y, k in zip(nodeY, keep) if k))
+        temperatures = array.array('d', (val for val, k in zip(temperatures, keep) if k))
+        fluxes = array.array('d', (val for val, k in zip(fluxes, keep) if k))
+        remapped = array.array('i')
+        for i in xrange(0, len(faces), 4):
+            face = [newIndex[index] if 0 <= index < nodeCount else -1 for index in faces[i:i+4]]
+            if min(face) >= 0: remapped.extend(face)
+        faces = remapped
+    
+    return nodeX, nodeY, faces, temperatures, fluxes
+
+def readResultFile(resultFile):
+    """Return the parsed result file, re-using the last parse if the file has not changed."""
+    filePath = os.path.normcase(os.path.abspath(resultFile))
+    stat = os.stat(filePath)
+    fileKey = (stat.st_mtime, stat.st_size)
+    if not sc.sticky.has_key('honeybee_THERMResultCache'): sc.sticky['honeybee_THERMResultCache'] = {}
+    cache = sc.sticky['honeybee_THERMResultCache']
+    if filePath in cache and cache[filePath][0] == fileKey:
+        return cache[filePath][1]
+    parsed = parseResultFile(filePath)
+    cache[filePath] = (fileKey, parsed)
+    return parsed
+
 def main(dataType, planeReorientation, unitsScale, rhinoOrig):
     #Import the class.
     lb_preparation = sc.sticky["ladybug_Preparation"]()
     lb_visualization = sc.sticky["ladybug_ResultVisualization"]()
     
-    #Create lists to be filled up with data from the file.
-    pointData = []
-    elementData = []
-    meshValues = []
-    disjointedIndices = []
-    pointTrigger = False
-    elementTrigger = False
-    meshValuesTrigger = False
-    disjointTrigger = False
+    #Parse the result file into typed arrays.
+    nodeX, nodeY, faces, temperatures, fluxes = readResultFile(_resultFile)
+    if dataType == 0: meshValues = list(temperatures)
+    else: meshValues = list(fluxes)
     
-    #Parse the result file into the lists.
-    resultFile = open(_resultFile, 'r')
-    for lineCount, line in enumerate(resultFile):
-        if 'node number    x1-coordinate     x2-coordinate      temperature' in line: pointTrigger = True
-        elif 'elem. no.   i      j      k      l      matl. no.    matl. angle       volume' in line: elementTrigger = True
-        elif 'node    temperature          x-flux         y-flux' in line: meshValuesTrigger = True
-        elif 'warning --- mesh is disjoint at these nodes' in line: disjointTrigger = True
-        elif '********************************************************************************' in line:
-            pointTrigger = False
-            elementTrigger = False
-            disjointTrigger = False
-        elif 'Boundary Element Edge Data:' in line: meshValuesTrigger = False
-        elif pointTrigger == True:
-            try:
-                coordList = []
-                intCount = 0
-                columns = line.split(' ')
-                for col in columns:
-                    if col != '':
-                        intCount += 1
-                        if intCount > 1 and intCount <4: coordList.append(float(col))
-                if coordList != []:
-                    xCoord = float(coordList[0])
-                    yCoord = float(coordList[1])
-                    pointData.append(rc.Geometry.Point3d(xCoord, yCoord, 0))
-            except: pass
-        elif elementTrigger == True:
-            try:
-                elementList = []
-                intCount = 0
-                columns = line.split(' ')
-                for col in columns:
-                    if col != '':
-                        intCount += 1
-                        if intCount > 1 and intCount <6: elementList.append(int(col))
-                if elementList != []: elementData.append(elementList)
-            except: pass
-        elif meshValuesTrigger == True:
-            try:
-                valList = []
-                intCount = 0
-                columns = line.split(' ')
-                for col in columns:
-                    if col != '':
-                        intCount += 1
-                        if intCount > 1 and intCount <5: valList.append(float(col))
-                if valList != []:
-                    if dataType == 0: meshValues.append(valList[0])
-                    else: meshValues.append(math.sqrt((math.pow(float(valList[1]),2))+(math.pow(float(valList[2]),2))))
-                    xCoord = float(coordList[0])
-                    yCoord = float(coordList[1])
-                    pointData.append(rc.Geometry.Point3d(xCoord, yCoord, 0))
-            except: pass
-        elif disjointTrigger == True:
-            indexList = []
-            columns = line.split(' ')
-            for col in columns:
-                if col != '':
-                    try:
-                        disind = int(col)
-                        if len(pointData) > 10000:
-                            indexList.append(int(str(disind)[:5]))
-                            indexList.append(int(str(disind)[5:]))
-                        else: indexList.append(disind)
-                    except: pass
-            if indexList != []: disjointedIndices.extend(indexList)
-    
-    resultFile.close()
-    
-    #Remove any disjointed meshPoints from each list.
-    for count, index in enumerate(disjointedIndices):
-        del pointData[index-1-count]
-        del meshValues[index-1-count]
+    #Build up a mesh from the point and element data.
+    feMesh = rc.Geometry.Mesh()
+    for x, y in zip(nodeX, nodeY):
+        feMesh.Vertices.Add(x, y, 0)
+    for i in xrange(0, len(faces), 4):
+        feMesh.Faces.AddFace(faces[i], faces[i+1], faces[i+2], faces[i+3])
     
-    for point in pointData: point.Transform(unitsScale)
+    #Transform the whole mesh at once.
+    feMesh.Transform(unitsScale)
     #If we have a Rhino transform from the thermFile, transform all of the point data.
     if planeReorientation != None:
-        for point in pointData:
-            point.Transform(planeReorientation)
-        thermBB = rc.Geometry.BoundingBox(pointData)
+        feMesh.Transform(planeReorientation)
+        thermBB = feMesh.GetBoundingBox(True)
         thermOrigin = rc.Geometry.BoundingBox.Corner(thermBB, True, True, True)
         vecDiff = rc.Geometry.Point3d.Subtract(rhinoOrig, thermOrigin)
         planeTransl = rc.Geometry.Transform.Translation(vecDiff.X, vecDiff.Y, vecDiff.Z)
-        for point in pointData:
-            point.Transform(planeTransl)
-    
-    #Build up a mesh from the point and element data.
-    feMesh = rc.Geometry.Mesh()
-    for point in pointData:
-        feMesh.Vertices.Add(point)
-    for face in elementData:
-        feMesh.Faces.AddFace(face[0]-1, face[1]-1, face[2]-1, face[3]-1)
+        feMesh.Transform(planeTransl)
+    pointData = list(feMesh.Vertices.ToPoint3dArray())
     
     #If IP units have been requested, convert everything.
     if SIorIP_ == False:
@@ -329,7 +346,7 @@ def main(dataType, planeReorientation, unitsScale, rhinoOrig):
         except: pass
     
     #Get the bounding box of the secene that will work in 3 dimensions.
-    meshBB = rc.Geometry.BoundingBox(pointData)
+    meshBB = feMesh.GetBoundingBox(True)
     finalLegBasePt = meshBB.Corner(False, True, True)
     meshBox = rc.Geometry.Box(meshBB)
     bbDim = [meshBox.X[1]-meshBox.X[0], meshBox.Y[1]-meshBox.Y[0], meshBox.Z[1]-meshBox.Z[0]]
@@ -183,7 +183,7 @@ def main(octFile, analysisRecipe, numOfCPUs, thisRunName, runIt):
     
     if runIt:
         hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
-                                  fileNames, pcompBatchFile, waitingTime)
+                                  fileNames, pcompBatchFile, waitingTime, maxPRuns = numOfCPUs)
         
         results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
                                 numOfCPUs, analysisRecipe, expectedResultFiles)
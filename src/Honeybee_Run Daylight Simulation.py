@@ -39,6 +39,7 @@ Provided by Honeybee 0.0.65
         additionalRadFiles_: A list of fullpath to valid radiance files which will be added to the scene
         exportAirWalls_: Set to True if you want to export air walls as surfaces and False if you don't want air walls be exported.  The default is set to False.
         overwriteResults_: Set to False if you want the component create a copy of all the results. Default is True
+        chunkSize_: Optional number of test points in each chunk for grid-based studies. If provided the test points will be split into many small chunks and each CPU picks up the next chunk as soon as it is done. This balances the load when some points take much longer than others. Execution time for each chunk will be written to a _chunkTiming.csv file in the study folder.
         
     Returns:
         readMe!: ...
@@ -80,7 +81,7 @@ ghenv.Component.Params.Output[3].NickName = "results"
 ghenv.Component.Params.Output[3].Name = "results"
 results = []
 
-def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls):
+def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls, chunkSize = None):
     # import the classes
     w = gh.GH_RuntimeMessageLevel.Warning
     
@@ -194,7 +195,10 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
     ######################## GENERATE POINT FILES #######################
     # test points should be generated if the study is grid based
     # except image-based simulation
-    testPtsEachCPU, lenOfPts = hb_writeRAD.writeTestPtFile(subWorkingDir, radFileName, numOfCPUs, analysisRecipe)
+    testPtsEachCPU, lenOfPts = hb_writeRAD.writeTestPtFile(subWorkingDir, radFileName, numOfCPUs, analysisRecipe, chunkSize)
+    
+    maxPRuns = numOfCPUs
+    isChunked = chunkSize and analysisRecipe.type != 2 and len(testPtsEachCPU) > numOfCPUs
     
     if len(testPtsEachCPU)!=0: # make sure it is a grid based analysis
         numOfCPUs = len(testPtsEachCPU) #in case number of CPUs are more than number of test points
@@ -208,12 +212,20 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
                             additionalRadFiles)
     
     if runRad:
-        hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
-                                  fileNames, pcompBatchFile, waitingTime, runRad > 1)
+        jobs = hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
+                                  fileNames, pcompBatchFile, waitingTime, runRad > 1, maxPRuns)
         
         results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
                                 numOfCPUs, analysisRecipe, expectedResultFiles)
         
+        if isChunked:
+            # put chunks back together and report the time for each chunk
+            timingFile = hb_writeRAD.writeChunkTimingFile(subWorkingDir, radFileName, \
+                                jobs[1:len(batchFilesName) + 1], lenOfPts)
+            print "Execution time for each chunk is written to " + timingFile
+            if len(results) != 0:
+                results = hb_writeRAD.assembleChunkResults(subWorkingDir, radFileName, results)
+        
         if analysisRecipe.type == 2:
             DSResultFilesAddress, annualGlareResults = results
             return radFileFullName, annualGlareResults, [], analysisRecipe.testPts, DSResultFilesAddress, [], subWorkingDir
@@ -239,6 +251,16 @@ if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBO
     waitingTime = 0.2 # waiting time between batch files in seconds
     try: numOfCPUs = int(_numOfCPUs_)
     except: numOfCPUs = 1
+    chunkSize = None
+    try:
+        if chunkSize_ != None: chunkSize = int(chunkSize_)
+    except NameError:
+        # the component is placed from an older user object without chunkSize_ input
+        pass
+    except (ValueError, TypeError):
+        warning = "chunkSize_ should be a whole number. Test points won't be split into chunks."
+        print warning
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
     
     # make sure it is not more than the number of available CPUs
     ncpus = int(os.environ["NUMBER_OF_PROCESSORS"])
@@ -252,7 +274,7 @@ if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBO
     
     result = main(north_, _HBObjects, _analysisRecipe, runRad_, numOfCPUs, \
                   _workingDir_, _radFileName_, meshSettings_, waitingTime, \
-                  additionalRadFiles_, overwriteResults_, exportAirWalls_)
+                  additionalRadFiles_, overwriteResults_, exportAirWalls_, chunkSize)
     
     if result!= -1:
         
@@ -96,7 +96,7 @@ def main(HBZones):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBZones)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBZones, ghenv.Component)
     
     for zone in HBZoneObjects:
         
@@ -389,7 +389,7 @@ def main(HBZones, natVentMethod, interZoneFlow, interZoneFlowSched, minIndoorTem
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     #If the user requests a change in inter-zone mixing, then do so.
     if len(interZoneFlow) > 0:
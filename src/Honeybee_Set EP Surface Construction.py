@@ -103,7 +103,7 @@ def main(HBSurface, EPConstruction, childEPConstruction):
         
         # call the surface from the hive
         hb_hive = sc.sticky["honeybee_Hive"]()
-        HBSurface = hb_hive.callFromHoneybeeHive([HBSurface])[0]
+        HBSurface = hb_hive.callFromHoneybeeHive([HBSurface], ghenv.Component)[0]
         
         # make sure it is not an interior wall - at some point I should find a way
         # to make this work but right now there is not a good solution to find adjacent zone
@@ -96,7 +96,7 @@ def main(HBZones, wallEPCnst, windowEPCnst, roofEPCnst, flrEPCnst, expFlrEpCnst,
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     hb_EPObjectsAux = sc.sticky["honeybee_EPObjectsAUX"]()
     modifiedObjects = []
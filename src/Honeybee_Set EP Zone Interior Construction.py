@@ -112,7 +112,7 @@ def main(HBZones, wallEPCnst, windowEPCnst, flrEPCnst, cielConstr):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     hb_EPObjectsAux = sc.sticky["honeybee_EPObjectsAUX"]()
     modifiedObjects = []
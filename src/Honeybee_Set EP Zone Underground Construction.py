@@ -109,7 +109,7 @@ def main(HBZones, ugWallEPCnst, gFlrEPCnst, ugSlabEPCnst, ugCeilEPCnst):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     hb_EPObjectsAux = sc.sticky["honeybee_EPObjectsAUX"]()
     modifiedObjects = []
@@ -93,7 +93,7 @@ def main(HBZones, equipmentLoadPerArea, infiltrationRatePerArea, lightingDensity
         
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     length = len(HBObjectsFromHive)
     equipmentLoadPerArea = duplicateData(equipmentLoadPerArea, length)
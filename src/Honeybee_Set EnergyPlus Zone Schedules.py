@@ -138,7 +138,7 @@ def main(HBZones, occupancySchedule, occupancyActivitySch, heatingSetPtSchedule,
                     return -1
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     schedules = []
     for zoneCount, HBZone in enumerate(HBObjectsFromHive):
@@ -250,7 +250,7 @@ def main(HBZones, coolingSetPt, heatingSetPt, coolingSetback, heatingSetback, ma
         
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZonesFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZonesFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     # assign the values
     for zoneCount, zone in enumerate(HBZonesFromHive):
@@ -71,7 +71,7 @@ def main(HBZones, zonePrograms):
         
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones)
+    HBObjectsFromHive = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     BuildingPrograms = sc.sticky["honeybee_BuildingProgramsLib"]()
     bldgProgramDict = BuildingPrograms.bldgPrograms
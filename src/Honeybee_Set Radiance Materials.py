@@ -80,7 +80,7 @@ def main(HBObject, wallRADMaterial, windowRADMaterial, \
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
     try:
-        HBObject = hb_hive.callFromHoneybeeHive([HBObject])[0]
+        HBObject = hb_hive.callFromHoneybeeHive([HBObject], ghenv.Component)[0]
         # check if the object is a zone or a surface
         if HBObject.objectType == "HBSurface":
             HBObjects = [HBObject]
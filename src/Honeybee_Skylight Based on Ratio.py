@@ -221,7 +221,7 @@ def main(skyLightRatio, breakUpSkylight, skyLightBreakUpDist, EPConstruct, RADMa
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBObjects)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(_HBObjects, ghenv.Component)
     
     #Check constructions and RADMAterials.
     if EPConstruct != None:
@@ -54,6 +54,8 @@ import Rhino as rc
 import scriptcontext as sc
 import Grasshopper.Kernel as gh
 import uuid
+import math
+import time
 
 def shootIt(rayList, geometry, tol = 0.01, bounce =1):
    # shoot a list of rays from surface to geometry
@@ -186,6 +188,68 @@ def notTheSameZone(targetZone, testZone):
         return targetZone.name != testZone.name
     
 
+class AdjacencyIndex(object):
+    """R-tree of the bounding boxes of zone surfaces to find candidate adjacent surfaces.
+    
+    Only surfaces with overlapping bounding boxes (inflated by tolerance), reversed
+    normals and matching plane offsets are returned. The exact checks in main are only
+    run for these candidates.
+    """
+    
+    def __init__(self, HBZoneObjects, tol):
+        self.tol = tol
+        self.angleTol = sc.doc.ModelAngleToleranceRadians
+        self.tree = rc.Geometry.RTree()
+        self.records = [] # (zoneCount, srfCount, zone, surface)
+        self.boxes = {}
+        
+        for zoneCount, zone in enumerate(HBZoneObjects):
+            for srfCount, surface in enumerate(zone.surfaces):
+                box = self.boundingBox(surface)
+                self.tree.Insert(box, len(self.records))
+                self.records.append((zoneCount, srfCount, zone, surface))
+    
+    def boundingBox(self, surface):
+        if id(surface) not in self.boxes:
+            box = surface.geometry.GetBoundingBox(True)
+            box.Inflate(self.tol)
+            self.boxes[id(surface)] = box
+        return self.boxes[id(surface)]
+    
+    def isFacing(self, srf, surface):
+        # same check for normal direction as the original ray-based solution
+        normalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, srf.normalVector))
+        revNormalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, -srf.normalVector))
+        return normalAngle==0  or revNormalAngle <= self.angleTol
+    
+    def isOnSamePlane(self, srf, surface):
+        if not (getattr(srf, 'isPlanar', False) and getattr(surface, 'isPlanar', False)):
+            return True
+        # test points are moved back for half of tolerance and can be tol away from the other surface.
+        # the angle tolerance lets the planes drift apart across the surface.
+        normal = rc.Geometry.Vector3d(srf.normalVector)
+        normal.Unitize()
+        offset = abs(normal * (surface.cenPt - srf.cenPt))
+        slack = math.sin(self.angleTol) * (self.boundingBox(srf).Diagonal.Length + self.boundingBox(surface).Diagonal.Length)
+        return offset <= 1.5 * self.tol + sc.doc.ModelAbsoluteTolerance + slack
+    
+    def findCandidates(self, srf, testZone):
+        """Return a list of (targetZone, surfaces) that can be adjacent to srf in the order of the zones."""
+        ids = []
+        def collect(sender, e):
+            ids.append(e.Id)
+        self.tree.Search(self.boundingBox(srf), collect)
+        
+        candidates = {}
+        for zoneCount, srfCount, zone, surface in sorted(self.records[i] for i in ids):
+            if not notTheSameZone(zone, testZone): continue
+            if not self.isFacing(srf, surface): continue
+            if not self.isOnSamePlane(srf, surface): continue
+            candidates.setdefault(zoneCount, (zone, []))[1].append(surface)
+        
+        return [candidates[zoneCount] for zoneCount in sorted(candidates.keys())]
+
+
 def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
     
     # import the classes
@@ -212,7 +276,7 @@ def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
     
     # call the objects from the lib
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones)
+    HBZoneObjects = hb_hive.callFromHoneybeeHive(HBZones, ghenv.Component)
     
     # make sure there is no duplicate names
     zoneNames = []
@@ -235,6 +299,13 @@ def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
                     srf.setBC('OUTDOORS')
                     srf.setBCObjectToOutdoors()
     
+    # index the surfaces so only the surfaces that can be adjacent are tested
+    phaseTime = {'indexing': 0, 'candidate search': 0, 'meshing': 0, 'ray test': 0, 'surface matching': 0}
+    startTime = time.time()
+    adjIndex = AdjacencyIndex(HBZoneObjects, tol)
+    phaseTime['indexing'] = time.time() - startTime
+    candidateCount = 0
+    
     # solve it zone by zone
     for testZone in HBZoneObjects:
         # mesh each surface and test if it will be adjacent to any surface
@@ -242,7 +313,13 @@ def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
         for srf in testZone.surfaces:
             #print srf.type, srf.BC 
             if srf.BC.upper() == 'OUTDOORS' or srf.BC.upper() == 'GROUND' or srf.BC.upper() == 'ADIABATIC':
+                startTime = time.time()
+                candidates = adjIndex.findCandidates(srf, testZone)
+                phaseTime['candidate search'] += time.time() - startTime
+                if len(candidates) == 0: continue
+                
                 #Create a mesh of surface to use center points as test points
+                startTime = time.time()
                 meshPar = rc.Geometry.MeshingParameters.Default
                 BrepMesh = rc.Geometry.Mesh.CreateFromBrep(srf.geometry, meshPar)[0]
                 
@@ -259,34 +336,37 @@ def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
                     meshSrfCen = rc.Geometry.Point3d.Add(meshSrfCen, -rc.Geometry.Vector3d(srfNormal)* tol /2)
                     
                     raysDict[meshSrfCen] = rc.Geometry.Ray3d(meshSrfCen, srfNormal)
+                phaseTime['meshing'] += time.time() - startTime
                 
-                for targetZone in HBZoneObjects:
-                    if notTheSameZone(targetZone, testZone):
-                        # check ray intersection to see if this zone is next to the surface
-                        if shootIt(raysDict.values(), [targetZone.geometry], tol + sc.doc.ModelAbsoluteTolerance):
-                            for surface in targetZone.surfaces:
-                                # check if z value of center points matches
-                                #print abs(surface.cenPt.Z - srf.cenPt.Z)
-                                #if abs(surface.cenPt.Z - srf.cenPt.Z) < tol:
-                                # check distance with the nearest point on each surface
-                                for pt in raysDict.keys():
-                                    if surface.geometry.ClosestPoint(pt).DistanceTo(pt) <= tol:
-                                        # extra check for normal direction
-                                        normalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, srf.normalVector))
-                                        revNormalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, -srf.normalVector))
-                                        #print normalAngle
-                                        #print revNormalAngle
-                                        if normalAngle==0  or revNormalAngle <= sc.doc.ModelAngleToleranceRadians:
-                                            print 'Surface ' + srf.name + ' which is a ' + srf.srfType[srf.type] + \
-                                                  '\t-> is adjacent to <-\t' + surface.name + ' which is a ' + \
-                                                  surface.srfType[surface.type] + '.'
-                                            
-                                            updateAdj(srf, surface, altConstruction, altBC, altWinConstr, tol)                                        
-                                            if surface.type == 4:
-                                                flowRate = updateZoneMixing(surface, testZone, targetZone)
-                                                print "Air has been mixed between " + testZone.name + " and " + targetZone.name + " with a flow rate of " + str(flowRate) + " m3/s."
-                                            
-                                            break
+                for targetZone, targetSurfaces in candidates:
+                    candidateCount += len(targetSurfaces)
+                    # check ray intersection to see if this zone is next to the surface
+                    startTime = time.time()
+                    isHit = shootIt(raysDict.values(), [targetZone.geometry], tol + sc.doc.ModelAbsoluteTolerance)
+                    phaseTime['ray test'] += time.time() - startTime
+                    if not isHit: continue
+                    
+                    startTime = time.time()
+                    for surface in targetSurfaces:
+                        # check distance with the nearest point on each surface
+                        # normal direction is already checked by the index
+                        for pt in raysDict.keys():
+                            if surface.geometry.ClosestPoint(pt).DistanceTo(pt) <= tol:
+                                print 'Surface ' + srf.name + ' which is a ' + srf.srfType[srf.type] + \
+                                      '\t-> is adjacent to <-\t' + surface.name + ' which is a ' + \
+                                      surface.srfType[surface.type] + '.'
+                                
+                                updateAdj(srf, surface, altConstruction, altBC, altWinConstr, tol)                                        
+                                if surface.type == 4:
+                                    flowRate = updateZoneMixing(surface, testZone, targetZone)
+                                    print "Air has been mixed between " + testZone.name + " and " + targetZone.name + " with a flow rate of " + str(flowRate) + " m3/s."
+                                
+                                break
+                    phaseTime['surface matching'] += time.time() - startTime
+    
+    print "\n" + str(candidateCount) + " candidate surface pairs were tested."
+    for phase in ('indexing', 'candidate search', 'meshing', 'ray test', 'surface matching'):
+        print "Time for " + phase + ": " + "%.2f"%phaseTime[phase] + " seconds."
     
     # add zones to memory
     ModifiedHBZones  = hb_hive.addToHoneybeeHive(HBZoneObjects, ghenv.Component)
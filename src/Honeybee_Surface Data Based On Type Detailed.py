@@ -111,10 +111,10 @@ def getSrfNames(HBZones):
     undergroundWall = []
     undergroundCeiling = []
     
+    # call the objects from the lib
+    hb_hive = sc.sticky["honeybee_Hive"]()
+    
     for zone in HBZones:
-        # call the objects from the lib
-        hb_hive = sc.sticky["honeybee_Hive"]()
-        
         zone = hb_hive.callFromHoneybeeHive([zone])[0]
         
         for srf in zone.surfaces:
@@ -159,8 +159,9 @@ def getSrfNames(HBZones):
             elif srf.type == 2.75: exposedFloor.append(srf.name)
             elif srf.type == 3: ceiling.append(srf.name)
             elif srf.type == 4: airWall.append(srf.name)
-        
-        
+    
+    hb_hive.reportCopies(ghenv.Component)
+    
     return wall, interiorWall, airWall, window, interiorWindow, skylight, roof, \
            ceiling, floor, exposedFloor, groundFloor, undergroundWall, \
            undergroundCeiling
@@ -81,6 +81,9 @@ import Rhino as rc
 import scriptcontext as sc
 import math
 import os
+import array
+import itertools
+import operator
 import System.Threading.Tasks as tasks
 
 
@@ -127,8 +130,7 @@ def recallHBZoneProperties(HOYs, occupancyThere):
                     ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
                     checkZones = False
                 else:
-                    readSchedules = sc.sticky["honeybee_ReadSchedules"](zoneOccSched, 0)
-                    values  = readSchedules.getScheduleValues()
+                    values = list(sc.sticky["honeybee_ScheduleCompiler"].annualValues(zoneOccSched, 0))
             elif zoneOccSched.lower().endswith(".csv"):
                 # check if csv file exists.
                 if not os.path.isfile(zoneOccSched):
@@ -137,13 +139,7 @@ def recallHBZoneProperties(HOYs, occupancyThere):
                     ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
                     checkZones = False
                 else:
-                    result = open(zoneOccSched, 'r')
-                    for lineCount, line in enumerate(result):
-                        if lineCount < 4: pass
-                        else:
-                            for columnCount, column in enumerate(line.split(',')):
-                                if columnCount == 4:
-                                    values.append(float(column))
+                    values = list(sc.sticky["honeybee_ScheduleCompiler"].csvValues(zoneOccSched)[0])
             try: values = lb_preparation.flattenList(values)
             except: pass
             analysisPValues = []
@@ -151,6 +147,7 @@ def recallHBZoneProperties(HOYs, occupancyThere):
                 analysisPValues.append(values[hour-1])
             occupancySchList.append(analysisPValues)
     
+    hb_hive.reportCopies(ghenv.Component)
     
     return checkZones, zoneNames, occupancySchList
 
@@ -413,6 +410,90 @@ def checkTheInputs():
     return checkData, fileName, workingDir, _viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbersFinal, zoneNames, occupancySchList, comfortType, occupancyThreshold
 
 
+class ThermalAutonomyEngine(object):
+    """Classify every hour and point of a comfort matrix as dense arrays.
+    
+    The comfort and degree-from-target matrices are held as one array per hour
+    and the occupancy and conditioning of each zone as one mask per zone.  Every
+    metric is then a masked reduction over an hour block, which keeps its own
+    occupied hour counts so that blocks can run in parallel and be summed at the end.
+    
+    Occupied cells are written as integers and unoccupied cells as 0.0 since the
+    visualization components count occupied hours by the type of the value.
+    """
+    
+    def __init__(self, comfResultsMtx, degOrPMVMtx, pointZoneList, occupancySchList, totEnergyNumbers, occupancyThreshold):
+        self.hourCount = len(occupancySchList[0])
+        self.pointCount = len(pointZoneList)
+        self.pointZones = pointZoneList
+        
+        #Dense hour x point arrays of the comfort and degree-from-target values.
+        self.comfort = []
+        self.degree = []
+        for hour in xrange(self.hourCount):
+            try:
+                comfRow = comfResultsMtx[hour + 1]
+                degRow = degOrPMVMtx[hour + 1]
+                ptLen = min(len(comfRow), len(degRow), self.pointCount)
+                self.comfort.append(array.array('d', comfRow[:ptLen]))
+                self.degree.append(array.array('d', degRow[:ptLen]))
+            except:
+                self.comfort.append(array.array('d'))
+                self.degree.append(array.array('d'))
+        
+        #Occupied and conditioned masks for each zone.
+        self.zoneOccupied = [array.array('b', [val > occupancyThreshold for val in sch]) for sch in occupancySchList]
+        self.zoneConditioned = [array.array('b', [val > 0 for val in energy]) for energy in totEnergyNumbers]
+    
+    def computeBlock(self, start, end):
+        """Return the metric rows and the occupied hours of each point for the hours [start, end)."""
+        occTCP, TA, OverHeated, UnderHeated = [], [], [], []
+        occHrsNum = array.array('l', [0]) * self.pointCount
+        
+        for hour in xrange(start, end):
+            comfRow = self.comfort[hour]
+            zones = self.pointZones[:len(comfRow)]
+            occupied = [self.zoneOccupied[zone][hour] for zone in zones]
+            conditioned = [self.zoneConditioned[zone][hour] for zone in zones]
+            comfortable = [val > 0 for val in comfRow]
+            warm = [val > 0 for val in self.degree[hour]]
+            
+            occTCP.append([int(comf) if occ else 0.0 for occ, comf in itertools.izip(occupied, comfortable)])
+            TA.append([int(comf and not cond) if occ else 0.0 for occ, comf, cond in itertools.izip(occupied, comfortable, conditioned)])
+            OverHeated.append([int(warm_ and not comf) if occ else 0.0 for occ, comf, warm_ in itertools.izip(occupied, comfortable, warm)])
+            UnderHeated.append([int(not (warm_ or comf)) if occ else 0.0 for occ, comf, warm_ in itertools.izip(occupied, comfortable, warm)])
+            
+            for pointCount in itertools.compress(xrange(len(occupied)), occupied):
+                occHrsNum[pointCount] += 1
+        
+        return occTCP, TA, OverHeated, UnderHeated, occHrsNum
+    
+    def run(self, parallel=False, blockSize=168):
+        """Compute all of the metrics, splitting the hours into blocks that can run on multiple cores."""
+        blocks = [(start, min(start + blockSize, self.hourCount)) for start in xrange(0, self.hourCount, blockSize)]
+        blockResults = [None] * len(blocks)
+        
+        def computeBlock(count):
+            blockResults[count] = self.computeBlock(*blocks[count])
+        
+        if parallel and len(blocks) > 1:
+            tasks.Parallel.ForEach(range(len(blocks)), computeBlock)
+        else:
+            for count in xrange(len(blocks)):
+                computeBlock(count)
+        
+        occTCP, TA, OverHeated, UnderHeated = [], [], [], []
+        occHrsNum = array.array('l', [0]) * self.pointCount
+        for blockOccTCP, blockTA, blockOverHeated, blockUnderHeated, blockOccHrs in blockResults:
+            occTCP.extend(blockOccTCP)
+            TA.extend(blockTA)
+            OverHeated.extend(blockOverHeated)
+            UnderHeated.extend(blockUnderHeated)
+            occHrsNum = array.array('l', itertools.imap(operator.add, occHrsNum, blockOccHrs))
+        
+        return occTCP, TA, OverHeated, UnderHeated, list(occHrsNum)
+
+
 def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold):
     #Set up matrices to be filled.
     occTCP_Mtx = [comfortType + ' Occupied Thermal Comfort Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
@@ -420,13 +501,6 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
     OverHeatedMtx = [comfortType + ' Over-Heated Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
     UnderHeatedMtx = [comfortType + ' Under-Heated Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
     
-    #Create placeholders for all of the hours.
-    for hour in occupancySchList[0]:
-        occTCP_Mtx.append(0)
-        TA_Mtx.append(0)
-        OverHeatedMtx.append(0)
-        UnderHeatedMtx.append(0)
-   
     #Match the totalEnergy values to the HBZones.
     totEnergyNumbersMatched = []
     for name in zoneNames:
@@ -443,23 +517,11 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
             totEnergyNumbersMatched.append(additionalENumList)
     
     #Match each of the test points with a zone using the viewFacorMesh.
+    zoneIndex = sc.sticky["honeybee_ZonePointIndex"](_HBZones, tol)
     pointZoneList = []
-    outDoorPtsCount = 0
     for mesh in viewFactorMesh:
-        for face in mesh.Faces:
-            zoneFound = False
-            if face.IsQuad:
-                faceBrep = rc.Geometry.Brep.CreateFromCornerPoints(rc.Geometry.Point3d(mesh.Vertices[face.A]), rc.Geometry.Point3d(mesh.Vertices[face.B]), rc.Geometry.Point3d(mesh.Vertices[face.C]), rc.Geometry.Point3d(mesh.Vertices[face.D]), sc.doc.ModelAbsoluteTolerance)
-            if face.IsTriangle:
-                faceBrep = rc.Geometry.Brep.CreateFromCornerPoints(rc.Geometry.Point3d(mesh.Vertices[face.A]), rc.Geometry.Point3d(mesh.Vertices[face.B]), rc.Geometry.Point3d(mesh.Vertices[face.C]), sc.doc.ModelAbsoluteTolerance)
-            centPt = rc.Geometry.AreaMassProperties.Compute(faceBrep).Centroid
-            for zoneCount, zone in enumerate(_HBZones):
-                if zone.IsPointInside(centPt, tol, False) == True:
-                    zoneFound = True
-                    pointZoneList.append(zoneCount)
-            if zoneFound == False:
-                outDoorPtsCount += 1
-                pointZoneList.append(len(_HBZones))
+        pointZoneList.extend(zoneIndex.getZones(zoneIndex.faceCentroids(mesh), len(_HBZones)))
+    outDoorPtsCount = pointZoneList.count(len(_HBZones))
     
     #If there are outdoor points, append values for full-time occupancy and use of passive strategies.
     if outDoorPtsCount > 0:
@@ -471,64 +533,14 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
         occupancySchList.append(additionalOccSchList)
         totEnergyNumbersMatched.append(additionalENumList)
     
-    #Make a list that tracks the total occupied hours for each of the points.
-    occHrsNum = []
-    for point in pointZoneList: occHrsNum.append(0)
-    
-    #Finally, compute the matrices for each hour and point.
-    def calcComf(count):
-        occTCP = []
-        TA = []
-        OverHeated = []
-        UnderHeated = []
-        for pointCount, pointZone in enumerate(pointZoneList):
-            try:
-                _comfResultsMtx[count + 1][pointCount]
-                #Check to see if the point's zone is occupied.  Otheriswe, it does not count for anything.
-                if occupancySchList[pointZone][count] > occupancyThreshold:
-                    occHrsNum[pointCount] += 1
-                    #Check to see if the point is comfortable.
-                    if _comfResultsMtx[count + 1][pointCount] > 0:
-                        occTCP.append(1)
-                        OverHeated.append(0)
-                        UnderHeated.append(0)
-                        #Check to see if the point's zone is being conditioned.
-                        if totEnergyNumbersMatched[pointZone][count] > 0: TA.append(0)
-                        else: TA.append(1)
-                    else:
-                        occTCP.append(0)
-                        TA.append(0)
-                        if _degOrPMVMtx[count + 1][pointCount] > 0:
-                            OverHeated.append(1)
-                            UnderHeated.append(0)
-                        else:
-                            OverHeated.append(0)
-                            UnderHeated.append(1)
-                else:
-                    occTCP.append(0.0)
-                    TA.append(0.0)
-                    OverHeated.append(0.0)
-                    UnderHeated.append(0.0)
-            except:
-                pass
-        
-        occTCP_Mtx[count+1] = occTCP
-        TA_Mtx[count+1] = TA
-        OverHeatedMtx[count+1] = OverHeated
-        UnderHeatedMtx[count+1] = UnderHeated
-    
-    #Run through every hour of the analysis to fill up the matrices.
-    #if parallel_ == True and len(occupancySchList[0]) != 1:
-    #    tasks.Parallel.ForEach(range(len(occupancySchList[0])), calcComf)
-    #else:
-    for hour in range(len(occupancySchList[0])):
-        calcComf(hour)
-    
-    # Add the total occupied hours to the matrix (to be used to help calculate comfort autonomy).
-    occTCP_Mtx.append(occHrsNum)
-    TA_Mtx.append(occHrsNum)
-    OverHeatedMtx.append(occHrsNum)
-    UnderHeatedMtx.append(occHrsNum)
+    #Compute the matrices for each hour and point and add the total occupied hours to them (to be used to help calculate comfort autonomy).
+    engine = ThermalAutonomyEngine(_comfResultsMtx, _degOrPMVMtx, pointZoneList, occupancySchList, totEnergyNumbersMatched, occupancyThreshold)
+    occTCP, TA, OverHeated, UnderHeated, occHrsNum = engine.run(parallel_ == True)
+    
+    occTCP_Mtx[1:] = occTCP + [occHrsNum]
+    TA_Mtx[1:] = TA + [occHrsNum]
+    OverHeatedMtx[1:] = OverHeated + [occHrsNum]
+    UnderHeatedMtx[1:] = UnderHeated + [occHrsNum]
     
     
     return occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx
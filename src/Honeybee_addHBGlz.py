@@ -204,7 +204,7 @@ def main(HBObject, childSurfaces, childSurfacesName, EPConstructions, RADMateria
         # call the surface from the hive
         hb_hive = sc.sticky["honeybee_Hive"]()
         try:
-            HBObject = hb_hive.callFromHoneybeeHive([HBObject])[0]
+            HBObject = hb_hive.callFromHoneybeeHive([HBObject], ghenv.Component)[0]
         except:
             raise TypeError("Wrong input type for _HBObj. Connect a Honeybee Surface or a HoneybeeZone to HBObject input")
 
@@ -91,7 +91,7 @@ def main(zoneName,  HBZoneProgram, HBSurfaces, isConditioned):
     # call the surface from the hive
     hb_hive = sc.sticky["honeybee_Hive"]()
     
-    HBSurfaces = hb_hive.callFromHoneybeeHive(HBSurfaces)
+    HBSurfaces = hb_hive.callFromHoneybeeHive(HBSurfaces, ghenv.Component)
     
     # bldg program
     try: bldgProgram, zoneProgram = HBZoneProgram.split("::")
@@ -330,7 +330,7 @@ if checktheinputs(_GeneratorSystemName,PVHBSurfaces_,HBGenerationObjects_,_Maint
 
     if checHBgenobjects(PVHBSurfaces_,HBGenerationObjects_) != -1:
    
-        PV_generation = hb_hive.callFromHoneybeeHive(PVHBSurfaces_)
+        PV_generation = hb_hive.callFromHoneybeeHive(PVHBSurfaces_, ghenv.Component)
         
         HB_generation = hb_hivegen.callFromHoneybeeHive(HBGenerationObjects_)
 
@@ -0,0 +1,97 @@
+"""Tests for the test point matrices of the comfort maps.
+
+The classes are read from src/Honeybee_Honeybee.py without Rhino or Grasshopper. Run with
+Python 2.7 which is the language of IronPython:
+    python -m unittest discover tests
+"""
+import array
+import itertools
+import os
+import re
+import textwrap
+import unittest
+import uuid
+import zlib
+
+srcFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+
+def loadClasses():
+    with open(os.path.join(srcFolder, "Honeybee_Honeybee.py")) as inf:
+        source = inf.read().replace("\r\n", "\n")
+    start = source.index("\nclass hb_ZoneVector(")
+    end = source.index("\nclass hb_Hive(")
+    namespace = {"array": array, "itertools": itertools, "uuid": uuid, "zlib": zlib}
+    exec(source[start:end], namespace)
+    return namespace
+
+
+def skyDivisionBlock(recipeFile):
+    """The loop of a comfort recipe that finds the sky divisions from testPtBlockedVec."""
+    with open(os.path.join(srcFolder, recipeFile)) as inf:
+        lines = inf.read().replace("\r\n", "\n").split("\n")
+    start = [count for count, line in enumerate(lines) if line.strip() == "for blockList in testPtBlockedVec:"][0]
+    indent = len(lines[start]) - len(lines[start].lstrip())
+    end = start + 1
+    while end < len(lines) and (not lines[end].strip() or len(lines[end]) - len(lines[end].lstrip()) > indent):
+        end += 1
+    return textwrap.dedent("\n".join(lines[start:end]))
+
+
+class ZoneMatrixTestCase(unittest.TestCase):
+
+    recipes = ("Honeybee_Adaptive Comfort Analysis Recipe.py", "Honeybee_Outdoor Comfort Analysis Recipe.py",
+               "Honeybee_PET Analysis Recipe.py", "Honeybee_PMV Comfort Analysis Recipe.py")
+
+    def setUp(self):
+        classes = loadClasses()
+        self.hb_ZoneMatrix = classes["hb_ZoneMatrix"]
+        # the second zone has windows but no test points
+        self.viewFactorInfo = classes["viewFactorInfo"](
+            testPtViewFactor = [[[0.5, 0.5], [0.25, 0.75]], [], [[1.0]]],
+            testPtSkyView = [[0.1, 0.2], [], [0.3]],
+            testPtBlockedVec = [[[1] * 145, [0] * 145], [], [[1] * 145]])
+
+    def test_emptyZoneIsEmptyList(self):
+        for matrix in (self.viewFactorInfo.testPtViewFactor, self.viewFactorInfo.testPtSkyView,
+                       self.viewFactorInfo.testPtBlockedVec):
+            self.assertEqual(matrix[1], [])
+            self.assertFalse(matrix[1] != [])
+
+    def test_emptyZoneThroughRecipes(self):
+        for recipeFile in self.recipes:
+            namespace = {"testPtBlockedVec": self.viewFactorInfo.testPtBlockedVec,
+                         "numSkyPatchDivs": None, "checkData12": True}
+            exec(skyDivisionBlock(recipeFile), namespace)
+            self.assertEqual(namespace["numSkyPatchDivs"], 0, recipeFile)
+            self.assertTrue(namespace["checkData12"], recipeFile)
+
+    def test_viewFactorIsNotCopied(self):
+        info = self.viewFactorInfo
+        self.assertIs(info.testPtViewFactor, info.testPtViewFactor)
+        self.assertEqual(info.NumPts, 3)
+        self.assertEqual(list(info.testPtViewFactor[0][1]), [0.25, 0.75])
+
+    def test_setValuesThroughViews(self):
+        info = self.viewFactorInfo
+        info.testPtSkyView[0][1] = 0.4
+        info.testPtViewFactor[2][0][0] = 0.9
+        self.assertAlmostEqual(info.testPtSkyView[0][1], 0.4)
+        self.assertAlmostEqual(info.testPtViewFactor[2][0][0], 0.9)
+        self.assertRaises(IndexError, info.testPtSkyView[0].__getitem__, 2)
+
+    def test_addZones(self):
+        zones = self.viewFactorInfo.testPtViewFactor[:-1] + [[]]
+        self.assertEqual(len(zones), 3)
+        self.assertEqual(zones[1], [])
+        self.assertEqual(zones[2], [])
+        self.assertEqual(zones[0], [[0.5, 0.5], [0.25, 0.75]])
+
+    def test_packRoundTrip(self):
+        matrix = self.viewFactorInfo.testPtBlockedVec
+        unpacked = self.hb_ZoneMatrix.fromValue(matrix.pack())
+        self.assertEqual(unpacked.toLists(), matrix.toLists())
+
+
+if __name__ == "__main__":
+    unittest.main()